@@ -1,174 +1,181 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
-from math import pi
+import math
+import datetime
 from streamlit_drawable_canvas import st_canvas
-import sqlite3
-
-# --- Club palette constants ---
-KLR_RED = "#C8102E"
-KLR_GOLD = "#FFCC33"
-KLR_BLACK = "#000000"
-KLR_WHITE = "#FFFFFF"
-OPP_GREY = "#777777"
-PITCH_LENGTH = 100
-PITCH_WIDTH = 70
+from db import (get_pool, initialize_db, fetch_df, execute_write, execute_many, upsert_df,
+                table_version, fixture_tracking_version, tracking_latest, event_bounds, dashboard_counts,
+                table_columns, selection, save_selection, selection_counts, selected_unavailable)
+from data_sync import IMPORT_TABLES, TABLE_KEYS, read_chunks, suggest_mapping, import_chunks, import_columnar
+from import_cache import cached_chunks, content_key
+from player_directory import PlayerDirectory
+from pitch_render import render_frame, render_heatmap, render_network, static_pitch_png
+from playback import build_payload, player_html
+import event_links
+import game_scores
+from event_index import EVENT_TYPES, EventIndex, load_events
+import keyframes
+import reports
+import spatial
+import tracking_store
+import work_rate
+import diagnostics
+from player_sync import SYNC_COLUMNS, SPOND_COLUMNS, sync_players
+from gms_importer import parse_players_from_gms_export
+from spond_importer import parse_players_from_spond_csv
 
 st.set_page_config(page_title="KLRUFC Coaching Hub", page_icon="🏉", layout="wide")
+_rerun = diagnostics.start_rerun()
 
-DATA_DIR = Path(__file__).parent / "data"
-DB_PATH = DATA_DIR / "club.db"
 ASSETS_DIR = Path("assets")
 
-# --- Data Layer using SQLite ---
-def get_connection():
-    DATA_DIR.mkdir(exist_ok=True)
-    return sqlite3.connect(DB_PATH)
-
-def initialize_db():
-    with get_connection() as conn:
-        c = conn.cursor()
-        # Players
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                player_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT,
-                last_name TEXT,
-                status TEXT,
-                injury_notes TEXT,
-                shirt_number INTEGER
-            )
-        ''')
-        # Fixtures
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS fixtures (
-                fixture_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                team TEXT,
-                opposition TEXT,
-                venue TEXT,
-                ground_address TEXT,
-                date TEXT,
-                kickoff TEXT,
-                selected_player_ids TEXT
-            )
-        ''')
-        # Availability
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS availability (
-                player_id INTEGER,
-                available INTEGER,
-                reason TEXT
-            )
-        ''')
-        # Analysis
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS analysis_scores (
-                fixture_id INTEGER,
-                player_id INTEGER,
-                go_forward INTEGER,
-                attitude INTEGER,
-                mighty_defence INTEGER,
-                energy INTEGER,
-                notes TEXT
-            )
-        ''')
-        # Tracking
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS tracking (
-                fixture_id INTEGER,
-                time_s INTEGER,
-                player_id INTEGER,
-                x_pct REAL,
-                y_pct REAL,
-                team TEXT,
-                bench INTEGER
-            )
-        ''')
-        # Events
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                fixture_id INTEGER,
-                time_s INTEGER,
-                event TEXT,
-                player_id INTEGER,
-                notes TEXT
-            )
-        ''')
-        conn.commit()
+@st.cache_resource
+def init_database():
+    # Schema setup once per server process; the connection pool itself lives in db.py.
+    initialize_db()
+    return get_pool()
 
-initialize_db()
+init_database()
 
 # --- Helper Functions ---
 
-def fetch_df(query, params=()):
-    with get_connection() as conn:
-        df = pd.read_sql_query(query, conn, params=params)
-    return df
-
-def execute_write(query, params=()):
-    with get_connection() as conn:
-        conn.execute(query, params)
-        conn.commit()
-
-def df_to_sql(df, table, if_exists='replace'):
-    with get_connection() as conn:
-        df.to_sql(table, conn, index=False, if_exists=if_exists)
-
 def show_player_table(df, sort_by="name"):
     st.dataframe(df.sort_values(sort_by), use_container_width=True)
 
-@st.cache_data
-def get_players():
-    return fetch_df("SELECT * FROM players")
-
-@st.cache_data
-def get_fixtures():
-    return fetch_df("SELECT * FROM fixtures")
-
-@st.cache_data
-def get_availability():
-    return fetch_df("SELECT * FROM availability")
-
-@st.cache_data
-def get_analysis():
-    return fetch_df("SELECT * FROM analysis_scores")
-
-@st.cache_data
-def get_tracking():
-    return fetch_df("SELECT * FROM tracking")
+def fixture_label(fixture):
+    return f"#{fixture['fixture_id']} {fixture['team']} vs {fixture['opposition']} — {fixture['date']}"
 
-@st.cache_data
-def get_events():
-    return fetch_df("SELECT * FROM events")
+def pick_fixture(fixtures, key):
+    """Fixture selectbox (latest first); returns the chosen fixture row."""
+    ordered = fixtures.sort_values(['date', 'fixture_id'], ascending=False).reset_index(drop=True)
+    i = st.selectbox("Fixture", ordered.index, format_func=lambda i: fixture_label(ordered.loc[i]), key=key)
+    return ordered.loc[i]
 
-def name(row):
-    return f"{row.get('first_name','')} {row.get('last_name','')}".strip()
+def cached(cache, **options):
+    """st.cache_data / st.cache_resource with call and miss counters for the Diagnostics page."""
+    def wrap(fn):
+        return diagnostics.cache_calls(cache(**options)(diagnostics.cache_misses(fn)))
+    return wrap
 
-def plot_rugby_pitch(ax, length=PITCH_LENGTH, width=PITCH_WIDTH, line=KLR_BLACK, turf=KLR_WHITE, accent=KLR_GOLD):
-    # Background turf
-    ax.set_facecolor(turf)
-    ax.set_xlim(0, length)
-    ax.set_ylim(0, width)
+# Cached loaders are keyed on the table's write counter (see db.table_version), so a
+# save only invalidates the tables it touched; old versions age out via max_entries.
+@cached(st.cache_data, max_entries=32)
+def load_table(table, version):
+    return fetch_df(f"SELECT * FROM {table}")
 
-    # Touchlines & goal lines (black)
-    ax.plot([0, length], [0, 0], lw=2.5, color=KLR_BLACK)
-    ax.plot([0, length], [width, width], lw=2.5, color=KLR_BLACK)
-    ax.plot([0, 0], [0, width], lw=2.5, color=KLR_BLACK)
-    ax.plot([length, length], [0, width], lw=2.5, color=KLR_BLACK)
-
-    # 22m, halfway and dashed 5/15m in gold accents
-    for x in [22, 78, 50]:
-        ax.plot([x, x], [0, width], lw=2, color=accent, alpha=0.9)
-    for x in [5, 15, 85, 95]:
-        ax.plot([x, x], [0, width], lw=1.2, ls="--", color=accent, alpha=0.7)
+def get_players():
+    return load_table("players", table_version("players"))
 
-    # In-goal markers/posts (red squares)
-    ax.scatter([0, length], [width / 2, width / 2], s=160, marker="s", color=KLR_RED, edgecolors=KLR_BLACK, linewidths=1.2)
+def get_fixtures():
+    return load_table("fixtures", table_version("fixtures"))
 
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.set_aspect('equal', adjustable='box')
+def get_availability():
+    return load_table("availability", table_version("availability"))
+
+@cached(st.cache_data, max_entries=16)
+def _selection(fixture_id, selection_version, players_version, availability_version):
+    return selection(fixture_id)
+
+def get_selection(fixture_id):
+    return _selection(fixture_id, table_version("fixture_selection"), table_version("players"), table_version("availability"))
+
+def get_game_summary():
+    # Players whose ratings changed outside game_scores.record() are rebuilt here.
+    if game_scores.pending():
+        game_scores.refresh()
+    return load_table("game_player_summary", table_version("game_player_summary"))
+
+def get_game_fixture_scores():
+    return load_table("game_fixture_scores", table_version("game_fixture_scores"))
+
+def get_work_rate():
+    # Stale fixture/player segments are recomputed off the render thread; until that
+    # finishes (and bumps the work_rate version) this returns the previous summaries.
+    if work_rate.pending():
+        work_rate.refresh_in_background()
+    return load_table("work_rate", table_version("work_rate"))
+
+@cached(st.cache_data, max_entries=16)
+def _time_bounds(fixture_id, tracking_version, events_version):
+    t_min, t_max = tracking_store.bounds(fixture_id) or (0, 0)
+    t_min, t_max = int(math.floor(t_min)), int(math.ceil(t_max))
+    ev_bounds = event_bounds(fixture_id)
+    if ev_bounds:
+        t_min, t_max = min(t_min, ev_bounds[0]), max(t_max, ev_bounds[1])
+    return t_min, t_max
+
+def get_time_bounds(fixture_id):
+    return _time_bounds(fixture_id, table_version("tracking"), table_version("events"))
+
+@cached(st.cache_data, max_entries=8)
+def _dashboard_counts(players_version, fixtures_version, availability_version, selection_version, today):
+    return dashboard_counts()
+
+def get_dashboard_counts():
+    # Keyed on the date too: the "next" fixture moves on as fixtures are played.
+    return _dashboard_counts(table_version("players"), table_version("fixtures"), table_version("availability"),
+                             table_version("fixture_selection"), str(datetime.date.today()))
+
+# Rendered frames are keyed on every table they draw from, so a saved point or event
+# only invalidates frames once; scrubbing back over a frame is a cache hit.
+@cached(st.cache_data, max_entries=256)
+def _pitch_frame(fixture_id, time_s, method, tracking_version, events_version, players_version):
+    snap = tracking_store.snapshot(fixture_id, time_s, method)
+    if snap.empty:
+        return None
+    snap = snap.merge(_player_directory(players_version).frame[['player_id','first_name','last_name','shirt_number']], on='player_id', how='left')
+    links = _event_links(fixture_id, method, tracking_version, events_version)
+    return render_frame(snap, event_links.overlay(links, time_s))
+
+def get_pitch_frame(fixture_id, time_s, method="linear"):
+    return _pitch_frame(fixture_id, time_s, method, table_version("tracking"), table_version("events"), table_version("players"))
+
+# Pass/linebreak arrows for a whole fixture, resolved once per tracking/events version.
+@cached(st.cache_data, max_entries=16)
+def _event_links(fixture_id, method, tracking_version, events_version):
+    return event_links.resolve(fixture_id, method)
+
+def get_event_links(fixture_id, method="linear"):
+    return _event_links(fixture_id, method, table_version("tracking"), table_version("events"))
+
+# Occupancy grids and per-frame team shape, keyed on the fixture's own tracking version
+# so writes to one fixture leave the others cached.
+@cached(st.cache_data, max_entries=64)
+def _spatial(fixture_id, fixture_tracking_version):
+    return spatial.load(fixture_id)
+
+def get_spatial(fixture_id):
+    return _spatial(fixture_id, fixture_tracking_version(fixture_id))
+
+@cached(st.cache_data, max_entries=8)
+def _playback_payload(fixture_id, method, tracking_version, events_version, players_version):
+    bounds = tracking_store.bounds(fixture_id)
+    if bounds is None:
+        return None
+    ev = _event_index(events_version).fixture(fixture_id).frame
+    return build_payload(tracking_store.time_range(fixture_id, *bounds, method=method), ev,
+                         _player_directory(players_version).frame)
+
+def get_playback_payload(fixture_id, method="linear"):
+    return _playback_payload(fixture_id, method, table_version("tracking"), table_version("events"), table_version("players"))
+
+@cached(st.cache_resource, max_entries=4)
+def _player_directory(version):
+    return PlayerDirectory(load_table("players", version))
+
+def get_player_directory():
+    # Shared between sessions: treat it as read-only.
+    return _player_directory(table_version("players"))
+
+@cached(st.cache_resource, max_entries=4)
+def _event_index(version):
+    return EventIndex(load_events())
+
+def get_event_index():
+    # Shared between sessions: treat it as read-only.
+    return _event_index(table_version("events"))
 
 # --- Sidebar/logo ---
 logo_path = ASSETS_DIR / "logo.png"
@@ -180,343 +187,524 @@ page = st.sidebar.radio("Navigate", [
     "Player Analysis (GAME)",
     "Video & Tracking",
     "Data Sync",
-    "Settings"
+    "Settings",
+    "Diagnostics",
 ])
+diagnostics.set_page(page)
 
 # --- Main UI Section Routing ---
-players = get_players()
-fixtures = get_fixtures()
-availability = get_availability()
-analysis = get_analysis()
-tracking = get_tracking()
-events = get_events()
-
-# --- Dashboard ---
-if page == "Dashboard":
-    st.header("🏉 KLRUFC Coaching Hub")
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Players", len(players))
-    col2.metric("Fixtures", len(fixtures))
-    col3.metric("Available (next)", int(availability['available'].sum()) if not availability.empty else 0)
-    selected_count = 0
-    if not fixtures.empty and 'selected_player_ids' in fixtures.columns:
-        try:
-            selected_ids = [int(x) for x in str(fixtures.iloc[0]['selected_player_ids']).split(',') if str(x).strip().isdigit()]
-            selected_count = len(selected_ids)
-        except Exception:
-            selected_count = 0
-    col4.metric("Selected (next)", selected_count)
-    st.write("Use the sidebar to manage selection, availability, GAME analysis, and video & tracking.")
-
-# --- Selection & Availability ---
-elif page == "Selection & Availability":
-    st.header("✅ Selection & Availability")
-    if fixtures.empty:
-        st.info("No fixtures yet. Add one in Settings → Fixtures.")
-    else:
-        fixture = fixtures.iloc[0]
-        st.subheader(f"{fixture['team']} vs {fixture['opposition']} — {fixture['venue']} — {fixture['date']} {fixture['kickoff']}")
-        # Availability editor
-        if availability.empty:
-            st.warning("No availability data yet.")
+# Each page loads only the tables it uses, when it is the page being shown.
+
+_section = diagnostics.start_section(page)
+
+try:
+    # --- Dashboard ---
+    if page == "Dashboard":
+        st.header("🏉 KLRUFC Coaching Hub")
+        counts = get_dashboard_counts()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Players", counts["players"])
+        col2.metric("Fixtures", counts["fixtures"])
+        col3.metric("Available (next)", counts["available"])
+        col4.metric("Selected (next)", counts["selected"])
+        st.write("Use the sidebar to manage selection, availability, GAME analysis, and video & tracking.")
+
+    # --- Selection & Availability ---
+    elif page == "Selection & Availability":
+        st.header("✅ Selection & Availability")
+        fixtures, availability = get_fixtures(), get_availability()
+        directory = get_player_directory()
+        if fixtures.empty:
+            st.info("No fixtures yet. Add one in Settings → Fixtures.")
         else:
-            avail_df = availability.merge(players[['player_id','first_name','last_name','status','injury_notes','shirt_number']], on='player_id', how='left')
-            avail_df['name'] = avail_df.apply(name, axis=1)
-            show_player_table(avail_df[['player_id','shirt_number','name','available','reason']], "name")
-        # Selection list editor
-        st.subheader("Selected Squad")
-        current_sel = []
-        if 'selected_player_ids' in fixture and isinstance(fixture['selected_player_ids'], str):
-            current_sel = [int(x) for x in str(fixture['selected_player_ids']).split(',') if str(x).strip().isdigit()]
-        options = players.assign(name=players.apply(name,axis=1)).sort_values('last_name')
-        chosen = st.multiselect("Pick players", options=options['name'].tolist(),
-                                default=[options.loc[options['player_id'].isin(current_sel),'name']].pop() if len(current_sel) else [])
-        chosen_ids = options.loc[options['name'].isin(chosen),'player_id'].tolist()
-        if st.button("Save selection"):
-            execute_write("UPDATE fixtures SET selected_player_ids=? WHERE fixture_id=?", (",".join(map(str, chosen_ids)), fixture['fixture_id']))
-            st.success("Selection saved.")
-            st.cache_data.clear()
-            st.experimental_rerun()
-        # Unavailable & Injured views
-        st.subheader("Unavailable & Injured")
-        status_df = players.copy()
-        show_player_table(status_df[['first_name','last_name','status','injury_notes']], ["status","last_name"])
-
-# --- Player Analysis (GAME) ---
-elif page == "Player Analysis (GAME)":
-    st.header("📊 GAME Analysis (1–9)")
-    st.markdown("""
+            fixture = pick_fixture(fixtures, "selection_fixture")
+            st.subheader(f"{fixture['team']} vs {fixture['opposition']} — {fixture['venue']} — {fixture['date']} {fixture['kickoff']}")
+            # Availability editor
+            if availability.empty:
+                st.warning("No availability data yet.")
+            else:
+                availability = availability[availability['fixture_id'].isna() | (availability['fixture_id']==fixture['fixture_id'])]
+                avail_df = availability.merge(directory.frame[['player_id','label','status','injury_notes','shirt_number']], on='player_id', how='left')
+                avail_df['name'] = avail_df['label']
+                show_player_table(avail_df[['player_id','shirt_number','name','available','reason']], "name")
+            # Selection list editor
+            st.subheader("Selected Squad")
+            squad = get_selection(int(fixture['fixture_id']))
+            chosen = st.multiselect("Pick players", options=directory.labels(sort_by='last_name'),
+                                    default=directory.labels_for(squad['player_id'].tolist()))
+            chosen_ids = directory.ids_for(chosen)
+            # Shirt and position for this match: as saved, else the player's usual ones
+            sheet = pd.DataFrame({'player_id': chosen_ids, 'name': chosen})
+            sheet = sheet.merge(squad[['player_id','shirt_number','position']], on='player_id', how='left')
+            usual = directory.frame.set_index('player_id')
+            sheet['shirt_number'] = sheet['shirt_number'].fillna(sheet['player_id'].map(usual['shirt_number']))
+            sheet['position'] = sheet['position'].fillna(sheet['player_id'].map(usual['position']))
+            sheet = st.data_editor(sheet, disabled=['player_id','name'], hide_index=True, use_container_width=True, key="squad_sheet")
+            unavailable = squad[squad['available']==0]
+            if not unavailable.empty:
+                st.warning("Selected but unavailable: " + ", ".join(directory.labels_for(unavailable['player_id'].tolist())))
+            if st.button("Save selection"):
+                saved = save_selection(fixture['fixture_id'], sheet[['player_id','shirt_number','position']].itertuples(index=False))
+                st.success(f"Selection saved ({saved} players).")
+                st.rerun()
+            with st.expander("Squad analytics"):
+                teams = sorted(fixtures['team'].dropna().unique().tolist())
+                team = st.selectbox("Team", ["(all teams)"] + teams)
+                counts = selection_counts(None if team == "(all teams)" else team)
+                st.write("**Games selected per player**")
+                st.dataframe(counts, use_container_width=True, hide_index=True, height=260)
+                st.write("**Selected but unavailable (all fixtures)**")
+                st.dataframe(selected_unavailable(), use_container_width=True, hide_index=True)
+            # Per-player report pages for the selected squad, rendered in worker processes
+            st.subheader("Match reports")
+            r1, r2 = st.columns([1,3])
+            fmt = r1.radio("Format", list(reports.FORMATS), horizontal=True, format_func=str.upper)
+            if r2.button("Generate reports for the selected squad"):
+                bar = st.progress(0.0, text="Rendering reports…")
+                data, stats = reports.build_reports(int(fixture['fixture_id']), fmt,
+                                                    progress=lambda done, total: bar.progress(done / total, text=f"{done}/{total} reports"))
+                st.session_state.report_bundle = (f"reports_fixture_{stats['fixture_id']}_{fmt}.zip", data, stats)
+            bundle = st.session_state.get("report_bundle")
+            if bundle and bundle[2]['fixture_id'] == int(fixture['fixture_id']):
+                name, data, stats = bundle
+                st.caption(f"{stats['reports']} reports in {stats['seconds']:.1f}s ({stats['reports_per_s']} reports/s).")
+                st.download_button("Download reports (.zip)", data, file_name=name, mime="application/zip")
+            # Unavailable & Injured views
+            st.subheader("Unavailable & Injured")
+            status_df = directory.frame
+            show_player_table(status_df[['first_name','last_name','status','injury_notes']], ["status","last_name"])
+
+    # --- Player Analysis (GAME) ---
+    elif page == "Player Analysis (GAME)":
+        st.header("📊 GAME Analysis (1–9)")
+        st.markdown("""
 - **Go Forward**: with purpose; go for space; min 3 support points; offload each phase.
 - **Attitude**: Positive and never give up.
 - **Mighty Defence**: dominant, patient, focused on winning the ball back.
 - **Energy**: pace, ferocity, aggression, calm under pressure.
 """)
-    if players.empty: st.stop()
-    player = st.selectbox("Player", players.apply(name, axis=1))
-    player_id = int(players.loc[players.apply(name, axis=1)==player, 'player_id'].iloc[0])
-    fixture_id = st.number_input("Fixture ID", value=1, min_value=1, step=1)
-    cols = st.columns(4)
-    gf = cols[0].slider("Go Forward", 1, 9, 5)
-    att = cols[1].slider("Attitude", 1, 9, 5)
-    defn = cols[2].slider("Mighty Defence", 1, 9, 5)
-    eng = cols[3].slider("Energy", 1, 9, 5)
-    notes = st.text_input("Notes (optional)")
-    if st.button("Save rating"):
-        execute_write(
-            "INSERT INTO analysis_scores (fixture_id, player_id, go_forward, attitude, mighty_defence, energy, notes) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (fixture_id, player_id, gf, att, defn, eng, notes)
-        )
-        st.success("Saved!")
-        st.cache_data.clear()
-    st.subheader("Player chart (latest)")
-    df = get_analysis()
-    dfp = df[df['player_id']==player_id].tail(1)
-    if not dfp.empty:
-        labels = ["Go Forward","Attitude","Mighty Defence","Energy"]
-        values = [int(dfp['go_forward']), int(dfp['attitude']), int(dfp['mighty_defence']), int(dfp['energy'])]
-        angles = [n/float(len(labels)) * 2*pi for n in range(len(labels))]
-        values += values[:1]
-        angles += angles[:1]
-        fig = plt.figure(figsize=(4,4))
-        ax = plt.subplot(111, polar=True)
-        ax.plot(angles, values, linewidth=2)
-        ax.fill(angles, values, alpha=0.25)
-        ax.set_thetagrids([a*180/pi for a in angles[:-1]], labels)
-        ax.set_ylim(0,9)
-        st.pyplot(fig, use_container_width=False)
-
-# --- Video & Tracking ---
-elif page == "Video & Tracking":
-    st.header("🎥 Video & Player Tracking")
-    c1, c2 = st.columns([2,1])
-    with c1:
-        st.subheader("Video")
-        video_url = st.text_input("Paste a Veo share link or any video URL (mp4, YouTube, etc.)")
-        up = st.file_uploader("...or upload a local MP4", type=["mp4","mov","m4v","webm"])
-        if video_url:
-            st.video(video_url)
-        elif up:
-            st.video(up)
-        st.caption("Tip: Veo supports sharing via public link. If a link requires login, embed may not play in-app.")
-    with c2:
-        st.subheader("Event tagging")
-        if players.empty:
-            st.info("Add players first.")
+        directory = get_player_directory()
+        if directory.empty: st.stop()
+        player = st.selectbox("Player", directory.labels())
+        player_id = directory.id_for(player)
+        fixtures = get_fixtures()
+        if fixtures.empty:
+            st.info("No fixtures yet. Add one in Settings → Fixtures.")
+            st.stop()
+        fixture_id = int(pick_fixture(fixtures, "game_fixture")['fixture_id'])
+        cols = st.columns(4)
+        scores = {m: cols[i].slider(game_scores.LABELS[m], 1, 9, 5) for i, m in enumerate(game_scores.METRICS)}
+        notes = st.text_input("Notes (optional)")
+        if st.button("Save rating"):
+            game_scores.record(fixture_id, player_id, scores, notes)
+            st.success("Saved!")
+        summary = get_game_summary()
+        st.subheader("Player chart (latest fixture)")
+        mine = summary[summary['player_id']==player_id]
+        if not mine.empty:
+            row = mine.iloc[0]
+            c_chart, c_table = st.columns([1,1])
+            with c_chart:
+                st.pyplot(game_scores.radar_figure({player: {m: row[f"latest_{m}"] for m in game_scores.METRICS}}), use_container_width=False)
+            with c_table:
+                stats = pd.DataFrame({stat: [row[f"{stat}_{m}"] for m in game_scores.METRICS] for stat in game_scores.STATS},
+                                     index=[game_scores.LABELS[m] for m in game_scores.METRICS])
+                st.caption(f"Season {row['season'] if isinstance(row['season'], str) else '—'}: {int(row['fixtures'])} fixtures; rolling mean of the last {game_scores.ROLLING_FIXTURES}; trend in points per fixture.")
+                st.dataframe(stats.round(2), use_container_width=True)
+            history = get_game_fixture_scores()
+            history = history[history['player_id']==player_id].set_index('seq')[game_scores.METRICS]
+            st.line_chart(history.rename(columns=game_scores.LABELS))
+        st.subheader("Compare players")
+        rated = summary['player_id'].tolist()
+        options = [l for l in directory.labels() if directory.id_for(l) in rated]
+        cmp1, cmp2 = st.columns([3,1])
+        picked = cmp1.multiselect("Players", options, default=[player] if player in options else [])
+        stat = cmp2.radio("Scores", ["latest", "rolling", "season"], format_func=str.title)
+        if picked:
+            by_id = summary.set_index('player_id')
+            series = {label: {m: by_id.at[directory.id_for(label), f"{stat}_{m}"] for m in game_scores.METRICS} for label in picked}
+            st.pyplot(game_scores.radar_figure(series, figsize=(5,5)), use_container_width=False)
+        st.subheader("Squad ranking")
+        rk1, rk2 = st.columns(2)
+        rank_stat = rk1.selectbox("Rank on", game_scores.STATS, index=2, format_func=str.title)
+        sort_by = rk2.selectbox("Sort by", ["overall"] + game_scores.METRICS,
+                                format_func=lambda c: game_scores.LABELS.get(c, c.title()))
+        if summary.empty:
+            st.info("No ratings saved yet.")
         else:
-            player = st.selectbox("Player", ["(team)"] + players.apply(name, axis=1).tolist())
-            event = st.selectbox("Event", ["Carry","Tackle","Ruck Clean","Jackal","Offload","Linebreak","Kick","Pass","Turnover Won","Try","Penalty Won"])
-            t = st.number_input("Time (seconds)", min_value=0, value=0, step=1)
-            notes = st.text_input("Notes", "")
-            if st.button("Save event"):
-                pid = None if player=="(team)" else int(players.loc[players.apply(name, axis=1)==player, 'player_id'].iloc[0])
-                execute_write(
-                    "INSERT INTO events (fixture_id, time_s, event, player_id, notes) VALUES (?, ?, ?, ?, ?)",
-                    (1, t, event, pid, notes)
-                )
-                st.success("Event saved.")
-                st.cache_data.clear()
-    st.divider()
-    st.subheader("Pitch view (graphical)")
-    view_mode = st.radio("View", ["List","Pitch"], horizontal=True)
-    if view_mode == "List":
-        # Show events list and tracking snapshot table
-        colL, colR = st.columns(2)
-        with colL:
-            st.write("**Events**")
-            ev = get_events()
-            if not ev.empty:
-                ev = ev.merge(players[['player_id','first_name','last_name']], how='left', on='player_id')
-            st.dataframe(ev, use_container_width=True, height=300)
-        with colR:
-            st.write("**Tracking (latest 100 pts)**")
-            tr = get_tracking().tail(100)
-            if not tr.empty:
-                tr = tr.merge(players[['player_id','first_name','last_name','shirt_number']], on='player_id', how='left')
-            st.dataframe(tr, use_container_width=True, height=300)
-    else:
-        # --- Timeline player controls ---
-        st.subheader("Timeline Controls")
-        tracking_df = get_tracking()
-        t_min, t_max = 0, 0
-        if not tracking_df.empty:
-            t_min = int(tracking_df['time_s'].min())
-            t_max = int(tracking_df['time_s'].max())
-        events_df = get_events()
-        if not events_df.empty:
-            t_min = min(t_min, int(events_df['time_s'].min()))
-            t_max = max(t_max, int(events_df['time_s'].max()))
-        if "time_s" not in st.session_state: st.session_state.time_s = 0
-        if "playing" not in st.session_state: st.session_state.playing = False
-        if "play_speed" not in st.session_state: st.session_state.play_speed = "1x"
-
-        c_ctrl1, c_ctrl2, c_ctrl3, c_ctrl4, c_ctrl5 = st.columns([1,1,1,2,6])
-        with c_ctrl1:
-            if st.button("⏮️ -1s"):
-                st.session_state.time_s = max(t_min, st.session_state.time_s - 1)
-        with c_ctrl2:
-            if st.button("⏭️ +1s"):
-                st.session_state.time_s = min(t_max, st.session_state.time_s + 1)
-        with c_ctrl3:
-            if st.session_state.playing:
-                if st.button("⏸️ Pause"):
-                    st.session_state.playing = False
+            table = game_scores.ranking(summary, rank_stat, sort_by)
+            table.insert(0, 'player', table['player_id'].map(directory.label_for))
+            st.dataframe(table.drop(columns='player_id').rename(columns=game_scores.LABELS).round(2),
+                         use_container_width=True, hide_index=True)
+        st.subheader("Work rate (from tracking)")
+        wr = get_work_rate()
+        if work_rate.refreshing():
+            st.caption("Updating work rates from new tracking… refresh the page to see them.")
+        wrp = wr[wr['player_id']==player_id].sort_values('fixture_id')
+        if wrp.empty:
+            st.info("No tracking or tagged events for this player yet.")
+        else:
+            current = wrp[wrp['fixture_id']==fixture_id]
+            if not current.empty:
+                row = current.iloc[0]
+                m1, m2, m3, m4, m5 = st.columns(5)
+                m1.metric("Distance (m)", f"{row['distance_m']:,.0f}")
+                m2.metric("Sprint (m)", f"{row['sprint_m']:,.0f}")
+                m3.metric("Sprints", int(row['sprints']))
+                m4.metric("Minutes on", f"{row['minutes_on']:.0f}")
+                m5.metric("Involvements", int(row['involvements']))
+            st.dataframe(wrp.drop(columns='player_id'), use_container_width=True, hide_index=True)
+
+    # --- Video & Tracking ---
+    elif page == "Video & Tracking":
+        st.header("🎥 Video & Player Tracking")
+        directory = get_player_directory()
+        fixtures = get_fixtures()
+        if fixtures.empty:
+            st.info("No fixtures yet. Add one in Settings → Fixtures.")
+            st.stop()
+        fixture_id = int(pick_fixture(fixtures, "video_fixture")['fixture_id'])
+        c1, c2 = st.columns([2,1])
+        with c1:
+            st.subheader("Video")
+            video_url = st.text_input("Paste a Veo share link or any video URL (mp4, YouTube, etc.)")
+            up = st.file_uploader("...or upload a local MP4", type=["mp4","mov","m4v","webm"])
+            if video_url:
+                st.video(video_url)
+            elif up:
+                st.video(up)
+            st.caption("Tip: Veo supports sharing via public link. If a link requires login, embed may not play in-app.")
+        with c2:
+            st.subheader("Event tagging")
+            if directory.empty:
+                st.info("Add players first.")
+            else:
+                player = st.selectbox("Player", ["(team)"] + directory.labels())
+                event = st.selectbox("Event", EVENT_TYPES)
+                event_team = st.selectbox("Team", ["KLR","OPP"], index=0)
+                t = st.number_input("Time (seconds)", min_value=0, value=0, step=1)
+                notes = st.text_input("Notes", "")
+                if st.button("Save event"):
+                    pid = directory.id_for(player)
+                    execute_write(
+                        "INSERT INTO events (fixture_id, time_s, event, player_id, team, notes) VALUES (?, ?, ?, ?, ?, ?)",
+                        (fixture_id, t, event, pid, event_team, notes)
+                    )
+                    work_rate.refresh_in_background()
+                    st.success("Event saved.")
+        st.divider()
+        st.subheader("Pitch view (graphical)")
+        view_mode = st.radio("View", ["List","Pitch","Passing network","Sequences","Heatmap & shape"], horizontal=True)
+        if view_mode == "List":
+            # Show events list and tracking snapshot table
+            colL, colR = st.columns(2)
+            with colL:
+                st.write("**Events**")
+                ev = get_event_index().fixture(fixture_id).frame.drop(columns='kind')
+                if not ev.empty:
+                    ev = ev.merge(directory.frame[['player_id','first_name','last_name']], how='left', on='player_id')
+                st.dataframe(ev, use_container_width=True, height=300)
+            with colR:
+                st.write("**Tracking (latest 100 pts)**")
+                tr = tracking_latest(100)
+                if not tr.empty:
+                    tr = tr.merge(directory.frame[['player_id','first_name','last_name','shirt_number']], on='player_id', how='left')
+                st.dataframe(tr, use_container_width=True, height=300)
+        elif view_mode == "Passing network":
+            scope = st.radio("Scope", ["This fixture","Season"], horizontal=True)
+            fixture_ids = [fixture_id] if scope == "This fixture" else get_fixtures()['fixture_id'].dropna().astype(int).tolist()
+            links = pd.concat([get_event_links(f) for f in fixture_ids], ignore_index=True) if fixture_ids else pd.DataFrame(columns=event_links.LINK_COLUMNS)
+            nodes, edges = event_links.passing_network(links)
+            if edges.empty:
+                st.info("No passes with a tracked receiver yet.")
             else:
-                if st.button("▶️ Play"):
-                    st.session_state.playing = True
-        with c_ctrl4:
-            st.session_state.play_speed = st.selectbox("Speed", ["0.5x","1x","2x"], index=1, label_visibility="collapsed")
-        with c_ctrl5:
-            st.session_state.time_s = st.slider("Time (s)", min_value=int(t_min), max_value=int(max(t_max, t_min+1)), value=int(st.session_state.time_s), step=1)
-
-        # Auto-advance while playing
-        if st.session_state.playing:
-            import time
-            speed = {"0.5x":2.0,"1x":1.0,"2x":0.5}[st.session_state.play_speed]
-            time.sleep(0.4 * speed)
-            st.session_state.time_s = int(min(t_max, st.session_state.time_s + 1))
-            st.experimental_rerun()
-
-        time_s = int(st.session_state.time_s)
-
-        fig, ax = plt.subplots(figsize=(8,5))
-        plot_rugby_pitch(ax)
-        st.pyplot(fig, use_container_width=True)
-        st.caption("Below: use the canvas to drop circles at player locations, then map them to names and save to tracking.")
-
-        # Overlay saved positions at this time
-        tr = get_tracking()
-        snap = tr[(tr['time_s']==time_s) & (tr['fixture_id']==1)]
-        if not snap.empty:
-            snap = snap.merge(players[['player_id','first_name','last_name','shirt_number']], on='player_id', how='left')
-            fig2, ax2 = plt.subplots(figsize=(8,5))
-            plot_rugby_pitch(ax2)
-            for _, r in snap.iterrows():
-                ax2.scatter(r['x_pct'], r['y_pct'], s=800, marker='o', color=KLR_RED, edgecolors=KLR_BLACK, linewidth=2, zorder=2)
-                num = str(r.get('shirt_number') or "")
-                label = num if num else (str(r['first_name'])[0] + str(r['last_name'])[0])
-                ax2.text(r['x_pct'], r['y_pct'], label, color=KLR_WHITE, weight="bold",
-                         fontsize=12, ha="center", va="center", zorder=3)
-            # Overlay arrows for events near this time
-            ev = get_events()
-            evw = ev[(ev['fixture_id']==1) & (ev['time_s'].between(time_s-2, time_s+2))]
-            if not evw.empty:
-                coords = {int(r['player_id']): (float(r['x_pct']), float(r['y_pct'])) for _, r in snap.dropna(subset=['player_id']).iterrows()}
-                for _, e in evw.iterrows():
-                    if str(e['event']).lower() == 'pass':
-                        src = int(e['player_id']) if not pd.isna(e['player_id']) else None
-                        if src in coords:
-                            sx, sy = coords[src]
-                            tx, ty, bestd = None, None, 1e9
-                            for pid,(x,y) in coords.items():
-                                if pid == src: continue
-                                d = (x-sx)**2 + (y-sy)**2
-                                if d < bestd:
-                                    bestd, (tx,ty) = d, (x,y)
-                            if tx is not None:
-                                ax2.arrow(sx, sy, tx-sx, ty-sy, width=0.1, head_width=2.5, head_length=2.5, length_includes_head=True, color=KLR_BLACK, alpha=0.8, zorder=2)
-                    elif str(e['event']).lower() == 'linebreak':
-                        src = int(e['player_id']) if not pd.isna(e['player_id']) else None
-                        if src in coords:
-                            sx, sy = coords[src]
-                            ax2.arrow(sx, sy, 8, 0, width=0.1, head_width=2.5, head_length=2.5, length_includes_head=True, color=KLR_GOLD, alpha=0.9, zorder=2)
-            st.pyplot(fig2, use_container_width=True)
-
-        canvas_res = st_canvas(
-            fill_color="rgba(0, 84, 60, 0.3)",
-            stroke_width=2,
-            background_color="#e8f1ed",
-            height=350,
-            drawing_mode="circle",
-            key="pitch_canvas"
-        )
-        colB = st.columns([1])[0]
-        with colB:
-            st.write("Map drawn markers to players")
-            # Show events at current time window
-            evw = get_events()
-            _win = evw[(evw['fixture_id']==1) & (evw['time_s'].between(time_s-2, time_s+2))]
-            if not _win.empty:
-                _win = _win.merge(players[['player_id','first_name','last_name']], on='player_id', how='left')
-                st.caption("Events near this time (±2s):")
-                st.dataframe(_win, use_container_width=True, height=160)
-            if canvas_res and canvas_res.json_data is not None and 'objects' in canvas_res.json_data:
-                objs = canvas_res.json_data['objects']
-                st.write(f"Detected markers: {len(objs)}")
-                entries = []
-                for i, o in enumerate(objs):
-                    if all(k in o for k in ("left","top","radius")):
-                        x_pct = min(max((o['left']) / 700 * 100, 0), 100)
-                        y_pct = min(max((o['top']) / 350 * 70, 0), 70)
-                        entries.append({"idx": i, "x_pct": x_pct, "y_pct": y_pct})
-                if entries:
-                    mapping = {}
-                    names = players.assign(name=players.apply(name, axis=1))['name'].tolist()
-                    team_choice = st.selectbox("Team for these markers", ["KLR","OPP"], index=0)
-                    bench_flag = st.checkbox("Mark as bench (outline only)", value=False)
-                    for e in entries:
-                        mapping[e['idx']] = st.selectbox(f"Marker {e['idx']+1}", ["(skip)"]+names, key=f"map_{e['idx']}")
-                    if st.button("Save tracking points"):
+                nodes = nodes.merge(directory.frame[['player_id','first_name','last_name','shirt_number']], on='player_id', how='left')
+                st.image(render_network(nodes, edges), use_column_width=True)
+                edges = edges.assign(passer=edges['player_id'].map(directory.label_for), receiver=edges['target_id'].map(directory.label_for))
+                st.dataframe(edges[['passer','receiver','passes']], use_container_width=True, height=300)
+        elif view_mode == "Heatmap & shape":
+            h1, h2 = st.columns(2)
+            scope = h1.radio("Scope", ["This fixture","Season"], horizontal=True, key="heat_scope")
+            team = h2.radio("Team", spatial.TEAMS, horizontal=True, key="heat_team")
+            fixture_ids = [fixture_id] if scope == "This fixture" else fixtures['fixture_id'].dropna().astype(int).tolist()
+            # Season heatmaps are sums of the per-fixture grids; raw points are never rescanned.
+            grid = spatial.season_grid(fixture_ids, team, load=get_spatial)
+            st.image(render_heatmap(grid, "Reds" if team == "KLR" else "Greys"), use_column_width=True)
+            st.caption(f"Time on the pitch per {spatial.GRID_M} m cell, bench excluded.")
+            shape = get_spatial(fixture_id)[1]
+            if shape.empty:
+                st.info("No tracking for this fixture yet.")
+            else:
+                metric = st.selectbox("Team shape", ["width","depth","compactness","cx","cy"])
+                st.line_chart(shape.pivot_table(index='time_s', columns='team', values=metric))
+                st.dataframe(shape.groupby('team')[['width','depth','compactness']].mean().round(1), use_container_width=True)
+        elif view_mode == "Sequences":
+            index = get_event_index()
+            scope = st.radio("Scope", ["This fixture","Season"], horizontal=True, key="seq_scope")
+            fixture_ids = [fixture_id] if scope == "This fixture" else None
+            st.write("**Event followed by event**")
+            q1, q2, q3, q4 = st.columns(4)
+            first = q1.selectbox("First", EVENT_TYPES, index=EVENT_TYPES.index("Tackle"))
+            then = q2.selectbox("Then", EVENT_TYPES, index=EVENT_TYPES.index("Turnover Won"))
+            within = q3.number_input("Within (s)", min_value=1, value=10, step=1)
+            same = q4.selectbox("Same", ["team","player","(any)"])
+            pairs = index.followed_by(first, then, within, None if same == "(any)" else same, fixture_ids)
+            st.metric(f"{first} → {then}", len(pairs))
+            if not pairs.empty:
+                pairs = pairs.assign(player=pairs['player_id'].map(directory.label_for), then_player=pairs['then_player_id'].map(directory.label_for))
+                st.dataframe(pairs, use_container_width=True, height=240)
+            st.write("**Events per player per block**")
+            b1, b2 = st.columns(2)
+            kind = b1.selectbox("Event", EVENT_TYPES, key="block_event")
+            block_min = b2.selectbox("Block (min)", [5, 10, 20, 40], index=1)
+            blocks = index.per_block(kind, block_min * 60, fixture_ids=fixture_ids)
+            if blocks.empty:
+                st.info(f"No {kind} events tagged yet.")
+            else:
+                blocks.index = [directory.label_for(p) or "(team)" for p in blocks.index]
+                st.dataframe(blocks, use_container_width=True)
+        else:
+            # --- Timeline player controls ---
+            st.subheader("Timeline Controls")
+            t_min, t_max = get_time_bounds(fixture_id)
+            if "time_s" not in st.session_state: st.session_state.time_s = 0
+            # The last position may be outside a newly picked fixture's timeline.
+            st.session_state.time_s = min(max(st.session_state.time_s, t_min), max(t_max, t_min + 1))
+
+            c_ctrl1, c_ctrl2, c_ctrl3, c_ctrl4, c_ctrl5, c_ctrl6 = st.columns([1,1,1,2,2,6])
+            with c_ctrl3:
+                step = st.selectbox("Step (s)", [1, 2, 5, 10, 30], index=0, label_visibility="collapsed")
+            with c_ctrl1:
+                if st.button("⏮️ Back"):
+                    st.session_state.time_s = max(t_min, st.session_state.time_s - step)
+            with c_ctrl2:
+                if st.button("⏭️ Fwd"):
+                    st.session_state.time_s = min(t_max, st.session_state.time_s + step)
+            with c_ctrl4:
+                playing = st.toggle("▶️ Play")
+            with c_ctrl5:
+                # How positions between keyframes are filled in
+                interp = st.selectbox("Interpolation", ["Linear", "Spline"], index=0, label_visibility="collapsed").lower()
+            with c_ctrl6:
+                st.session_state.time_s = st.slider("Time (s)", min_value=int(t_min), max_value=int(max(t_max, t_min+1)), value=int(st.session_state.time_s), step=1)
+
+            # Playback runs in the browser from one precomputed payload, so it never reruns this script.
+            if playing:
+                payload = get_playback_payload(fixture_id, interp)
+                if payload is None:
+                    st.info("No tracking saved for this fixture yet.")
+                else:
+                    components.html(player_html(payload, default_step=step), height=640)
+                st.stop()
+
+            time_s = int(st.session_state.time_s)
+
+            st.image(static_pitch_png(), use_column_width=True)
+            st.caption("Below: use the canvas to drop circles at player locations, then map them to names and save to tracking.")
+
+            # Overlay saved positions at this time
+            frame = get_pitch_frame(fixture_id, time_s, interp)
+            if frame is not None:
+                st.image(frame, use_column_width=True)
+
+            canvas_res = st_canvas(
+                fill_color="rgba(0, 84, 60, 0.3)",
+                stroke_width=2,
+                background_color="#e8f1ed",
+                height=350,
+                drawing_mode="circle",
+                key="pitch_canvas"
+            )
+            colB = st.columns([1])[0]
+            with colB:
+                st.write("Map drawn markers to players")
+                # Show events at current time window
+                _win = get_event_index().window(fixture_id, time_s-2, time_s+2).drop(columns='kind')
+                if not _win.empty:
+                    _win = _win.merge(directory.frame[['player_id','first_name','last_name']], on='player_id', how='left')
+                    st.caption("Events near this time (±2s):")
+                    st.dataframe(_win, use_container_width=True, height=160)
+                if canvas_res and canvas_res.json_data is not None and 'objects' in canvas_res.json_data:
+                    objs = canvas_res.json_data['objects']
+                    st.write(f"Detected markers: {len(objs)}")
+                    entries = []
+                    for i, o in enumerate(objs):
+                        if all(k in o for k in ("left","top","radius")):
+                            x_pct = min(max((o['left']) / 700 * 100, 0), 100)
+                            y_pct = min(max((o['top']) / 350 * 70, 0), 70)
+                            entries.append({"idx": i, "x_pct": x_pct, "y_pct": y_pct})
+                    if entries:
+                        mapping = {}
+                        names = directory.labels()
+                        team_choice = st.selectbox("Team for these markers", ["KLR","OPP"], index=0)
+                        bench_flag = st.checkbox("Mark as bench (outline only)", value=False)
+                        as_keyframe = st.checkbox("Save as keyframe (interpolate between keyframes)", value=True)
                         for e in entries:
-                            chosen = mapping.get(e['idx'])
-                            if chosen and chosen != "(skip)":
-                                pid = int(players.loc[players.apply(name, axis=1)==chosen, 'player_id'].iloc[0])
-                                execute_write(
+                            mapping[e['idx']] = st.selectbox(f"Marker {e['idx']+1}", ["(skip)"]+names, key=f"map_{e['idx']}")
+                        if st.button("Save tracking points"):
+                            rows = []
+                            for e in entries:
+                                chosen = mapping.get(e['idx'])
+                                if chosen and chosen != "(skip)":
+                                    pid = directory.id_for(chosen)
+                                    rows.append((fixture_id, time_s, pid, round(e['x_pct'],2), round(e['y_pct'],2), team_choice, int(bench_flag)))
+                            if as_keyframe:
+                                saved = keyframes.save(rows)
+                                work_rate.refresh_in_background()
+                                st.success(f"Saved {saved} keyframes.")
+                            else:
+                                saved = execute_many(
                                     "INSERT INTO tracking (fixture_id, time_s, player_id, x_pct, y_pct, team, bench) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                    (1, time_s, pid, round(e['x_pct'],2), round(e['y_pct'],2), team_choice, int(bench_flag))
+                                    rows
                                 )
-                        st.success(f"Saved {len([m for m in mapping.values() if m != '(skip)'])} tracking points.")
-                        st.cache_data.clear()
-            else:
-                st.info("Draw a few circles on the canvas to start mapping.")
-
-# --- Data Sync ---
-elif page == "Data Sync":
-    st.header("🔄 Data Sync")
-    st.write("Import latest exports from RFU GMS or Spond (CSV/XLSX). For Veo, paste share links on the Video page.")
-    up = st.file_uploader("Upload a CSV or Excel export", type=["csv","xlsx"])
-    mapping = st.selectbox("Import Type", ["Players","Availability","Fixtures","Tracking","Events"])
-    if st.button("Import") and up:
-        try:
-            if up.name.endswith(".csv"):
-                df = pd.read_csv(up)
-            else:
-                df = pd.read_excel(up)
-            st.dataframe(df.head())
-            st.info("Map your columns to the starter pack schema then save.")
-            # User mapping/validation step could be added here.
-            if st.button("Save import"):
-                df_to_sql(df, mapping.lower())
-                st.success(f"{mapping} imported.")
-                st.cache_data.clear()
-        except Exception as e:
-            st.error(f"Could not read file: {e}")
-
-# --- Settings ---
-elif page == "Settings":
-    st.header("⚙️ Settings")
-    st.subheader("Fixture")
-    with st.form("fixture_form"):
-        team = st.text_input("Team", "KLRUFC U17 Colts")
-        opposition = st.text_input("Opposition", "TBC")
-        venue = st.selectbox("Venue", ["Home","Away","Neutral"], index=0)
-        ground = st.text_input("Ground address", "Underley Park, Kirkby Lonsdale")
-        date = st.date_input("Date")
-        ko = st.time_input("Kickoff")
-        submitted = st.form_submit_button("Save fixture")
-        if submitted:
-            execute_write('''
-                INSERT OR REPLACE INTO fixtures (fixture_id, team, opposition, venue, ground_address, date, kickoff, selected_player_ids)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                1, team, opposition, venue, ground, str(date), ko.strftime("%H:%M"), ""
-            ))
-            st.success("Fixture saved.")
-            st.cache_data.clear()
-    st.subheader("Player Management")
-    if not players.empty:
-        editable = players.copy()
-        edited = st.data_editor(editable, num_rows="dynamic", use_container_width=True)
-        if st.button("Save players"):
-            df_to_sql(edited, "players")
-            st.success("Players saved.")
-            st.cache_data.clear()
+                                work_rate.refresh_in_background()
+                                st.success(f"Saved {saved} tracking points.")
+                else:
+                    st.info("Draw a few circles on the canvas to start mapping.")
+
+    # --- Data Sync ---
+    elif page == "Data Sync":
+        st.header("🔄 Data Sync")
+        st.write("Import latest exports from RFU GMS or Spond (CSV/XLSX). For Veo, paste share links on the Video page.")
+        up = st.file_uploader("Upload a CSV or Excel export", type=["csv","xlsx"])
+        mapping = st.selectbox("Import Type", list(IMPORT_TABLES))
+        table = IMPORT_TABLES[mapping]
+        source = "Mapped columns"
+        if table == "players":
+            source = st.radio("Source", ["RFU GMS export", "Spond export", "Mapped columns"], horizontal=True)
+        if up and source != "Mapped columns":
+            retire = st.checkbox("Mark players missing from this export as retired", value=source == "RFU GMS export")
+            if st.button("Sync players"):
+                try:
+                    up.seek(0)
+                    if source == "RFU GMS export":
+                        report = sync_players(parse_players_from_gms_export(up), SYNC_COLUMNS, retire)
+                    else:
+                        report = sync_players(parse_players_from_spond_csv(up), SPOND_COLUMNS, retire)
+                except Exception as e:
+                    st.error(f"Sync failed, nothing was saved: {e}")
+                    st.stop()
+                counts = report.summary()
+                st.success("Players synced: {inserted} added, {updated} updated, {retired} retired, {unchanged} unchanged.".format(**counts))
+                for label, df in (("Added", report.inserted), ("Updated", report.updated), ("Retired", report.retired)):
+                    if not df.empty:
+                        with st.expander(f"{label} ({len(df)})"):
+                            st.dataframe(df, use_container_width=True)
+        elif up:
+            try:
+                up.seek(0)
+                preview = next(read_chunks(up, up.name, chunksize=200), pd.DataFrame())
+            except Exception as e:
+                st.error(f"Could not read file: {e}")
+                st.stop()
+            st.dataframe(preview.head(), use_container_width=True)
+            st.info("Map your columns to the starter pack schema then import.")
+            targets = ["(ignore)"] + list(table_columns(table))
+            guess = suggest_mapping(preview.columns, table)
+            cols = st.columns(3)
+            col_map = {}
+            for i, col in enumerate(preview.columns):
+                default = targets.index(guess[col]) if guess.get(col) in targets else 0
+                choice = cols[i % 3].selectbox(str(col), targets, index=default, key=f"sync_{table}_{col}")
+                col_map[col] = None if choice == "(ignore)" else choice
+            modes = ["Append", "Replace"] + (["Upsert"] if table in TABLE_KEYS else [])
+            mode = st.radio("Mode", modes, horizontal=True)
+            columnar = table == "tracking" and st.checkbox(
+                "High-frequency data (GPS/Veo): store in the columnar tracking store",
+                help="Keeps sub-second positions in memory-mapped arrays per fixture; Replace applies per fixture.")
+            if st.button("Import"):
+                up.seek(0)
+                is_excel = up.name.lower().endswith(".xlsx")
+                if is_excel:
+                    # Excel parsing dominates; parsed chunks are cached by content hash for re-uploads.
+                    data = up.getvalue()
+                    chunks = cached_chunks(data, content_key(data, read_chunks), lambda buf: read_chunks(buf, up.name))
+                else:
+                    chunks = read_chunks(up, up.name)
+                bar = st.progress(0.0, text="Importing…")
+                def on_chunk(rows):
+                    done = 0.0 if is_excel else min(up.tell() / max(up.size, 1), 1.0)
+                    bar.progress(done, text=f"{rows:,} rows")
+                try:
+                    if columnar:
+                        rows = import_columnar(chunks, col_map, mode.lower(), progress=on_chunk)
+                    else:
+                        rows = import_chunks(chunks, table, col_map, mode.lower(), progress=on_chunk)
+                    bar.progress(1.0, text=f"{rows:,} rows")
+                    work_rate.refresh_in_background()
+                    st.success(f"{mapping} imported ({rows:,} rows).")
+                except Exception as e:
+                    st.error(f"Import failed, nothing was saved: {e}")
+
+    # --- Settings ---
+    elif page == "Settings":
+        st.header("⚙️ Settings")
+        players = get_players()
+        st.subheader("Fixture")
+        fixtures = get_fixtures()
+        next_id = int(fixtures['fixture_id'].max()) + 1 if not fixtures.empty else 1
+        with st.form("fixture_form"):
+            fixture_id = st.number_input("Fixture ID (an existing ID updates that fixture)", value=next_id, min_value=1, step=1)
+            team = st.text_input("Team", "KLRUFC U17 Colts")
+            opposition = st.text_input("Opposition", "TBC")
+            venue = st.selectbox("Venue", ["Home","Away","Neutral"], index=0)
+            ground = st.text_input("Ground address", "Underley Park, Kirkby Lonsdale")
+            date = st.date_input("Date")
+            ko = st.time_input("Kickoff")
+            submitted = st.form_submit_button("Save fixture")
+            if submitted:
+                # Upsert rather than replace: a REPLACE deletes the row, and its squad with it
+                execute_write('''
+                    INSERT INTO fixtures (fixture_id, team, opposition, venue, ground_address, date, kickoff)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(fixture_id) DO UPDATE SET team=excluded.team, opposition=excluded.opposition, venue=excluded.venue,
+                        ground_address=excluded.ground_address, date=excluded.date, kickoff=excluded.kickoff
+                ''', (
+                    int(fixture_id), team, opposition, venue, ground, str(date), ko.strftime("%H:%M")
+                ))
+                st.success("Fixture saved.")
+        st.subheader("Player Management")
+        if not players.empty:
+            editable = players.copy()
+            edited = st.data_editor(editable, num_rows="dynamic", use_container_width=True)
+            if st.button("Save players"):
+                changes = upsert_df(edited, "players", "player_id", delete_missing=True)
+                st.success("Players saved ({inserted} added, {updated} updated, {deleted} removed).".format(**changes))
+
+    # --- Diagnostics ---
+    elif page == "Diagnostics":
+        st.header("🩺 Diagnostics")
+        on = st.toggle("Record timings", value=diagnostics.enabled(),
+                       help="Process-wide. Set KLR_DIAGNOSTICS=1 to record from startup, "
+                            "KLR_DIAGNOSTICS_LOG=<path> to also append entries to a JSONL file.")
+        if on != diagnostics.enabled():
+            diagnostics.enable(on)
+            st.rerun()
+        log = diagnostics.frame()
+        if log.empty:
+            st.info("Nothing recorded yet. Turn recording on and use the other pages.")
+        else:
+            st.caption(f"{len(log):,} entries (newest {diagnostics.RING_SIZE:,} kept).")
+            latency = diagnostics.rerun_latency(log)
+            if "(all)" in latency.index:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Reruns", int(latency.at["(all)", "runs"]))
+                col2.metric("p50 rerun", f"{latency.at['(all)', 'p50_ms']:,.0f} ms")
+                col3.metric("p95 rerun", f"{latency.at['(all)', 'p95_ms']:,.0f} ms")
+            st.subheader("Rerun latency by page")
+            st.dataframe(latency, use_container_width=True)
+            st.subheader("Page render time")
+            st.dataframe(diagnostics.section_times(log), use_container_width=True)
+            st.subheader("Slowest queries")
+            st.dataframe(diagnostics.slowest_queries(log), use_container_width=True, hide_index=True)
+            st.subheader("Cache hit rates")
+            st.dataframe(diagnostics.cache_stats(log), use_container_width=True, hide_index=True)
+            col1, col2 = st.columns(2)
+            col1.download_button("Export JSONL", diagnostics.to_jsonl(), file_name="diagnostics.jsonl",
+                                 mime="application/x-ndjson")
+            if col2.button("Clear"):
+                diagnostics.clear()
+                st.rerun()
+finally:
+    diagnostics.end_section(_section)
+    diagnostics.end_rerun(_rerun)
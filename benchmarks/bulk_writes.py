@@ -0,0 +1,83 @@
+"""
+Rows written per second: per-row commits vs batched transactions.
+
+Times saving tracking markers one execute_write at a time against one execute_many,
+and saving an edited players table by full replace against upsert_df.
+
+    python -m benchmarks.bulk_writes --rows 3000 --players 400
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import db
+
+TRACKING_INSERT = "INSERT INTO tracking (fixture_id, time_s, player_id, x_pct, y_pct, team, bench) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def rate(rows, seconds):
+    return {"rows": rows, "seconds": round(seconds, 4), "rows_per_s": round(rows / seconds, 1) if seconds else None}
+
+
+def tracking_rows(n):
+    return [(1, i // 30, i % 30 + 1, random.random() * 100, random.random() * 70, "KLR", 0) for i in range(n)]
+
+
+def players_df(n):
+    return pd.DataFrame({
+        "player_id": range(1, n + 1),
+        "first_name": [f"First{i}" for i in range(n)],
+        "last_name": [f"Last{i}" for i in range(n)],
+        "status": "available",
+        "injury_notes": "",
+        "shirt_number": [i % 23 + 1 for i in range(n)],
+    })
+
+
+def replace_players(df):
+    """The old full-table save: every row deleted and written again, in one transaction."""
+    with db.get_pool().writer() as conn:
+        conn.execute("DELETE FROM players")
+        db.df_to_sql(df, "players")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=3000)
+    ap.add_argument("--players", type=int, default=400)
+    args = ap.parse_args()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db.use_database(Path(tmp) / "bench.db")
+        db.initialize_db()
+
+        rows = tracking_rows(args.rows)
+        results["tracking_per_row"] = rate(len(rows), timed(lambda: [db.execute_write(TRACKING_INSERT, r) for r in rows]))
+        results["tracking_execute_many"] = rate(len(rows), timed(lambda: db.execute_many(TRACKING_INSERT, rows)))
+
+        squad = players_df(args.players)
+        db.upsert_df(squad, "players", "player_id")
+        edited = squad.copy()
+        edited.loc[edited.index[::20], "status"] = "injured"
+        results["players_replace"] = rate(len(edited), timed(lambda: replace_players(edited)))
+        replace_players(squad)
+        changes = {}
+        results["players_upsert"] = rate(len(edited), timed(lambda: changes.update(db.upsert_df(edited, "players", "player_id"))))
+        results["players_upsert"]["changes"] = changes
+        db.get_pool().close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
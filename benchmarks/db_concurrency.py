@@ -0,0 +1,124 @@
+"""
+Reads/writes per second with 10 concurrent coach sessions.
+
+Compares the old connect-per-call helpers (rollback journal) with the pooled WAL
+connections in db.py. Each session thread mostly reads dashboard-style queries and
+tracking frames, and every fifth operation saves a GAME rating.
+
+    python -m benchmarks.db_concurrency --sessions 10 --seconds 5
+"""
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import db
+
+READS = (
+    ("SELECT COUNT(*) FROM players", ()),
+    ("SELECT * FROM tracking WHERE fixture_id=? AND time_s=?", None),
+    ("SELECT * FROM analysis_scores WHERE player_id=?", None),
+)
+WRITE = "INSERT INTO analysis_scores (fixture_id, player_id, go_forward, attitude, mighty_defence, energy, notes) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+def seed(path, players=30, seconds=600):
+    db.use_database(path)
+    db.initialize_db()
+    with db.get_pool().writer() as conn:
+        conn.executemany("INSERT INTO players (first_name, last_name, status) VALUES (?, ?, 'available')",
+                         [(f"P{i}", f"Player{i}") for i in range(players)])
+        conn.executemany("INSERT INTO tracking VALUES (1, ?, ?, ?, ?, 'KLR', 0)",
+                         [(t, p, random.random() * 100, random.random() * 70)
+                          for t in range(seconds) for p in range(1, players + 1)])
+
+
+def _params(i, rng):
+    query, params = READS[i % len(READS)]
+    if params is None:
+        params = (1, rng.randrange(600)) if "tracking" in query else (rng.randrange(1, 31),)
+    return query, params
+
+
+def legacy_ops(path):
+    # The pre-pool helpers: a fresh connection and default journal for every call.
+    def read(query, params):
+        with sqlite3.connect(path) as conn:
+            pd.read_sql_query(query, conn, params=params)
+
+    def write(params):
+        with sqlite3.connect(path) as conn:
+            conn.execute(WRITE, params)
+            conn.commit()
+    return read, write
+
+
+def pooled_ops():
+    return db.fetch_df, lambda params: db.execute_write(WRITE, params)
+
+
+def run(read, write, sessions, seconds):
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def session(n):
+        rng = random.Random(n)
+        reads = writes = errors = i = 0
+        while time.perf_counter() < stop:
+            i += 1
+            try:
+                if i % 5 == 0:
+                    write((1, rng.randrange(1, 31), 5, 5, 5, 5, "bench"))
+                    writes += 1
+                else:
+                    read(*_params(i, rng))
+                    reads += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            counts["reads"] += reads
+            counts["writes"] += writes
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+        "writes_per_s": round(counts["writes"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args()
+    results = {"sessions": args.sessions, "seconds": args.seconds}
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "legacy.db"
+        seed(legacy_path)
+        # Seeding goes through the pool, so drop WAL again to measure the old setup.
+        db.get_pool().close()
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        results["legacy"] = run(*legacy_ops(legacy_path), args.sessions, args.seconds)
+
+        seed(Path(tmp) / "pooled.db")
+        results["pooled"] = run(*pooled_ops(), args.sessions, args.seconds)
+        db.get_pool().close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
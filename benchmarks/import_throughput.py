@@ -0,0 +1,95 @@
+"""
+Tracking-export import throughput and peak memory.
+
+Writes a synthetic tracking CSV, then imports it with the old read-everything +
+to_sql path and with data_sync's chunked pipeline, reporting rows/s and the peak
+traced allocation for each (from a second, traced run: tracemalloc skews timings).
+Both load into the real `tracking` table, indexes and triggers included, of a freshly
+initialized database; chunked_vs_read_all below 1.0 means the chunked path is slower.
+
+    python -m benchmarks.import_throughput --rows 1000000
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_sync
+import db
+
+
+def write_export(path, rows):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Fixture": 1,
+        "Time": np.arange(rows) // 30,
+        "Player ID": np.arange(rows) % 30 + 1,
+        "X": rng.uniform(0, 100, rows).round(2),
+        "Y": rng.uniform(0, 70, rows).round(2),
+        "Team": np.where(np.arange(rows) % 30 < 15, "KLR", "OPP"),
+        "Bench": 0,
+    })
+    df.to_csv(path, index=False)
+
+
+def measure(fn, setup):
+    setup()
+    start = time.perf_counter()
+    rows = fn()
+    seconds = time.perf_counter() - start
+    setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"rows": rows, "seconds": round(seconds, 3), "rows_per_s": round(rows / seconds, 1),
+            "peak_mib": round(peak / 2**20, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--chunk", type=int, default=data_sync.CHUNK_ROWS)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        export = Path(tmp) / "tracking.csv"
+        write_export(export, args.rows)
+
+        runs = iter(range(5))
+
+        def fresh_db():
+            db.get_pool().close()
+            db.use_database(Path(tmp) / f"bench_{next(runs)}.db")
+            db.initialize_db()
+
+        fresh_db()
+        mapping = data_sync.suggest_mapping(pd.read_csv(export, nrows=5).columns, "tracking")
+
+        def whole_file():
+            cols = {src: dst for src, dst in mapping.items() if dst}
+            df = pd.read_csv(export)[list(cols)].rename(columns=cols)
+            db.df_to_sql(df, "tracking", if_exists="append")
+            return len(df)
+
+        def chunked():
+            return data_sync.import_chunks(data_sync.read_chunks(export, export.name, args.chunk),
+                                           "tracking", mapping, "append")
+
+        results = {
+            "file_mib": round(export.stat().st_size / 2**20, 1),
+            "read_all_to_sql": measure(whole_file, fresh_db),
+            "chunked_import": measure(chunked, fresh_db),
+        }
+        results["chunked_vs_read_all"] = round(
+            results["chunked_import"]["rows_per_s"] / results["read_all_to_sql"]["rows_per_s"], 2)
+        db.get_pool().close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
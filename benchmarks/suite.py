@@ -0,0 +1,294 @@
+"""
+Headless benchmark suite over a synthetic season.
+
+Builds a season with synthetic_season into a throwaway database (or uses --db),
+then times:
+
+- every sidebar page, driven through Streamlit's AppTest: the first (cold) run and
+  warm reruns, with the diagnostics cache hit rates collected along the way;
+- the DB helpers and derived-data builders the pages call;
+- the GMS and Spond player parsers, with and without the import cache;
+- pitch rendering, playback payloads and a match report page.
+
+Results are JSON. --compare takes an earlier run and reports the p50 ratio for each
+timing; with --threshold, the exit status is 1 when any ratio is above it.
+
+    python -m benchmarks.suite --fixtures 25 --minutes 20 --out bench.json
+    python -m benchmarks.suite --compare bench.json --threshold 1.25
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import db
+import diagnostics
+import event_links
+import game_scores
+import reports
+import spatial
+import synthetic_season
+import tracking_store
+import work_rate
+from event_index import EventIndex, load_events
+from gms_importer import parse_players_from_gms_export
+from pitch_render import render_frame, render_heatmap, render_network, static_pitch
+from playback import build_payload
+from player_directory import PlayerDirectory
+from spond_importer import parse_players_from_spond_csv
+
+ROOT = Path(__file__).resolve().parents[1]
+PAGES = ["Dashboard", "Selection & Availability", "Player Analysis (GAME)", "Video & Tracking", "Data Sync",
+         "Settings", "Diagnostics"]
+
+
+def measure(fn, repeat=5):
+    """Run fn `repeat` times; latency stats in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    t = np.array(times)
+    return {"n": len(t), "mean_ms": round(float(t.mean()), 3), "p50_ms": round(float(np.median(t)), 3),
+            "p95_ms": round(float(np.percentile(t, 95)), 3), "min_ms": round(float(t.min()), 3)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# --- Pages ---
+
+def bench_pages(repeat, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    results, errors = {}, {}
+    diagnostics.clear()
+    diagnostics.enable(True)
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=timeout)
+    try:
+        start = time.perf_counter()
+        at.run()
+        results["app:first_run"] = {"n": 1, "p50_ms": round((time.perf_counter() - start) * 1000, 3)}
+        if at.exception or not len(at.sidebar.radio):
+            # Without the sidebar there are no pages to visit; report why and move on.
+            errors["(startup)"] = [str(e.message) for e in at.exception] or ["no page selector in the sidebar"]
+            return results, errors, []
+        for page in PAGES:
+            try:
+                at.sidebar.radio[0].set_value(page)
+                start = time.perf_counter()
+                at.run()
+                results[f"page:{page}:cold"] = {"n": 1, "p50_ms": round((time.perf_counter() - start) * 1000, 3)}
+                results[f"page:{page}:warm"] = measure(at.run, repeat)
+            except Exception as e:  # a timeout or a page that broke the sidebar
+                errors[page] = [f"{type(e).__name__}: {e}"]
+                continue
+            if at.exception:
+                errors[page] = [str(e.message) for e in at.exception]
+        caches = diagnostics.cache_stats()
+    except Exception as e:
+        errors["(startup)"] = [f"{type(e).__name__}: {e}"]
+        return results, errors, []
+    finally:
+        diagnostics.enable(False)
+    return results, errors, caches.to_dict(orient="records")
+
+
+# --- DB helpers and derived data ---
+
+def bench_db(fixture_id, repeat):
+    bounds = tracking_store.bounds(fixture_id) or (0, 0)
+    probes = np.random.default_rng(3).uniform(*bounds, repeat)
+    probe = iter(np.tile(probes, 4))
+    rows = [(fixture_id, 10_000 + i, 1, 50.0, 35.0, "KLR", 0) for i in range(1000)]
+    insert = "INSERT INTO tracking (fixture_id, time_s, player_id, x_pct, y_pct, team, bench) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+    def mark_all_game():
+        db.execute_write("INSERT OR IGNORE INTO game_scores_dirty SELECT DISTINCT player_id FROM analysis_scores")
+        game_scores.refresh()
+
+    def mark_fixture_work_rate():
+        db.execute_write("INSERT OR IGNORE INTO work_rate_dirty (fixture_id, player_id) VALUES (?, NULL)", (fixture_id,))
+        work_rate.refresh()
+
+    def write_and_delete():
+        db.execute_many(insert, rows)
+        db.execute_write("DELETE FROM tracking WHERE fixture_id=? AND time_s >= 10000", (fixture_id,))
+
+    index = EventIndex(load_events())
+    return {
+        "db:fetch_df:players": measure(lambda: db.fetch_df("SELECT * FROM players"), repeat),
+        "db:fetch_df:events": measure(lambda: db.fetch_df("SELECT * FROM events"), repeat),
+        "db:table_version": measure(lambda: db.table_version("tracking"), repeat),
+        "db:dashboard_counts": measure(db.dashboard_counts, repeat),
+        "db:selection": measure(lambda: db.selection(fixture_id), repeat),
+        "db:selection_counts": measure(db.selection_counts, repeat),
+        "db:selected_unavailable": measure(db.selected_unavailable, repeat),
+        "db:execute_many_1000_and_delete": measure(write_and_delete, repeat),
+        "tracking:bounds": measure(lambda: tracking_store.bounds(fixture_id), repeat),
+        "tracking:snapshot": measure(lambda: tracking_store.snapshot(fixture_id, next(probe)), repeat),
+        "tracking:range_60s": measure(lambda: tracking_store.time_range(fixture_id, bounds[0], bounds[0] + 60), repeat),
+        "tracking:range_fixture": measure(lambda: tracking_store.time_range(fixture_id, *bounds), max(1, repeat // 2)),
+        "events:index_build": measure(lambda: EventIndex(load_events()), repeat),
+        "events:followed_by": measure(lambda: index.followed_by("Tackle", "Turnover Won", 10), repeat),
+        "events:per_block": measure(lambda: index.per_block("Carry"), repeat),
+        "event_links:resolve": measure(lambda: event_links.resolve(fixture_id), max(1, repeat // 2)),
+        "spatial:compute": measure(lambda: spatial._compute(fixture_id, db.fixture_tracking_version(fixture_id)),
+                                   max(1, repeat // 2)),
+        "spatial:load_cached": measure(lambda: spatial.load(fixture_id), repeat),
+        "work_rate:refresh_fixture": measure(mark_fixture_work_rate, max(1, repeat // 2)),
+        "game_scores:refresh_all": measure(mark_all_game, repeat),
+    }
+
+
+# --- Importers ---
+
+def bench_importers(tmp, players, repeat):
+    rng = np.random.default_rng(4)
+    gms = pd.DataFrame({
+        "RFU ID": 2_000_000 + np.arange(players),
+        "First Name": rng.choice(synthetic_season.FIRST_NAMES, players),
+        "Last Name": rng.choice(synthetic_season.LAST_NAMES, players),
+        "Front Row Trained": rng.choice(["Yes", "No"], players),
+        "Suspected Concussions": rng.integers(0, 2, players),
+    })
+    gms_csv, gms_xlsx, spond_csv = tmp / "gms.csv", tmp / "gms.xlsx", tmp / "spond.csv"
+    gms.to_csv(gms_csv, index=False)
+    gms.to_excel(gms_xlsx, index=False)
+    gms.rename(columns={"First Name": "First name", "Last Name": "Surname"}).to_csv(spond_csv, index=False)
+    results = {}
+    for name, parser, path in (("gms_csv", parse_players_from_gms_export, gms_csv),
+                               ("gms_xlsx", parse_players_from_gms_export, gms_xlsx),
+                               ("spond_csv", parse_players_from_spond_csv, spond_csv)):
+        results[f"import:{name}:parse"] = measure(lambda: parser(path, use_cache=False), repeat)
+        parser(path)  # fill the cache
+        results[f"import:{name}:cached"] = measure(lambda: parser(path), repeat)
+    return results
+
+
+# --- Rendering ---
+
+def bench_rendering(fixture_id, repeat):
+    bounds = tracking_store.bounds(fixture_id) or (0, 0)
+    directory = PlayerDirectory(db.fetch_df("SELECT * FROM players"))
+    mid = (bounds[0] + bounds[1]) / 2
+    snap = tracking_store.snapshot(fixture_id, mid).merge(
+        directory.frame[["player_id", "first_name", "last_name", "shirt_number"]], on="player_id", how="left")
+    links = event_links.resolve(fixture_id)
+    arrows = event_links.overlay(links, mid, window=60)
+    nodes, edges = event_links.passing_network(links)
+    grids, _ = spatial.load(fixture_id)
+    tracking = tracking_store.time_range(fixture_id, *bounds)
+    events = EventIndex(load_events()).fixture(fixture_id).frame
+    context = reports.gather(fixture_id)
+    first = context["players"][0] if context["players"] else None
+    results = {
+        "render:static_pitch_uncached": measure(static_pitch.__wrapped__, repeat),
+        "render:frame": measure(lambda: render_frame(snap, arrows), repeat),
+        "render:heatmap": measure(lambda: render_heatmap(grids["KLR"]), repeat),
+        "render:passing_network": measure(lambda: render_network(nodes, edges), repeat),
+        "playback:build_payload": measure(lambda: build_payload(tracking, events, directory.frame), max(1, repeat // 2)),
+        "reports:gather": measure(lambda: reports.gather(fixture_id), max(1, repeat // 2)),
+    }
+    if first is not None:
+        results["reports:render_pdf"] = measure(lambda: reports.render_report(context, first, "pdf"), repeat)
+    return results
+
+
+# --- Comparison ---
+
+def compare(current, baseline):
+    """p50 ratio (current / baseline) for every timing present in both runs."""
+    old = baseline.get("results", {})
+    out = {}
+    for name, stats in current["results"].items():
+        before = old.get(name, {}).get("p50_ms")
+        if before:
+            out[name] = round(stats["p50_ms"] / before, 3)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--fixtures", type=int, default=25)
+    ap.add_argument("--teams", type=int, default=2)
+    ap.add_argument("--minutes", type=float, default=20, help="tracked minutes per synthetic fixture")
+    ap.add_argument("--hz", type=float, default=10)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--import-players", type=int, default=2000, help="rows in the synthetic GMS/Spond exports")
+    ap.add_argument("--page-timeout", type=float, default=120, help="seconds allowed per AppTest run")
+    ap.add_argument("--skip", nargs="*", default=[], choices=["pages", "db", "importers", "rendering"])
+    ap.add_argument("--db", default=None, help="benchmark an existing database instead of a synthetic one")
+    ap.add_argument("--out", default=None, help="write JSON here as well as to stdout")
+    ap.add_argument("--compare", default=None, help="earlier JSON output to compare against")
+    ap.add_argument("--threshold", type=float, default=None, help="fail when any p50 ratio exceeds this")
+    args = ap.parse_args()
+
+    out = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "threshold")},
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if args.db:
+            db.use_database(args.db)
+            synthetic_season.use_data_dir(synthetic_season.data_dir_for(args.db))
+            db.initialize_db()
+        else:
+            db.use_database(tmp / "bench.db")
+            synthetic_season.use_data_dir(tmp)
+            db.initialize_db()
+            out["season"] = synthetic_season.generate(args.fixtures, args.teams, args.minutes, args.hz, args.seed)
+        fixture_id = int(db.fetch_one("SELECT COALESCE(MAX(fixture_id), 0) FROM fixtures")[0])
+
+        if "db" not in args.skip and fixture_id:
+            out["results"].update(bench_db(fixture_id, args.repeat))
+        if "importers" not in args.skip:
+            out["results"].update(bench_importers(tmp, args.import_players, args.repeat))
+        if "rendering" not in args.skip and fixture_id:
+            out["results"].update(bench_rendering(fixture_id, args.repeat))
+        if "pages" not in args.skip:
+            pages, errors, caches = bench_pages(args.repeat, args.page_timeout)
+            out["results"].update(pages)
+            out["page_errors"] = errors
+            out["cache_hit_rates"] = caches
+        db.get_pool().close()
+
+    status = 0
+    if args.compare:
+        ratios = compare(out, json.loads(Path(args.compare).read_text()))
+        out["compare"] = {"baseline": args.compare, "p50_ratio": ratios}
+        if args.threshold is not None:
+            out["compare"]["regressions"] = {k: r for k, r in ratios.items() if r > args.threshold}
+            status = 1 if out["compare"]["regressions"] else 0
+    if out.get("page_errors"):
+        status = 1
+    text = json.dumps(out, indent=2, default=str)
+    if args.out:
+        Path(args.out).write_text(text)
+    print(text)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+SQLite tracking table vs the columnar store for one high-frequency fixture.
+
+Loads an 80-minute, 30-player, 10 Hz fixture both ways and reports open/load time,
+resident size of the loaded data and snapshot/range query latency.
+
+    python -m benchmarks.tracking_store --hz 10 --minutes 80
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import db
+import tracking_store
+
+
+def synthetic_fixture(hz, minutes, players=30):
+    n = int(hz * minutes * 60)
+    t = np.repeat(np.arange(n) / hz, players)
+    pid = np.tile(np.arange(1, players + 1), n)
+    rng = np.random.default_rng(1)
+    walk = np.cumsum(rng.normal(0, 0.3, size=(2, n * players)), axis=1)
+    return pd.DataFrame({
+        "fixture_id": 1, "time_s": t, "player_id": pid,
+        "x_pct": np.mod(walk[0], 100).round(2), "y_pct": np.mod(walk[1], 70).round(2),
+        "team": np.where(pid <= players // 2, "KLR", "OPP"), "bench": 0,
+    })
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return out, (time.perf_counter() - start) / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--hz", type=float, default=10)
+    ap.add_argument("--minutes", type=float, default=80)
+    args = ap.parse_args()
+    df = synthetic_fixture(args.hz, args.minutes)
+    results = {"rows": len(df)}
+    with tempfile.TemporaryDirectory() as tmp:
+        db.use_database(Path(tmp) / "bench.db")
+        db.initialize_db()
+        tracking_store.STORE_DIR = Path(tmp) / "tracking_store"
+        rng = np.random.default_rng(2)
+        probes = rng.uniform(0, args.minutes * 60, 200).round()
+
+        db.execute_many("INSERT INTO tracking VALUES (?, ?, ?, ?, ?, ?, ?)", db.records(df))
+        table, load_s = timed(lambda: db.fetch_df("SELECT * FROM tracking WHERE fixture_id=1"))
+        _, snap_s = timed(lambda: [db.tracking_snapshot(1, t) for t in probes])
+        results["sqlite"] = {
+            "load_s": round(load_s, 3),
+            "loaded_mib": round(table.memory_usage(deep=True).sum() / 2**20, 1),
+            "snapshot_ms": round(snap_s / len(probes) * 1000, 3),
+        }
+        del table
+
+        _, ingest_s = timed(lambda: tracking_store.ingest(1, df))
+        fx, open_s = timed(lambda: tracking_store.ColumnarFixture(tracking_store.fixture_dir(1)))
+        _, snap_s = timed(lambda: [fx.snapshot(t) for t in probes])
+        _, range_s = timed(lambda: fx.range(600, 660))
+        results["columnar"] = {
+            "ingest_s": round(ingest_s, 3),
+            "open_s": round(open_s, 5),
+            "on_disk_mib": round(sum(p.stat().st_size for p in tracking_store.fixture_dir(1).iterdir()) / 2**20, 1),
+            "snapshot_ms": round(snap_s / len(probes) * 1000, 3),
+            "range_60s_ms": round(range_s * 1000, 3),
+        }
+        db.get_pool().close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Streaming importer for the Data Sync page.
+
+Exports are read in fixed-size chunks, columns are mapped onto the tables created by
+db.initialize_db(), values are coerced column-at-a-time and every chunk is written
+inside one transaction, so memory stays bounded by the chunk size rather than the file.
+"""
+import re
+
+import pandas as pd
+
+import db
+import tracking_store
+
+CHUNK_ROWS = 50_000
+
+IMPORT_TABLES = {
+    "Players": "players",
+    "Availability": "availability",
+    "Fixtures": "fixtures",
+    "Tracking": "tracking",
+    "Events": "events",
+    "Selection": "fixture_selection",
+}
+# Tables with a primary key can be upserted; the rest are append-only.
+TABLE_KEYS = {"players": "player_id", "fixtures": "fixture_id", "fixture_selection": "fixture_id, player_id"}
+
+# Common export headings -> schema columns (compared after normalizing, see _norm).
+COLUMN_ALIASES = {
+    "firstname": "first_name", "givenname": "first_name", "forename": "first_name",
+    "lastname": "last_name", "surname": "last_name", "familyname": "last_name",
+    "shirt": "shirt_number", "number": "shirt_number", "shirtno": "shirt_number",
+    "injury": "injury_notes", "injurynotes": "injury_notes",
+    "player": "player_id", "playerid": "player_id", "id": "player_id",
+    "fixture": "fixture_id", "fixtureid": "fixture_id", "match": "fixture_id", "matchid": "fixture_id",
+    "time": "time_s", "times": "time_s", "seconds": "time_s", "timestamp": "time_s",
+    "x": "x_pct", "xpct": "x_pct", "y": "y_pct", "ypct": "y_pct",
+    "available": "available", "availability": "available", "attending": "available",
+    "ko": "kickoff", "kickofftime": "kickoff", "ground": "ground_address", "address": "ground_address",
+    "pos": "position", "role": "position",
+    "opponent": "opposition", "opponents": "opposition", "action": "event", "eventtype": "event",
+}
+
+_TRUTHY = {"true": 1, "yes": 1, "y": 1, "attending": 1, "accepted": 1,
+           "false": 0, "no": 0, "n": 0, "declined": 0, "unavailable": 0}
+
+
+def _norm(col):
+    return re.sub(r"[^a-z0-9]", "", str(col).lower())
+
+
+def read_chunks(source, filename, chunksize=CHUNK_ROWS):
+    """Yield DataFrames of at most `chunksize` rows from a CSV or XLSX path/file object."""
+    if str(filename).lower().endswith(".csv"):
+        yield from pd.read_csv(source, chunksize=chunksize)
+        return
+    # openpyxl's read-only mode streams rows instead of loading the whole workbook.
+    from openpyxl import load_workbook
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else f"column_{i}" for i, h in enumerate(next(rows, ()))]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        wb.close()
+
+
+def suggest_mapping(columns, table):
+    """Best-guess source column -> schema column (None to ignore) for a table."""
+    schema = {_norm(c): c for c in db.table_columns(table)}
+    mapping, used = {}, set()
+    for col in columns:
+        key = _norm(col)
+        target = schema.get(key) or (COLUMN_ALIASES.get(key) if COLUMN_ALIASES.get(key) in schema.values() else None)
+        mapping[col] = target if target not in used else None
+        used.add(mapping[col])
+    return mapping
+
+
+def coerce_chunk(df, mapping, schema):
+    """Rename mapped columns and cast them to the schema's declared types."""
+    cols = {src: dst for src, dst in mapping.items() if dst and src in df.columns}
+    out = df[list(cols)].rename(columns=cols)
+    for col in out.columns:
+        kind = schema[col].upper()
+        if "INT" in kind:
+            src = out[col]
+            if pd.api.types.is_bool_dtype(src):
+                out[col] = src.astype("Int64")
+                continue
+            num = pd.to_numeric(src, errors="coerce")
+            if pd.api.types.is_integer_dtype(num):
+                out[col] = num.astype("Int64")
+                continue
+            if pd.api.types.is_object_dtype(src) or pd.api.types.is_string_dtype(src):
+                # Only text that didn't parse as a number is looked up as yes/no.
+                words = num.isna() & src.notna()
+                if words.any():
+                    num = num.mask(words, src[words].astype(str).str.strip().str.lower().map(_TRUTHY))
+            # Whole numbers become integers; fractional values (e.g. sub-second times) stay REAL.
+            out[col] = num.round().astype("Int64") if (num.dropna() % 1 == 0).all() else num
+        elif "REAL" in kind:
+            out[col] = pd.to_numeric(out[col], errors="coerce")
+        else:
+            out[col] = out[col].astype("string").str.strip()
+    return out
+
+
+def import_chunks(chunks, table, mapping, mode="append", progress=None):
+    """
+    Write coerced chunks into `table` in a single transaction.
+
+    mode is "append", "upsert" (tables in TABLE_KEYS only) or "replace" (the table
+    ends up holding just the imported rows). `progress(rows_so_far)` is called after
+    each chunk. Returns the number of rows written.
+    """
+    schema = db.table_columns(table)
+    key = TABLE_KEYS.get(table)
+    if mode == "upsert" and not key:
+        raise ValueError(f"{table} has no key to upsert on")
+    key_cols = key.split(", ") if key else []
+    # Replacing a keyed table upserts every row and then deletes the ones the file
+    # didn't contain, so ids present in both keep their squads (a blanket DELETE would
+    # fire the fixture/player delete triggers for every row).
+    keep_ids = mode == "replace" and key_cols and set(key_cols) <= {dst for dst in mapping.values() if dst}
+    written = 0
+    with db.get_pool().writer() as conn:
+        if mode == "replace" and not keep_ids:
+            if table in db.MARKED_TABLES:
+                db.mark_rows(conn, table)
+                with db.bulk_marks(conn, table):
+                    conn.execute(f"DELETE FROM {table}")
+            else:
+                conn.execute(f"DELETE FROM {table}")
+        if keep_ids:
+            conn.execute("DROP TABLE IF EXISTS temp.import_keys")
+            conn.execute(f"CREATE TEMP TABLE import_keys ({key}, PRIMARY KEY ({key}))")
+            existing = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+        for chunk in chunks:
+            out = coerce_chunk(chunk, mapping, schema)
+            if out.empty or not len(out.columns):
+                continue
+            cols = list(out.columns)
+            sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+            if (mode == "upsert" or keep_ids) and key_cols and set(key_cols) <= set(cols):
+                # A replace also clears columns the file doesn't have (excluded.* holds their defaults).
+                updates = [c for c in (schema if keep_ids else cols) if c not in key_cols]
+                sql += f" ON CONFLICT({key}) DO " + (
+                    "UPDATE SET " + ", ".join(f"{c}=excluded.{c}" for c in updates) if updates else "NOTHING"
+                )
+            if db.appended_table(sql) in db.MARKED_TABLES:
+                # Marks work_rate_dirty and the fixture versions once per chunk, not per row.
+                with db.bulk_marks(conn, table):
+                    conn.executemany(sql, db.records(out))
+            else:
+                conn.executemany(sql, db.records(out))
+            if keep_ids:
+                conn.executemany(f"INSERT OR IGNORE INTO import_keys VALUES ({', '.join('?' * len(key_cols))})",
+                                 db.records(out[key_cols].dropna()))
+            written += len(out)
+            if progress:
+                progress(written)
+        if keep_ids:
+            # Rows added by this import without a key got fresh ids above `existing`.
+            conn.execute(f"DELETE FROM {table} WHERE rowid <= ? AND ({key}) NOT IN (SELECT {key} FROM import_keys)",
+                         (existing,))
+            conn.execute("DROP TABLE temp.import_keys")
+        # Deleted fixtures/players take their squad rows with them (see the delete triggers).
+        cascades = ["fixture_selection"] if mode == "replace" and table in ("players", "fixtures") else []
+        db.bump_versions(conn, [table] + cascades)
+    return written
+
+
+def import_columnar(chunks, mapping, mode="replace", progress=None):
+    """
+    Route a tracking export into the columnar store (see tracking_store) instead of
+    the SQLite table. Chunks are reduced to compact arrays per fixture as they stream
+    in, then each fixture is written in one go. Returns the number of rows stored.
+    """
+    schema = db.table_columns("tracking")
+    if "fixture_id" not in {dst for dst in mapping.values() if dst}:
+        raise ValueError("Map a column to fixture_id to store tracking by fixture")
+    parts, written = {}, 0
+    for chunk in chunks:
+        out = coerce_chunk(chunk, mapping, schema).dropna(subset=["fixture_id"])
+        for fixture_id, grp in out.groupby("fixture_id"):
+            parts.setdefault(int(fixture_id), []).append(tracking_store.to_columns(grp))
+        written += len(out)
+        if progress:
+            progress(written)
+    for fixture_id, cols in parts.items():
+        tracking_store.ingest(fixture_id, cols, mode="append" if mode == "append" else "replace")
+    return written
@@ -0,0 +1,713 @@
+"""
+SQLite data layer for the coaching hub.
+
+Kept free of Streamlit so the importers and scripts can share it with app.py.
+"""
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import diagnostics
+
+DATA_DIR = Path(__file__).parent / "data"
+DB_PATH = DATA_DIR / "club.db"
+
+# WAL lets readers carry on while a coach is saving; NORMAL sync is safe under WAL
+# and avoids an fsync per commit. mmap and a 64 MiB page cache keep hot tables in memory.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+MAX_READERS = 16
+
+# Let numpy scalars from DataFrames bind as query parameters.
+for _t in (np.int64, np.int32, np.int16, np.int8, np.uint8):
+    sqlite3.register_adapter(_t, int)
+sqlite3.register_adapter(np.float32, float)
+sqlite3.register_adapter(np.bool_, bool)
+
+
+class ConnectionPool:
+    """
+    Shared connections for every Streamlit session in the process.
+
+    Reads borrow one of up to `max_readers` connections; writes go through a single
+    writer connection behind a lock, one transaction per `writer()` block.
+    """
+
+    def __init__(self, path, max_readers=MAX_READERS):
+        self.path = Path(path)
+        self._readers = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_readers)
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._all = []
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+                conn.execute("PRAGMA query_only=1")
+            try:
+                yield conn
+            finally:
+                self._readers.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+            if conn.in_transaction:
+                # Nested writer() blocks join the outer transaction.
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        with self._write_lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._writer = None
+            self._readers = queue.LifoQueue()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def use_database(path):
+    """Point the data layer at another database file (scripts and benchmarks)."""
+    global _pool, DB_PATH
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        DB_PATH = Path(path)
+        _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+# Tables whose rows feed work_rate (marked in work_rate_dirty) and the subset that
+# also carries per-fixture "tracking:<id>" versions.
+MARKED_TABLES = ("tracking", "tracking_keyframes", "events")
+VERSIONED_TABLES = ("tracking", "tracking_keyframes")
+
+
+def initialize_db():
+    with get_pool().writer() as conn:
+        c = conn.cursor()
+        # Players
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS players (
+                player_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                first_name TEXT,
+                last_name TEXT,
+                status TEXT,
+                injury_notes TEXT,
+                shirt_number INTEGER
+            )
+        ''')
+        # Columns the GMS/Spond exports carry, added to databases created before them
+        add_missing_columns(conn, "players", {
+            "rfu_id": "TEXT",
+            "front_row_trained": "TEXT",
+            "suspected_concussions": "INTEGER",
+            "position": "TEXT",
+        })
+        c.execute("CREATE INDEX IF NOT EXISTS idx_players_rfu_id ON players (rfu_id)")
+        # Fixtures
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS fixtures (
+                fixture_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                team TEXT,
+                opposition TEXT,
+                venue TEXT,
+                ground_address TEXT,
+                date TEXT,
+                kickoff TEXT,
+                selected_player_ids TEXT
+            )
+        ''')
+        # Availability
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS availability (
+                player_id INTEGER,
+                available INTEGER,
+                reason TEXT
+            )
+        ''')
+        # Availability can be per fixture; rows without a fixture_id apply to every fixture
+        add_missing_columns(conn, "availability", {"fixture_id": "INTEGER"})
+        c.execute("CREATE INDEX IF NOT EXISTS idx_availability_player_fixture ON availability (player_id, fixture_id)")
+        # Selected squads, one row per fixture and player. Replaces fixtures.selected_player_ids,
+        # which is migrated once and no longer written.
+        migrate_selection = not table_columns("fixture_selection", conn)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS fixture_selection (
+                fixture_id INTEGER NOT NULL,
+                player_id INTEGER NOT NULL,
+                shirt_number INTEGER,
+                position TEXT,
+                PRIMARY KEY (fixture_id, player_id)
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_selection_player_fixture ON fixture_selection (player_id, fixture_id)")
+        c.execute("CREATE TRIGGER IF NOT EXISTS trg_fixtures_delete_selection AFTER DELETE ON fixtures "
+                  "BEGIN DELETE FROM fixture_selection WHERE fixture_id=OLD.fixture_id; END")
+        c.execute("CREATE TRIGGER IF NOT EXISTS trg_players_delete_selection AFTER DELETE ON players "
+                  "BEGIN DELETE FROM fixture_selection WHERE player_id=OLD.player_id; END")
+        if migrate_selection:
+            _migrate_selected_player_ids(conn)
+        # Analysis
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_scores (
+                fixture_id INTEGER,
+                player_id INTEGER,
+                go_forward INTEGER,
+                attitude INTEGER,
+                mighty_defence INTEGER,
+                energy INTEGER,
+                notes TEXT
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_scores_player_fixture ON analysis_scores (player_id, fixture_id)")
+        # Materialized GAME aggregates (see game_scores.py). Triggers mark players whose
+        # ratings changed; game_scores.refresh() rebuilds just those players' rows.
+        backfill_game = not table_columns("game_player_summary", conn)
+        metrics = ("go_forward", "attitude", "mighty_defence", "energy")
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS game_fixture_scores (
+                player_id INTEGER,
+                fixture_id INTEGER,
+                season TEXT,
+                seq INTEGER,
+                ratings INTEGER,
+                {", ".join(f"{m} REAL, rolling_{m} REAL" for m in metrics)},
+                PRIMARY KEY (player_id, fixture_id)
+            )
+        ''')
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS game_player_summary (
+                player_id INTEGER PRIMARY KEY,
+                season TEXT,
+                fixtures INTEGER,
+                last_fixture_id INTEGER,
+                {", ".join(f"latest_{m} REAL, rolling_{m} REAL, season_{m} REAL, trend_{m} REAL" for m in metrics)}
+            )
+        ''')
+        c.execute("CREATE TABLE IF NOT EXISTS game_scores_dirty (player_id INTEGER PRIMARY KEY)")
+        for op, rows in (("INSERT", ["NEW"]), ("DELETE", ["OLD"]), ("UPDATE", ["OLD", "NEW"])):
+            marks = " ".join(f"INSERT OR IGNORE INTO game_scores_dirty (player_id) "
+                             f"SELECT {r}.player_id WHERE {r}.player_id IS NOT NULL;" for r in rows)
+            c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_analysis_scores_{op.lower()}_game "
+                      f"AFTER {op} ON analysis_scores BEGIN {marks} END")
+        # Fixture dates order the aggregates, so a new or re-dated fixture re-sorts its players.
+        for op in ("INSERT", "UPDATE OF date"):
+            c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_fixtures_{op.split()[0].lower()}_game "
+                      f"AFTER {op} ON fixtures BEGIN "
+                      f"INSERT OR IGNORE INTO game_scores_dirty (player_id) SELECT DISTINCT player_id FROM analysis_scores "
+                      f"WHERE fixture_id=NEW.fixture_id AND player_id IS NOT NULL; END")
+        if backfill_game:
+            c.execute("INSERT OR IGNORE INTO game_scores_dirty SELECT DISTINCT player_id FROM analysis_scores WHERE player_id IS NOT NULL")
+        # Tracking
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS tracking (
+                fixture_id INTEGER,
+                time_s INTEGER,
+                player_id INTEGER,
+                x_pct REAL,
+                y_pct REAL,
+                team TEXT,
+                bench INTEGER
+            )
+        ''')
+        # Snapshot lookups (one frame) and per-player runs within a fixture
+        c.execute("CREATE INDEX IF NOT EXISTS idx_tracking_fixture_time_player ON tracking (fixture_id, time_s, player_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_tracking_fixture_player_time ON tracking (fixture_id, player_id, time_s)")
+        # Sparse coach-placed keyframes; positions in between are interpolated on read
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS tracking_keyframes (
+                fixture_id INTEGER,
+                time_s REAL,
+                player_id INTEGER,
+                x_pct REAL,
+                y_pct REAL,
+                team TEXT,
+                bench INTEGER
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_keyframes_fixture_player_time ON tracking_keyframes (fixture_id, player_id, time_s)")
+        # Events
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                fixture_id INTEGER,
+                time_s INTEGER,
+                event TEXT,
+                player_id INTEGER,
+                notes TEXT
+            )
+        ''')
+        # Which side the event belongs to (KLR/OPP), for same-team sequence queries
+        add_missing_columns(conn, "events", {"team": "TEXT"})
+        c.execute("CREATE INDEX IF NOT EXISTS idx_events_fixture_time ON events (fixture_id, time_s)")
+        # Work-rate summaries (see work_rate.py), one row per fixture and player
+        backfill_work_rate = not table_columns("work_rate", conn)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS work_rate (
+                fixture_id INTEGER,
+                player_id INTEGER,
+                distance_m REAL,
+                walk_m REAL,
+                jog_m REAL,
+                run_m REAL,
+                sprint_m REAL,
+                sprints INTEGER,
+                max_speed REAL,
+                minutes_on REAL,
+                involvements INTEGER,
+                PRIMARY KEY (fixture_id, player_id)
+            )
+        ''')
+        # Fixture/player segments whose summaries are stale. Triggers mark them as
+        # tracking, keyframes and events change; a NULL player_id means the whole fixture.
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS work_rate_dirty (
+                fixture_id INTEGER,
+                player_id INTEGER,
+                UNIQUE (fixture_id, player_id)
+            )
+        ''')
+        # UNIQUE treats NULLs as distinct, so whole-fixture marks need their own index to
+        # stay one per fixture. Duplicates left by older versions are collapsed first.
+        c.execute("DELETE FROM work_rate_dirty WHERE player_id IS NULL AND rowid NOT IN "
+                  "(SELECT MIN(rowid) FROM work_rate_dirty WHERE player_id IS NULL GROUP BY fixture_id)")
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_work_rate_dirty_fixture "
+                  "ON work_rate_dirty (fixture_id) WHERE player_id IS NULL")
+        # Bulk appends lift these triggers and mark once per statement (see bulk_marks).
+        # Rows without a fixture have no summary, so they mark nothing. Recreated on every
+        # start so older databases pick up the fixture_id filter.
+        for table in MARKED_TABLES:
+            for op, rows in (("INSERT", ["NEW"]), ("DELETE", ["OLD"]), ("UPDATE", ["OLD", "NEW"])):
+                marks = " ".join(
+                    f"INSERT OR IGNORE INTO work_rate_dirty (fixture_id, player_id) "
+                    f"SELECT {r}.fixture_id, {r}.player_id "
+                    f"WHERE {r}.fixture_id IS NOT NULL AND {r}.player_id IS NOT NULL;"
+                    for r in rows
+                )
+                c.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{op.lower()}_work_rate")
+                c.execute(f"CREATE TRIGGER trg_{table}_{op.lower()}_work_rate "
+                          f"AFTER {op} ON {table} BEGIN {marks} END")
+        # Per-fixture tracking versions ("tracking:<fixture_id>" in table_versions), so
+        # per-fixture caches survive writes to other fixtures.
+        for table in VERSIONED_TABLES:
+            for op, r in (("INSERT", "NEW"), ("DELETE", "OLD"), ("UPDATE", "NEW")):
+                c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_fixture_version "
+                          f"AFTER {op} ON {table} BEGIN "
+                          f"INSERT INTO table_versions (name, version) VALUES ('tracking:' || {r}.fixture_id, 1) "
+                          f"ON CONFLICT(name) DO UPDATE SET version=version+1; END")
+        if backfill_work_rate:
+            c.execute('''
+                INSERT OR IGNORE INTO work_rate_dirty (fixture_id, player_id)
+                SELECT fixture_id, NULL FROM fixtures WHERE fixture_id IS NOT NULL
+                UNION SELECT fixture_id, NULL FROM tracking WHERE fixture_id IS NOT NULL
+                UNION SELECT fixture_id, NULL FROM events WHERE fixture_id IS NOT NULL
+            ''')
+        # Per-table write counters used as cache keys
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+
+def _migrate_selected_player_ids(conn):
+    """Copy comma-separated fixtures.selected_player_ids into fixture_selection."""
+    shirts = dict(conn.execute("SELECT player_id, shirt_number FROM players"))
+    positions = dict(conn.execute("SELECT player_id, position FROM players"))
+    rows = []
+    for fixture_id, selected in conn.execute("SELECT fixture_id, selected_player_ids FROM fixtures"):
+        ids = dict.fromkeys(int(x) for x in str(selected or "").split(",") if x.strip().isdigit())
+        rows += [(fixture_id, p, shirts.get(p), positions.get(p)) for p in ids]
+    conn.executemany("INSERT OR IGNORE INTO fixture_selection VALUES (?, ?, ?, ?)", rows)
+
+
+def add_missing_columns(conn, table, columns):
+    have = table_columns(table, conn)
+    for col, kind in columns.items():
+        if col not in have:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {kind}")
+
+
+def fetch_df(query, params=()):
+    with diagnostics.timed("query", query) as t, get_pool().reader() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+        t.rows = len(df)
+    return df
+
+
+def fetch_one(query, params=()):
+    with get_pool().reader() as conn:
+        return conn.execute(query, params).fetchone()
+
+
+def execute_write(query, params=(), tables=None):
+    with diagnostics.timed("write", query) as t, get_pool().writer() as conn:
+        t.rows = conn.execute(query, params).rowcount
+        bump_versions(conn, tables or written_tables(query))
+
+
+def df_to_sql(df, table, if_exists='append'):
+    """Append a DataFrame's rows to a table (created if missing)."""
+    # pandas' "replace" drops the table and recreates it without its keys, indexes and
+    # triggers, which the version counters and work-rate marks depend on.
+    if if_exists == 'replace':
+        raise ValueError("df_to_sql only appends; DELETE the rows first or use upsert_df")
+    with diagnostics.timed("write", f"df_to_sql {table} ({if_exists})") as t, get_pool().writer() as conn:
+        t.rows = len(df)
+        df.to_sql(table, conn, index=False, if_exists=if_exists)
+        bump_versions(conn, [table])
+
+
+def execute_many(query, rows, tables=None):
+    """Run one statement for many parameter rows in a single transaction."""
+    rows = list(rows)
+    if not rows:
+        return 0
+    target = appended_table(query)
+    with diagnostics.timed("write", query) as t, get_pool().writer() as conn:
+        t.rows = len(rows)
+        if target in MARKED_TABLES:
+            with bulk_marks(conn, target):
+                conn.executemany(query, rows)
+        else:
+            conn.executemany(query, rows)
+        bump_versions(conn, tables or written_tables(query))
+    return len(rows)
+
+
+def table_columns(table, conn=None):
+    """Column name -> declared type for a table."""
+    query = f"PRAGMA table_info({table})"
+    if conn is not None:
+        return {r[1]: r[2] for r in conn.execute(query)}
+    with get_pool().reader() as conn:
+        return {r[1]: r[2] for r in conn.execute(query)}
+
+
+def records(df):
+    """DataFrame rows as tuples of plain Python values (NaN -> None) for sqlite3."""
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def upsert_df(df, table, key, delete_missing=False):
+    """
+    Write only the differences between df and a table, matched on `key`.
+
+    Rows with a new or empty key are inserted, rows whose values changed are updated
+    in place, and with delete_missing=True rows absent from df are deleted. Columns
+    the table doesn't have are ignored. Returns counts of inserted/updated/deleted.
+    """
+    with get_pool().writer() as conn:
+        cols = [c for c in df.columns if c in table_columns(table, conn)]
+        value_cols = [c for c in cols if c != key]
+        new = df[cols]
+        current = pd.read_sql_query(f"SELECT {', '.join(cols)} FROM {table}", conn).set_index(key)
+
+        has_key = new[key].notna()
+        keyed = new[has_key].astype({key: "int64"}).set_index(key)
+        existing = keyed[keyed.index.isin(current.index)]
+        old = current.loc[existing.index, value_cols]
+        same = (existing[value_cols] == old) | (existing[value_cols].isna() & old.isna())
+        changed = existing[~same.all(axis=1)]
+        added = keyed[~keyed.index.isin(current.index)].reset_index()
+        fresh = new[~has_key]
+
+        # New rows keep their key when they bring one; otherwise SQLite assigns it.
+        for rows, ins_cols in ((added, cols), (fresh, value_cols)):
+            if not rows.empty and ins_cols:
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(ins_cols)}) VALUES ({', '.join('?' * len(ins_cols))})",
+                    records(rows[ins_cols]),
+                )
+        if not changed.empty and value_cols:
+            conn.executemany(
+                f"UPDATE {table} SET {', '.join(c + '=?' for c in value_cols)} WHERE {key}=?",
+                records(changed[value_cols].reset_index()[value_cols + [key]]),
+            )
+        deleted = current.index.difference(keyed.index) if delete_missing else []
+        if len(deleted):
+            conn.executemany(f"DELETE FROM {table} WHERE {key}=?", [(int(k),) for k in deleted])
+        counts = {"inserted": len(added) + len(fresh), "updated": len(changed), "deleted": len(deleted)}
+        if any(counts.values()):
+            bump_versions(conn, [table])
+    return counts
+
+
+# --- Table versions ---
+# Every write bumps a counter for the tables it touched, in the same transaction.
+# Readers key their caches on these counters, so a save only invalidates what it
+# changed and other sessions see it on their next rerun with a one-row lookup.
+
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE,
+)
+
+
+def written_tables(query):
+    match = _WRITE_TARGET.match(query)
+    return [match.group(1).lower()] if match else []
+
+
+def bump_versions(conn, tables):
+    conn.executemany(
+        "INSERT INTO table_versions (name, version) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET version=version+1",
+        [(t,) for t in dict.fromkeys(tables)],
+    )
+
+
+_PLAIN_INSERT = re.compile(r"^\s*INSERT(?:\s+OR\s+(?:IGNORE|ABORT|FAIL))?\s+INTO\s+[\"`\[]?(\w+)", re.IGNORECASE)
+
+
+def appended_table(query):
+    """The table a plain INSERT appends to (None for upserts, REPLACE and other writes)."""
+    match = _PLAIN_INSERT.match(query)
+    if not match or re.search(r"\bON\s+CONFLICT\b", query, re.IGNORECASE):
+        return None
+    return match.group(1).lower()
+
+
+def mark_rows(conn, table, where="1", params=()):
+    """Mark the fixtures/players of `table` rows matching `where` as the per-row triggers would."""
+    conn.execute(f"INSERT OR IGNORE INTO work_rate_dirty (fixture_id, player_id) "
+                 f"SELECT DISTINCT fixture_id, player_id FROM {table} "
+                 f"WHERE fixture_id IS NOT NULL AND player_id IS NOT NULL AND ({where})",
+                 params)
+    if table in VERSIONED_TABLES:
+        conn.execute(f"INSERT INTO table_versions (name, version) "
+                     f"SELECT DISTINCT 'tracking:' || fixture_id, 1 FROM {table} "
+                     f"WHERE fixture_id IS NOT NULL AND ({where}) "
+                     f"ON CONFLICT(name) DO UPDATE SET version=version+1", params)
+
+
+@contextmanager
+def bulk_marks(conn, table):
+    """
+    Append to a MARKED_TABLES table inside a writer() block without its per-row marking
+    triggers; the appended rows (rowids above the current maximum) are marked once at
+    the end. The triggers are dropped and recreated inside the transaction, so other
+    connections never see them missing. Only for plain INSERTs and DELETEs of rows
+    already marked: rows updated in place keep their rowid and would be missed.
+    """
+    start = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+    triggers = [(name, sql) for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name=?", (table,))
+        if name.endswith(("_work_rate", "_fixture_version"))]
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    try:
+        yield conn
+    finally:
+        for _, sql in triggers:
+            conn.execute(sql)
+    mark_rows(conn, table, "rowid > ?", (start,))
+
+
+def table_version(name):
+    row = fetch_one("SELECT version FROM table_versions WHERE name=?", (name,))
+    return row[0] if row else 0
+
+
+def fixture_tracking_version(fixture_id):
+    """Write counter for one fixture's tracking (table rows, keyframes and columnar store)."""
+    return table_version(f"tracking:{int(fixture_id)}")
+
+
+def table_versions():
+    with get_pool().reader() as conn:
+        return dict(conn.execute("SELECT name, version FROM table_versions").fetchall())
+
+
+# --- Tracking queries ---
+# Filtering happens in SQLite against the (fixture_id, time_s, player_id) index,
+# so a timeline scrub only reads the rows for the frame being drawn.
+
+def tracking_snapshot(fixture_id, time_s):
+    """All tracking points for one fixture at exactly time_s (12.5 does not match a point at 12)."""
+    return fetch_df(
+        "SELECT * FROM tracking WHERE fixture_id=? AND time_s=? ORDER BY player_id",
+        (int(fixture_id), float(time_s)),
+    )
+
+
+def tracking_range(fixture_id, start_s, end_s, player_ids=None):
+    """Tracking points for a fixture with start_s <= time_s <= end_s, optionally for some players."""
+    query = "SELECT * FROM tracking WHERE fixture_id=? AND time_s BETWEEN ? AND ?"
+    params = [int(fixture_id), int(start_s), int(end_s)]
+    if player_ids is not None:
+        player_ids = [int(p) for p in player_ids]
+        if not player_ids:
+            return fetch_df(query + " AND 0", params)
+        query += f" AND player_id IN ({','.join('?' * len(player_ids))})"
+        params += player_ids
+    return fetch_df(query + " ORDER BY time_s, player_id", params)
+
+
+def tracking_bounds(fixture_id):
+    """(min time_s, max time_s) of tracking for a fixture, or None when it has no points."""
+    lo, hi = fetch_one("SELECT MIN(time_s), MAX(time_s) FROM tracking WHERE fixture_id=?", (int(fixture_id),))
+    return None if lo is None else (int(lo), int(hi))
+
+
+def tracking_latest(limit=100):
+    """The most recently saved tracking points, oldest first."""
+    df = fetch_df("SELECT * FROM tracking ORDER BY rowid DESC LIMIT ?", (int(limit),))
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def event_bounds(fixture_id):
+    lo, hi = fetch_one("SELECT MIN(time_s), MAX(time_s) FROM events WHERE fixture_id=?", (int(fixture_id),))
+    return None if lo is None else (int(lo), int(hi))
+
+
+# --- Aggregates ---
+
+def dashboard_counts():
+    """Headline numbers for the Dashboard, computed in SQLite rather than from loaded tables."""
+    # "Next" is the first fixture dated today or later, else the most recent one. A
+    # player's availability for it is their row for that fixture, else their general row.
+    players, fixtures, available, selected = fetch_one('''
+        WITH next AS (
+            SELECT fixture_id FROM fixtures
+            ORDER BY COALESCE(date, '') < date('now', 'localtime'),
+                     CASE WHEN date >= date('now', 'localtime') THEN date END, date DESC, fixture_id
+            LIMIT 1
+        ), status AS (
+            SELECT COALESCE(MAX(CASE WHEN a.fixture_id IS NOT NULL THEN a.available END),
+                            MAX(CASE WHEN a.fixture_id IS NULL THEN a.available END)) AS available
+            FROM availability a
+            WHERE a.fixture_id = (SELECT fixture_id FROM next) OR a.fixture_id IS NULL
+            GROUP BY a.player_id
+        )
+        SELECT (SELECT COUNT(*) FROM players),
+               (SELECT COUNT(*) FROM fixtures),
+               (SELECT COUNT(*) FROM status WHERE available = 1),
+               (SELECT COUNT(*) FROM fixture_selection WHERE fixture_id = (SELECT fixture_id FROM next))
+    ''')
+    return {"players": players, "fixtures": fixtures, "available": available, "selected": selected}
+
+
+# --- Selection ---
+# One availability status per selected player, resolved as in dashboard_counts: their
+# row for the selection's fixture, else their general (no fixture) row.
+_AVAILABILITY_JOIN = """
+    LEFT JOIN (
+        SELECT sa.fixture_id, sa.player_id,
+               COALESCE(MAX(CASE WHEN av.fixture_id IS NOT NULL THEN av.available END),
+                        MAX(CASE WHEN av.fixture_id IS NULL THEN av.available END)) AS available,
+               CASE WHEN MAX(CASE WHEN av.fixture_id IS NOT NULL THEN av.available END) IS NOT NULL
+                    THEN MAX(CASE WHEN av.fixture_id IS NOT NULL THEN av.reason END)
+                    ELSE MAX(CASE WHEN av.fixture_id IS NULL THEN av.reason END) END AS reason
+        FROM fixture_selection sa
+        JOIN availability av ON av.player_id = sa.player_id
+             AND (av.fixture_id = sa.fixture_id OR av.fixture_id IS NULL)
+        GROUP BY sa.fixture_id, sa.player_id
+    ) a ON a.fixture_id = s.fixture_id AND a.player_id = s.player_id
+"""
+
+
+def selection(fixture_id):
+    """A fixture's squad with player names and availability, in shirt-number order."""
+    return fetch_df(f'''
+        SELECT s.player_id, s.shirt_number, s.position, p.first_name, p.last_name, a.available, a.reason
+        FROM fixture_selection s
+        JOIN players p ON p.player_id = s.player_id
+        {_AVAILABILITY_JOIN}
+        WHERE s.fixture_id = ?
+        ORDER BY s.shirt_number IS NULL, s.shirt_number, p.last_name
+    ''', (int(fixture_id),))
+
+
+def selected_ids(fixture_id):
+    df = fetch_df("SELECT player_id FROM fixture_selection WHERE fixture_id=? ORDER BY shirt_number", (int(fixture_id),))
+    return df["player_id"].astype(int).tolist()
+
+
+def save_selection(fixture_id, rows):
+    """Replace a fixture's squad; rows are (player_id, shirt_number, position). Returns the squad size."""
+    # A player listed twice keeps their last row.
+    rows = list({int(p): (int(fixture_id), int(p), None if pd.isna(n) else int(n), pos or None)
+                 for p, n, pos in rows}.values())
+    with get_pool().writer() as conn:
+        conn.execute("DELETE FROM fixture_selection WHERE fixture_id=?", (int(fixture_id),))
+        conn.executemany("INSERT INTO fixture_selection VALUES (?, ?, ?, ?)", rows)
+        bump_versions(conn, ["fixture_selection"])
+    return len(rows)
+
+
+def selection_counts(team=None):
+    """Games selected per player (optionally for one team), most selected first."""
+    return fetch_df('''
+        SELECT p.player_id, p.first_name, p.last_name, COUNT(f.fixture_id) AS selected,
+               MAX(f.date) AS last_selected
+        FROM players p
+        LEFT JOIN fixture_selection s ON s.player_id = p.player_id
+        LEFT JOIN fixtures f ON f.fixture_id = s.fixture_id AND (:team IS NULL OR f.team = :team)
+        GROUP BY p.player_id
+        ORDER BY selected DESC, p.last_name
+    ''', {"team": team})
+
+
+def selected_unavailable(fixture_id=None):
+    """Selected players marked unavailable, for one fixture or all of them."""
+    return fetch_df(f'''
+        SELECT s.fixture_id, f.date, f.team, f.opposition, s.player_id, p.first_name, p.last_name, a.reason
+        FROM fixture_selection s
+        JOIN fixtures f ON f.fixture_id = s.fixture_id
+        JOIN players p ON p.player_id = s.player_id
+        {_AVAILABILITY_JOIN}
+        WHERE a.available = 0 AND (:fixture IS NULL OR s.fixture_id = :fixture)
+        ORDER BY f.date, p.last_name
+    ''', {"fixture": None if fixture_id is None else int(fixture_id)})
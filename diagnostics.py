@@ -0,0 +1,241 @@
+"""
+Lightweight profiling for reruns, queries and caches.
+
+Hooks in db.py (fetch_df, execute_write, execute_many, df_to_sql) and app.py (cached
+loaders, page branches, the rerun as a whole) record one entry each into a bounded
+ring buffer shared by every session in the process:
+
+    {"ts", "kind", "name", "ms", "rows", "page"}
+
+kind is "query", "write", "cache_call", "cache_miss", "section" or "rerun". Cache hits
+are cache_call entries minus cache_miss entries for the same function: the miss
+probe sits inside st.cache_*, so it only runs when the body does.
+
+Off by default. Set KLR_DIAGNOSTICS=1 (or flip the switch on the Diagnostics page)
+to record; while off every hook is a single flag check. KLR_DIAGNOSTICS_LOG=<path>
+also appends each entry to a JSONL file.
+"""
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+RING_SIZE = 20_000
+QUERY_CHARS = 200
+KINDS = ("query", "write", "cache_call", "cache_miss", "section", "rerun")
+
+_enabled = os.environ.get("KLR_DIAGNOSTICS", "") not in ("", "0")
+_log_path = os.environ.get("KLR_DIAGNOSTICS_LOG") or None
+_buffer = deque(maxlen=RING_SIZE)  # append/iterate are thread-safe
+_log_lock = threading.Lock()
+_log_file = None
+_local = threading.local()  # the page being rendered by this session thread
+_SPACE = re.compile(r"\s+")
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True, log_path=None):
+    """Turn recording on or off for the process; log_path (if given) starts a JSONL export."""
+    global _enabled, _log_path, _log_file
+    _enabled = bool(on)
+    if log_path is not None and log_path != _log_path:
+        with _log_lock:
+            if _log_file is not None:
+                _log_file.close()
+            _log_path, _log_file = log_path or None, None
+
+
+def clear():
+    _buffer.clear()
+
+
+def _record(kind, name, ms, rows=None):
+    entry = {"ts": time.time(), "kind": kind, "name": name, "ms": round(ms, 3), "rows": rows,
+             "page": getattr(_local, "page", None)}
+    _buffer.append(entry)
+    if _log_path:
+        _write_log(entry)
+
+
+def _write_log(entry):
+    global _log_file
+    with _log_lock:
+        if _log_file is None:
+            _log_file = open(_log_path, "a", encoding="utf-8")
+        _log_file.write(json.dumps(entry) + "\n")
+        _log_file.flush()
+
+
+def query_name(query):
+    """Query text with whitespace collapsed, truncated to QUERY_CHARS."""
+    text = _SPACE.sub(" ", str(query)).strip()
+    return text if len(text) <= QUERY_CHARS else text[:QUERY_CHARS - 1] + "…"
+
+
+# --- Timers ---
+
+class _Timer:
+    """Context manager that records one entry on exit; set .rows inside the block."""
+    __slots__ = ("kind", "name", "rows", "start")
+
+    def __init__(self, kind, name):
+        self.kind, self.name, self.rows = kind, name, None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.kind, self.name, (time.perf_counter() - self.start) * 1000, self.rows)
+        return False
+
+
+class _Off:
+    """Shared no-op stand-in for _Timer while recording is off."""
+    __slots__ = ()
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_OFF = _Off()
+
+
+def timed(kind, name):
+    """`with timed("query", sql) as t: ...; t.rows = n` — a no-op while disabled."""
+    if not _enabled:
+        return _OFF
+    return _Timer(kind, query_name(name) if kind in ("query", "write") else name)
+
+
+def start_rerun():
+    """Mark the start of a script run; returns a token for end_rerun()."""
+    _local.page = None
+    return time.perf_counter() if _enabled else None
+
+
+def set_page(page):
+    """Tag this session thread's entries with the page being rendered."""
+    _local.page = page
+
+
+def end_rerun(token):
+    if token is not None and _enabled:
+        _record("rerun", getattr(_local, "page", None), (time.perf_counter() - token) * 1000)
+
+
+def start_section(name):
+    return (name, time.perf_counter()) if _enabled else None
+
+
+def end_section(token):
+    if token is not None and _enabled:
+        _record("section", token[0], (time.perf_counter() - token[1]) * 1000)
+
+
+# --- Cache probes ---
+
+def cache_misses(fn):
+    """Wrap a function *inside* st.cache_*: the body only runs on a miss."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def probe(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        with _Timer("cache_miss", name):
+            return fn(*args, **kwargs)
+    return probe
+
+
+def cache_calls(fn, name=None):
+    """Wrap a cached function from *outside*: every call, hit or miss."""
+    name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def probe(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        with _Timer("cache_call", name):
+            return fn(*args, **kwargs)
+    return probe
+
+
+# --- Summaries ---
+
+def frame():
+    """The ring buffer as a DataFrame, oldest first."""
+    df = pd.DataFrame(list(_buffer), columns=["ts", "kind", "name", "ms", "rows", "page"])
+    return df.assign(rows=pd.to_numeric(df["rows"], errors="coerce"))
+
+
+def to_jsonl():
+    return "".join(json.dumps(e) + "\n" for e in list(_buffer))
+
+
+def _percentiles(df, by):
+    grp = df.groupby(by)["ms"]
+    return pd.DataFrame({
+        "runs": grp.size(),
+        "p50_ms": grp.quantile(0.5),
+        "p95_ms": grp.quantile(0.95),
+        "max_ms": grp.max(),
+    }).round(1)
+
+
+def rerun_latency(df=None):
+    """p50/p95/max script-run time per page, plus an "(all)" row."""
+    df = frame() if df is None else df
+    runs = df[df["kind"] == "rerun"].assign(name=lambda d: d["name"].fillna("(none)"))
+    if runs.empty:
+        return pd.DataFrame(columns=["runs", "p50_ms", "p95_ms", "max_ms"])
+    return pd.concat([_percentiles(runs, "name"), _percentiles(runs.assign(name="(all)"), "name")])
+
+
+def section_times(df=None):
+    df = frame() if df is None else df
+    return _percentiles(df[df["kind"] == "section"], "name").sort_values("p95_ms", ascending=False)
+
+
+def slowest_queries(df=None, n=20):
+    """Queries and writes by total time: calls, p95, max and mean rows returned."""
+    df = frame() if df is None else df
+    q = df[df["kind"].isin(["query", "write"])]
+    if q.empty:
+        return pd.DataFrame(columns=["kind", "name", "calls", "total_ms", "p95_ms", "max_ms", "rows"])
+    grp = q.groupby(["kind", "name"])
+    out = pd.DataFrame({
+        "calls": grp.size(),
+        "total_ms": grp["ms"].sum(),
+        "p95_ms": grp["ms"].quantile(0.95),
+        "max_ms": grp["ms"].max(),
+        "rows": grp["rows"].mean(),
+    }).round(1).reset_index()
+    return out.sort_values("total_ms", ascending=False).head(n).reset_index(drop=True)
+
+
+def cache_stats(df=None):
+    """Per cached function: calls, misses, hits (= calls - misses) and hit rate."""
+    df = frame() if df is None else df
+    calls = df[df["kind"] == "cache_call"].groupby("name")["ms"].agg(["size", "sum"])
+    misses = df[df["kind"] == "cache_miss"].groupby("name")["ms"].agg(["size", "sum"])
+    out = pd.DataFrame({"calls": calls["size"], "misses": misses["size"]}).fillna(0).astype(int)
+    out["hits"] = (out["calls"] - out["misses"]).clip(lower=0)
+    out["hit_rate"] = (out["hits"] / out["calls"].where(out["calls"] > 0)).round(3)
+    out["miss_ms"] = misses["sum"].reindex(out.index).fillna(0).round(1)
+    return out.rename_axis("function").reset_index().sort_values("calls", ascending=False, ignore_index=True)
@@ -0,0 +1,117 @@
+"""
+In-memory index over tagged events for windowed and sequence queries.
+
+Events are held per fixture as time-sorted NumPy arrays, so "events within ±2 s"
+is two searchsorted calls. Season-wide sequence queries ("tackle followed by a
+turnover won by the same team within 10 s") sort each event type once by a
+(fixture, time) key and pair events with vectorized searchsorted instead of
+scanning every match.
+"""
+import numpy as np
+import pandas as pd
+
+import db
+
+EVENT_TYPES = ["Carry", "Tackle", "Ruck Clean", "Jackal", "Offload", "Linebreak", "Kick", "Pass",
+               "Turnover Won", "Try", "Penalty Won"]
+
+
+def load_events():
+    """Every event with its rowid as event_id, sorted by fixture and time."""
+    return db.fetch_df("SELECT rowid AS event_id, * FROM events ORDER BY fixture_id, time_s, rowid")
+
+
+class FixtureEvents:
+    """One fixture's events, sorted by time."""
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self.time = self.frame["time_s"].to_numpy(dtype=float)
+
+    def __len__(self):
+        return len(self.time)
+
+    def window(self, start_s, end_s):
+        """Events with start_s <= time_s <= end_s."""
+        lo = np.searchsorted(self.time, start_s, side="left")
+        hi = np.searchsorted(self.time, end_s, side="right")
+        return self.frame.iloc[lo:hi]
+
+
+class EventIndex:
+    """Events for a season, indexed by fixture and by event type. Treat as read-only."""
+
+    def __init__(self, events):
+        ev = events.dropna(subset=["fixture_id", "time_s"]).copy()
+        if "team" not in ev:
+            ev["team"] = None
+        ev["team"] = ev["team"].fillna("KLR").astype(str).str.upper()
+        ev["kind"] = ev["event"].fillna("").astype(str).str.strip().str.lower()
+        ev = ev.sort_values(["fixture_id", "time_s"], kind="stable").reset_index(drop=True)
+        self.events = ev
+        self._fixtures = {int(f): FixtureEvents(grp) for f, grp in ev.groupby("fixture_id", sort=False)}
+        self._empty = FixtureEvents(ev.iloc[0:0])
+        self._t0 = float(ev["time_s"].min()) if len(ev) else 0.0
+        self._t_range = float(ev["time_s"].max()) - self._t0 if len(ev) else 0.0
+        self._fixture_rank = {f: i for i, f in enumerate(self._fixtures)}
+
+    def __len__(self):
+        return len(self.events)
+
+    def fixture(self, fixture_id):
+        return self._fixtures.get(int(fixture_id), self._empty)
+
+    def window(self, fixture_id, start_s, end_s):
+        return self.fixture(fixture_id).window(start_s, end_s)
+
+    def of_kind(self, event, fixture_ids=None):
+        ev = self.events[self.events["kind"] == str(event).strip().lower()]
+        return ev if fixture_ids is None else ev[ev["fixture_id"].isin(list(fixture_ids))]
+
+    def _keys(self, ev, span):
+        # fixture rank * span + time keeps events sorted by (fixture, time)
+        rank = ev["fixture_id"].astype(int).map(self._fixture_rank).to_numpy(dtype=float)
+        return rank * span + (ev["time_s"].to_numpy(dtype=float) - self._t0)
+
+    def followed_by(self, first, then, within_s, same="team", fixture_ids=None):
+        """
+        Pairs where a `then` event follows a `first` event in the same fixture within
+        `within_s` seconds (0 < gap <= within_s). `same` is "team", "player" or None.
+        Returns one row per pair with the first event's columns and then_* columns.
+        """
+        a = self.of_kind(first, fixture_ids).reset_index(drop=True)
+        b = self.of_kind(then, fixture_ids).reset_index(drop=True)
+        cols = ["fixture_id", "time_s", "player_id", "team", "then_time_s", "then_player_id", "then_team", "gap_s"]
+        if a.empty or b.empty:
+            return pd.DataFrame(columns=cols)
+        # The span leaves a gap wider than within_s between fixtures, so a window never
+        # reaches into the next fixture's keys.
+        span = self._t_range + within_s + 1
+        ka, kb = self._keys(a, span), self._keys(b, span)
+        lo = np.searchsorted(kb, ka, side="right")
+        hi = np.searchsorted(kb, ka + within_s, side="right")
+        counts = hi - lo
+        ia = np.repeat(np.arange(len(a)), counts)
+        ib = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        pairs = a.iloc[ia][["fixture_id", "time_s", "player_id", "team"]].reset_index(drop=True)
+        then_rows = b.iloc[ib].reset_index(drop=True)
+        pairs["then_time_s"] = then_rows["time_s"]
+        pairs["then_player_id"] = then_rows["player_id"]
+        pairs["then_team"] = then_rows["team"]
+        pairs["gap_s"] = pairs["then_time_s"] - pairs["time_s"]
+        if same == "team":
+            pairs = pairs[pairs["team"] == pairs["then_team"]]
+        elif same == "player":
+            pairs = pairs[pairs["player_id"] == pairs["then_player_id"]]
+        return pairs.reset_index(drop=True)[cols]
+
+    def per_block(self, event, block_s=600, by="player_id", fixture_ids=None):
+        """Counts of `event` per `by` value (rows) and block of `block_s` seconds (columns)."""
+        ev = self.of_kind(event, fixture_ids)
+        if ev.empty:
+            return pd.DataFrame()
+        block = (ev["time_s"].to_numpy(dtype=float) // block_s).astype(int)
+        label = pd.Series(block * block_s // 60, index=ev.index).map(lambda m: f"{m}-{m + block_s // 60}'")
+        table = pd.crosstab(ev[by].fillna(-1), label)
+        order = sorted(table.columns, key=lambda c: int(c.split("-")[0]))
+        return table[order]
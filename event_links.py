@@ -0,0 +1,129 @@
+"""
+Batch resolution of directional events (passes, offloads, kicks, linebreaks) into
+pitch coordinates for a whole fixture.
+
+Positions are taken once per distinct event time and packed into a padded
+times x players grid; every pass then finds its receiver with one masked distance
+matrix (nearest on-pitch teammate of the passer, never an opponent or a bench
+player). The result is one row per event and is what the pitch overlay and the
+passing network read, so nothing is recomputed per rendered frame.
+"""
+import numpy as np
+import pandas as pd
+
+import db
+import tracking_store
+from pitch_render import PITCH_LENGTH
+
+# Events that go to a teammate.
+TO_TEAMMATE = {"pass", "offload"}
+# Events drawn as a run/kick up the pitch, in metres.
+FORWARD_M = {"linebreak": 8, "kick": 20}
+KINDS = TO_TEAMMATE | set(FORWARD_M)
+OVERLAY_WINDOW_S = 2
+LINK_COLUMNS = ["event_id", "fixture_id", "time_s", "kind", "player_id", "team", "target_id",
+                "sx", "sy", "tx", "ty"]
+
+
+def fixture_events(fixture_id):
+    """Directional events for a fixture, with their rowid as event_id."""
+    ev = db.fetch_df("SELECT rowid AS event_id, * FROM events WHERE fixture_id=? ORDER BY time_s", (int(fixture_id),))
+    ev["kind"] = ev["event"].astype(str).str.strip().str.lower()
+    return ev[ev["kind"].isin(KINDS)].dropna(subset=["player_id", "time_s"])
+
+
+def position_grid(fixture_id, times, method="linear"):
+    """
+    Positions at each of the sorted `times` as padded arrays: ids (T, S) with -1 for
+    empty slots, xy (T, S, 2), opp (T, S) and bench (T, S) booleans.
+    """
+    pos = tracking_store.snapshots(fixture_id, times, method)
+    pos = pos.dropna(subset=["player_id", "x_pct", "y_pct"])
+    n_slots = int(pos.groupby("k").size().max()) if not pos.empty else 0
+    ids = np.full((len(times), n_slots), -1, dtype=np.int64)
+    xy = np.full((len(times), n_slots, 2), np.nan)
+    opp = np.zeros((len(times), n_slots), dtype=bool)
+    bench = np.zeros((len(times), n_slots), dtype=bool)
+    if not pos.empty:
+        k = pos["k"].to_numpy()
+        slot = pos.groupby("k").cumcount().to_numpy()
+        ids[k, slot] = pos["player_id"].astype(np.int64).to_numpy()
+        xy[k, slot] = pos[["x_pct", "y_pct"]].to_numpy(dtype=float)
+        opp[k, slot] = pos["team"].fillna("KLR").astype(str).str.upper().eq("OPP").to_numpy()
+        bench[k, slot] = pd.to_numeric(pos["bench"], errors="coerce").fillna(0).astype(bool).to_numpy()
+    return ids, xy, opp, bench
+
+
+def resolve(fixture_id, method="linear"):
+    """One row per directional event with resolved source and target coordinates (LINK_COLUMNS)."""
+    ev = fixture_events(fixture_id)
+    if ev.empty:
+        return pd.DataFrame(columns=LINK_COLUMNS)
+    times, k = np.unique(ev["time_s"].to_numpy(dtype=float), return_inverse=True)
+    ids, xy, opp, bench = position_grid(fixture_id, times, method)
+    if not ids.size:
+        return pd.DataFrame(columns=LINK_COLUMNS)
+
+    # Slot of each event's player in its time's row of the grid.
+    hit = ids[k] == ev["player_id"].astype(np.int64).to_numpy()[:, None]
+    found = hit.any(axis=1)
+    ev, k, src = ev[found], k[found], hit[found].argmax(axis=1)
+    rows = np.arange(len(ev))
+    sxy = xy[k, src]
+
+    # Nearest teammate: squared distance to every slot, masking self, opponents, bench and empty slots.
+    d = ((xy[k] - sxy[:, None, :]) ** 2).sum(axis=2)
+    d[(opp[k] != opp[k, src][:, None]) | bench[k] | (ids[k] < 0) | np.isnan(d)] = np.inf
+    d[rows, src] = np.inf
+    nearest = d.argmin(axis=1)
+    has_mate = np.isfinite(d[rows, nearest])
+
+    kind = ev["kind"].to_numpy()
+    to_mate = np.isin(kind, list(TO_TEAMMATE))
+    forward = pd.Series(kind).map(FORWARD_M).fillna(0).to_numpy()
+    txy = np.where(to_mate[:, None], xy[k, nearest],
+                   np.column_stack([np.clip(sxy[:, 0] + forward, 0, PITCH_LENGTH), sxy[:, 1]]))
+    links = pd.DataFrame({
+        "event_id": ev["event_id"].to_numpy(),
+        "fixture_id": int(fixture_id),
+        "time_s": ev["time_s"].to_numpy(),
+        "kind": kind,
+        "player_id": ev["player_id"].astype(np.int64).to_numpy(),
+        "team": np.where(opp[k, src], "OPP", "KLR"),
+        "target_id": pd.array(np.where(to_mate, ids[k, nearest], -1), dtype="Int64"),
+        "sx": sxy[:, 0], "sy": sxy[:, 1], "tx": txy[:, 0], "ty": txy[:, 1],
+    }, columns=LINK_COLUMNS)
+    links.loc[~to_mate, "target_id"] = pd.NA
+    # A pass with no teammate on the pitch cannot be drawn.
+    return links[~to_mate | has_mate].reset_index(drop=True)
+
+
+def overlay(links, time_s, window=OVERLAY_WINDOW_S):
+    """Arrows (kind, sx, sy, tx, ty) for events within `window` seconds of time_s."""
+    # Links come out of resolve() sorted by time, so the window is two binary searches.
+    t = links["time_s"].to_numpy(dtype=float)
+    lo, hi = np.searchsorted(t, time_s - window, side="left"), np.searchsorted(t, time_s + window, side="right")
+    return links.iloc[lo:hi][["kind", "sx", "sy", "tx", "ty"]].reset_index(drop=True)
+
+
+def passing_network(links, team="KLR"):
+    """
+    (nodes, edges) for completed passes/offloads in `links`, which may span several fixtures.
+
+    nodes: player_id, x_pct, y_pct (mean position when passing or receiving), touches.
+    edges: player_id, target_id, passes, plus the two players' node positions.
+    """
+    passes = links[links["kind"].isin(list(TO_TEAMMATE)) & links["target_id"].notna() & (links["team"] == team)]
+    touches = pd.concat([
+        passes[["player_id", "sx", "sy"]].set_axis(["player_id", "x_pct", "y_pct"], axis=1),
+        passes[["target_id", "tx", "ty"]].set_axis(["player_id", "x_pct", "y_pct"], axis=1),
+    ], ignore_index=True)
+    touches["player_id"] = touches["player_id"].astype("int64")
+    nodes = (touches.groupby("player_id")
+             .agg(x_pct=("x_pct", "mean"), y_pct=("y_pct", "mean"), touches=("x_pct", "size"))
+             .reset_index().assign(team=team))
+    edges = (passes.astype({"target_id": "int64"}).groupby(["player_id", "target_id"]).size()
+             .rename("passes").reset_index())
+    pos = nodes.set_index("player_id")[["x_pct", "y_pct"]]
+    edges = edges.join(pos, on="player_id").join(pos, on="target_id", rsuffix="_to")
+    return nodes, edges.sort_values("passes", ascending=False).reset_index(drop=True)
@@ -0,0 +1,160 @@
+"""
+GAME score aggregates (Go forward, Attitude, Mighty defence, Energy).
+
+Ratings are kept raw in analysis_scores; two materialized tables sit on top:
+
+- game_fixture_scores: one row per player and fixture (mean of that fixture's
+  ratings) plus a rolling mean over the player's last ROLLING_FIXTURES fixtures.
+- game_player_summary: one row per player with the latest fixture's scores, the
+  rolling mean, the season average and the season trend (least-squares slope in
+  points per fixture) for each metric.
+
+Fixtures are ordered by date, then fixture_id. Triggers mark players whose ratings
+(or fixture dates) change in game_scores_dirty, and refresh() rebuilds only those
+players' rows; record() inserts a rating and refreshes its player in one transaction.
+"""
+from math import pi
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+import db
+
+METRICS = ["go_forward", "attitude", "mighty_defence", "energy"]
+LABELS = {"go_forward": "Go Forward", "attitude": "Attitude", "mighty_defence": "Mighty Defence", "energy": "Energy"}
+STATS = ["latest", "rolling", "season", "trend"]
+ROLLING_FIXTURES = 3
+SEASON_START_MONTH = 8  # seasons run August to May
+
+
+def season_of(dates):
+    """'2025/26'-style season labels for ISO date strings (None where unknown)."""
+    d = pd.to_datetime(pd.Series(dates), errors="coerce")
+    start = d.dt.year - (d.dt.month < SEASON_START_MONTH)
+    return [f"{int(y)}/{(int(y) + 1) % 100:02d}" if pd.notna(y) else None for y in start]
+
+
+def _player_scores(conn, player_ids):
+    marks = ",".join("?" * len(player_ids))
+    return pd.read_sql_query(
+        f"""SELECT s.player_id, s.fixture_id, f.date, {", ".join("s." + m for m in METRICS)}
+            FROM analysis_scores s LEFT JOIN fixtures f ON f.fixture_id = s.fixture_id
+            WHERE s.player_id IN ({marks}) AND s.fixture_id IS NOT NULL""",
+        conn, params=list(player_ids))
+
+
+def aggregate(scores):
+    """
+    (per_fixture, summary) frames for raw ratings with player_id, fixture_id, date and
+    METRICS columns. Every player in `scores` is handled in one grouped pass.
+    """
+    fixture_cols = ["player_id", "fixture_id", "season", "seq", "ratings"] + [c for m in METRICS for c in (m, f"rolling_{m}")]
+    summary_cols = ["player_id", "season", "fixtures", "last_fixture_id"] + [f"{s}_{m}" for m in METRICS for s in STATS]
+    if scores.empty:
+        return pd.DataFrame(columns=fixture_cols), pd.DataFrame(columns=summary_cols)
+    per = (scores.groupby(["player_id", "fixture_id"], as_index=False)
+           .agg(date=("date", "first"), ratings=(METRICS[0], "size"), **{m: (m, "mean") for m in METRICS}))
+    per["date_key"] = per["date"].fillna("")
+    per = per.sort_values(["player_id", "date_key", "fixture_id"]).drop(columns="date_key").reset_index(drop=True)
+    per["season"] = season_of(per["date"])
+    per["seq"] = per.groupby("player_id").cumcount()
+    rolled = per.groupby("player_id")[METRICS].rolling(ROLLING_FIXTURES, min_periods=1).mean()
+    rolled = rolled.reset_index(level=0, drop=True)
+    for m in METRICS:
+        per[f"rolling_{m}"] = rolled[m]
+
+    last = per.groupby("player_id").tail(1).set_index("player_id")
+    # The season is the player's latest fixture's season (all fixtures when dates are missing).
+    in_season = per[per["season"].fillna("") == per["player_id"].map(last["season"]).fillna("")]
+    grp = in_season.groupby("player_id")
+    summary = pd.DataFrame({"season": last["season"], "fixtures": grp.size(), "last_fixture_id": last["fixture_id"]})
+    # Trend: slope of score against fixture number within the season, for all metrics at once.
+    x = grp.cumcount().to_numpy(dtype=float)
+    x_mean = pd.Series(x, index=in_season.index).groupby(in_season["player_id"]).transform("mean").to_numpy()
+    dx = x - x_mean
+    sxx = pd.Series(dx * dx).groupby(in_season["player_id"].to_numpy()).sum()
+    for m in METRICS:
+        y = in_season[m].to_numpy(dtype=float)
+        dy = y - grp[m].transform("mean").to_numpy()
+        sxy = pd.Series(dx * dy).groupby(in_season["player_id"].to_numpy()).sum()
+        summary[f"latest_{m}"] = last[m]
+        summary[f"rolling_{m}"] = last[f"rolling_{m}"]
+        summary[f"season_{m}"] = grp[m].mean()
+        summary[f"trend_{m}"] = (sxy / sxx.where(sxx > 0)).fillna(0.0)
+    summary = summary.rename_axis("player_id").reset_index()
+    return per[fixture_cols], summary[summary_cols].round(3)
+
+
+def _write(conn, table, df):
+    cols = list(df.columns)
+    conn.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", db.records(df))
+
+
+def _refresh(conn):
+    player_ids = [r[0] for r in conn.execute("SELECT player_id FROM game_scores_dirty")]
+    if not player_ids:
+        return 0
+    per, summary = aggregate(_player_scores(conn, player_ids))
+    rows = [(p,) for p in player_ids]
+    conn.executemany("DELETE FROM game_fixture_scores WHERE player_id=?", rows)
+    conn.executemany("DELETE FROM game_player_summary WHERE player_id=?", rows)
+    _write(conn, "game_fixture_scores", per)
+    _write(conn, "game_player_summary", summary)
+    conn.executemany("DELETE FROM game_scores_dirty WHERE player_id=?", rows)
+    db.bump_versions(conn, ["game_fixture_scores", "game_player_summary"])
+    return len(player_ids)
+
+
+def refresh():
+    """Rebuild aggregates for players marked dirty; returns how many players were updated."""
+    with db.get_pool().writer() as conn:
+        return _refresh(conn)
+
+
+def pending():
+    return db.fetch_one("SELECT COUNT(*) FROM game_scores_dirty")[0]
+
+
+def record(fixture_id, player_id, scores, notes=""):
+    """Insert one rating (scores: metric -> 1..9) and update that player's aggregates."""
+    with db.get_pool().writer() as conn:
+        conn.execute(
+            f"INSERT INTO analysis_scores (fixture_id, player_id, {', '.join(METRICS)}, notes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (int(fixture_id), int(player_id), *[int(scores[m]) for m in METRICS], notes),
+        )
+        db.bump_versions(conn, ["analysis_scores"])
+        _refresh(conn)
+
+
+def ranking(summary, stat="season", sort_by="overall"):
+    """Squad table for one stat: a column per metric plus their mean as `overall`, best first."""
+    cols = [f"{stat}_{m}" for m in METRICS]
+    table = summary[["player_id", "fixtures"] + cols].rename(columns=dict(zip(cols, METRICS)))
+    table["overall"] = table[METRICS].mean(axis=1)
+    return table.sort_values(sort_by, ascending=False).reset_index(drop=True)
+
+
+def radar_figure(series, title=None, figsize=(4, 4)):
+    """
+    Polar GAME chart with one outline per entry of `series` (label -> {metric: value}).
+    Built on a bare Figure so it is safe to render from worker processes too.
+    """
+    fig = Figure(figsize=figsize)
+    draw_radar(fig.add_subplot(111, polar=True), series, title)
+    return fig
+
+
+def draw_radar(ax, series, title=None):
+    """Draw the GAME radar for `series` (label -> {metric: value}) on a polar axes."""
+    angles = [n / len(METRICS) * 2 * pi for n in range(len(METRICS))]
+    for label, values in series.items():
+        v = [float(values[m]) for m in METRICS]
+        ax.plot(angles + angles[:1], v + v[:1], linewidth=2, label=label)
+        ax.fill(angles + angles[:1], v + v[:1], alpha=0.15)
+    ax.set_thetagrids(np.degrees(angles), [LABELS[m] for m in METRICS])
+    ax.set_ylim(0, 9)
+    if len(series) > 1:
+        ax.legend(loc="upper right", bbox_to_anchor=(1.35, 1.1), fontsize="small")
+    if title:
+        ax.set_title(title)
@@ -0,0 +1,175 @@
+"""
+Content-addressed cache of parsed import files.
+
+Uploads are hashed (BLAKE2b over the raw bytes plus the parser identity) and the
+parsed result is kept as Arrow/Feather under DATA_DIR/import_cache, so re-uploading
+an unchanged GMS or Spond export skips the Excel parse. The directory is kept under
+MAX_CACHE_BYTES by evicting the least recently used files.
+
+pyarrow ships with Streamlit; without it the cache is skipped and files are parsed as usual.
+"""
+import functools
+import hashlib
+import io
+import os
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from db import DATA_DIR
+
+CACHE_DIR = DATA_DIR / "import_cache"
+MAX_CACHE_BYTES = 256 * 2**20
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def read_source(source):
+    """(bytes, filename) from a path or a file-like object such as a Streamlit upload."""
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes(), str(source)
+    if hasattr(source, "getvalue"):
+        data = source.getvalue()
+    else:
+        source.seek(0)
+        data = source.read()
+    return data, str(getattr(source, "name", ""))
+
+
+def _code_bytes(code):
+    """Bytecode, names and constants of a code object and every code object nested in it."""
+    parts = [code.co_code, repr(code.co_names).encode()]
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            parts.append(_code_bytes(const))
+        else:
+            # `x in {...}` compiles to a frozenset, whose repr order varies between processes.
+            parts.append(repr(sorted(map(repr, const)) if isinstance(const, frozenset) else const).encode())
+    return b"\0".join(parts)
+
+
+def content_key(data, parser):
+    """Cache key for these bytes as parsed by `parser` (a function or a name)."""
+    h = hashlib.blake2b(data, digest_size=16)
+    code = getattr(parser, "__code__", None)
+    ident = f"{getattr(parser, '__module__', '')}.{getattr(parser, '__qualname__', parser)}"
+    # Editing a parser (a column name, a nested helper) changes these bytes, which
+    # retires its old cache entries.
+    h.update(ident.encode() + (_code_bytes(code) if code else b""))
+    return f"{ident.rsplit('.', 1)[-1]}-{h.hexdigest()}"
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _publish(tmp, path, max_bytes):
+    os.replace(tmp, path)
+    evict(max_bytes)
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """Delete least recently used cache files until the directory fits in max_bytes."""
+    if not CACHE_DIR.exists():
+        return
+    files = sorted((p.stat().st_mtime, p.stat().st_size, p) for p in CACHE_DIR.glob("*.arrow"))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def cached_parse(data, key, parse, max_bytes=MAX_CACHE_BYTES):
+    """Return parse(BytesIO(data)), reading it from the cache when these bytes were seen before."""
+    path = CACHE_DIR / f"{key}.arrow"
+    if _pyarrow() and path.exists():
+        _touch(path)
+        return pd.read_feather(path)
+    df = parse(io.BytesIO(data))
+    if _pyarrow():
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        try:
+            df.reset_index(drop=True).to_feather(tmp)
+            _publish(tmp, path, max_bytes)
+        except Exception:
+            # Columns pyarrow can't represent (mixed object types) just aren't cached.
+            tmp.unlink(missing_ok=True)
+    return df
+
+
+def cached_chunks(data, key, read_chunks, max_bytes=MAX_CACHE_BYTES):
+    """
+    Yield the chunks of read_chunks(BytesIO(data)), caching them as Arrow record batches.
+
+    Columns are stored as strings so every chunk shares one schema; data_sync's
+    coerce_chunk types them again on the way into SQLite. A hit streams the batches
+    back one at a time from a memory map, so memory stays bounded by the chunk size.
+    """
+    pa = _pyarrow()
+    path = CACHE_DIR / f"{key}.arrow"
+    if pa is None:
+        yield from read_chunks(io.BytesIO(data))
+        return
+    if path.exists():
+        _touch(path)
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+        return
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    writer = schema = None
+    try:
+        for chunk in read_chunks(io.BytesIO(data)):
+            text = chunk.astype("string").astype(object).where(chunk.notna(), None)
+            text.columns = [str(c) for c in text.columns]
+            if writer is None:
+                schema = pa.schema([(c, pa.string()) for c in text.columns])
+                writer = pa.ipc.new_file(str(tmp), schema)
+            writer.write_batch(pa.RecordBatch.from_pandas(text, schema=schema, preserve_index=False))
+            yield chunk
+        if writer is not None:
+            writer.close()
+            writer = None
+            _publish(tmp, path, max_bytes)
+    finally:
+        # An abandoned or failed read leaves no partial entry behind.
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+
+
+def cached_import(parser):
+    """
+    Wrap an importer so it parses each distinct file only once.
+
+    The wrapped function takes the same path or file object, plus use_cache=False
+    to force a fresh parse.
+    """
+    @functools.wraps(parser)
+    def wrapper(source, use_cache=True):
+        if not use_cache:
+            return parser(source)
+        data, filename = read_source(source)
+
+        def parse(buf):
+            buf.name = filename  # importers pick CSV vs Excel from the name
+            return parser(buf)
+        return cached_parse(data, content_key(data, parser), parse)
+    return wrapper
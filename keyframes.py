@@ -0,0 +1,130 @@
+"""
+Keyframe annotation: coaches place players at a few moments and everything in
+between is interpolated.
+
+Only keyframes are stored (the tracking_keyframes table). interpolate() evaluates
+every player at every requested time in one vectorized pass: keyframes are sorted
+by (player, time) and located with a single searchsorted over a combined
+player/time key, then blended linearly or with a cubic Hermite (Catmull-Rom style)
+spline. Players are never extrapolated before their first or after their last keyframe.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import db
+
+METHODS = ("linear", "spline")
+KEYFRAME_INSERT = ("INSERT INTO tracking_keyframes (fixture_id, time_s, player_id, x_pct, y_pct, team, bench) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)")
+# Keyframe writes also bump "tracking" so every tracking-derived cache refreshes.
+TABLES = ["tracking_keyframes", "tracking"]
+PITCH_MAX = (100.0, 70.0)
+
+
+class KeyframeSet:
+    """One fixture's keyframes as sorted arrays, ready for interpolation."""
+
+    def __init__(self, kf: pd.DataFrame, fixture_id=None):
+        kf = kf.dropna(subset=["player_id", "time_s", "x_pct", "y_pct"])
+        kf = kf.sort_values(["player_id", "time_s"]).drop_duplicates(["player_id", "time_s"], keep="last")
+        self.fixture_id = fixture_id
+        self.player_ids, self.pidx = np.unique(kf["player_id"].astype(np.int64).to_numpy(), return_inverse=True)
+        self.t = kf["time_s"].to_numpy(dtype=float)
+        self.xy = kf[["x_pct", "y_pct"]].to_numpy(dtype=float)
+        self.team = kf["team"].fillna("KLR").astype(str).to_numpy() if "team" in kf else np.full(len(kf), "KLR")
+        self.bench = pd.to_numeric(kf["bench"], errors="coerce").fillna(0).astype(int).to_numpy() \
+            if "bench" in kf else np.zeros(len(kf), int)
+        # start/end row of each player's run of keyframes
+        self.start = np.searchsorted(self.pidx, np.arange(len(self.player_ids)), side="left")
+        self.end = np.searchsorted(self.pidx, np.arange(len(self.player_ids)), side="right")
+        self.t0 = self.t.min() if len(self.t) else 0.0
+        self.span = (self.t.max() - self.t0 + 1.0) if len(self.t) else 1.0
+        self.key = self.pidx * self.span + (self.t - self.t0)
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def bounds(self):
+        return (float(self.t.min()), float(self.t.max())) if len(self) else None
+
+    def interpolate(self, times, method="linear"):
+        """Positions of every player at each of `times`, in the tracking table's columns."""
+        times = np.atleast_1d(np.asarray(times, dtype=float))
+        n_players = len(self.player_ids)
+        if not len(self) or not len(times):
+            return _empty()
+        qp = np.repeat(np.arange(n_players), len(times))
+        qt = np.tile(times, n_players)
+        start, end = self.start[qp], self.end[qp] - 1
+        j = np.searchsorted(self.key, qp * self.span + (qt - self.t0), side="right") - 1
+        ok = (j >= start) & (qt <= self.t[end]) & (qt >= self.t0)
+        qp, qt, j, start, end = qp[ok], qt[ok], j[ok], start[ok], end[ok]
+
+        j1 = np.minimum(j + 1, end)
+        dt = self.t[j1] - self.t[j]
+        w = np.divide(qt - self.t[j], dt, out=np.zeros_like(qt), where=dt > 0)[:, None]
+        p0, p1 = self.xy[j], self.xy[j1]
+        if method == "spline":
+            jm, j2 = np.maximum(j - 1, start), np.minimum(j1 + 1, end)
+            # Tangents from neighbouring keyframes, scaled to this segment's duration.
+            m0 = _slope(self.xy[j1] - self.xy[jm], self.t[j1] - self.t[jm]) * dt[:, None]
+            m1 = _slope(self.xy[j2] - self.xy[j], self.t[j2] - self.t[j]) * dt[:, None]
+            w2, w3 = w * w, w * w * w
+            pos = (2 * w3 - 3 * w2 + 1) * p0 + (w3 - 2 * w2 + w) * m0 + (-2 * w3 + 3 * w2) * p1 + (w3 - w2) * m1
+            pos = np.clip(pos, 0, PITCH_MAX)
+        else:
+            pos = p0 + w * (p1 - p0)
+
+        return pd.DataFrame({
+            "fixture_id": self.fixture_id,
+            "time_s": qt,
+            "player_id": self.player_ids[qp],
+            "x_pct": pos[:, 0].round(2),
+            "y_pct": pos[:, 1].round(2),
+            "team": self.team[j],
+            "bench": self.bench[j],
+        }).sort_values(["time_s", "player_id"]).reset_index(drop=True)
+
+
+def _slope(dp, dt):
+    return np.divide(dp, dt[:, None], out=np.zeros_like(dp), where=(dt > 0)[:, None])
+
+
+def _empty():
+    return pd.DataFrame(columns=["fixture_id", "time_s", "player_id", "x_pct", "y_pct", "team", "bench"])
+
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def load(fixture_id):
+    """The fixture's KeyframeSet, reloaded only when tracking_keyframes changes."""
+    version = db.table_version("tracking_keyframes")
+    with _lock:
+        cached = _loaded.get(int(fixture_id))
+        if cached and cached[0] == version:
+            return cached[1]
+    kf = db.fetch_df("SELECT * FROM tracking_keyframes WHERE fixture_id=? ORDER BY player_id, time_s", (int(fixture_id),))
+    kset = KeyframeSet(kf, int(fixture_id))
+    with _lock:
+        _loaded[int(fixture_id)] = (version, kset)
+    return kset
+
+
+def save(rows):
+    """Store keyframe rows (tuples in KEYFRAME_INSERT order) in one transaction."""
+    return db.execute_many(KEYFRAME_INSERT, rows, tables=TABLES)
+
+
+def snapshot(fixture_id, time_s, method="linear"):
+    return load(fixture_id).interpolate([time_s], method)
+
+
+def dense(fixture_id, start_s, end_s, step=1.0, method="linear"):
+    """Interpolated positions every `step` seconds over [start_s, end_s] (materialize on demand)."""
+    times = np.arange(np.ceil(start_s / step) * step, end_s + step / 2, step)
+    return load(fixture_id).interpolate(times, method)
@@ -0,0 +1,238 @@
+"""
+Pitch drawing for the tracking views.
+
+The static pitch is drawn once per size and kept as an Agg buffer region; each
+frame restores those pixels and rasterizes only its own artists (blit_png): one
+marker collection and one label collection per style (KLR / bench / OPP) and one
+arrow artist per arrow colour. Figures are built with the Agg canvas directly
+rather than pyplot, so nothing accumulates between reruns.
+"""
+import io
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path as MplPath
+from matplotlib.textpath import TextPath
+from PIL import Image
+
+# --- Club palette constants ---
+KLR_RED = "#C8102E"
+KLR_GOLD = "#FFCC33"
+KLR_BLACK = "#000000"
+KLR_WHITE = "#FFFFFF"
+OPP_GREY = "#777777"
+PITCH_LENGTH = 100
+PITCH_WIDTH = 70
+
+PAD = 2  # metres of margin so touchlines aren't clipped
+EXTENT = (-PAD, PITCH_LENGTH + PAD, -PAD, PITCH_WIDTH + PAD)
+FIGSIZE = (8, 8 * (PITCH_WIDTH + 2 * PAD) / (PITCH_LENGTH + 2 * PAD))
+DPI = 100
+MARKER_SIZE = 800
+LABEL_SIZE = 3.2  # label height in pitch metres
+
+# Marker styles from the README's "Visual overlays" section.
+STYLES = {
+    "KLR": {"face": KLR_RED, "edge": KLR_BLACK, "text": KLR_GOLD},
+    "bench": {"face": KLR_WHITE, "edge": KLR_GOLD, "text": KLR_BLACK},
+    "OPP": {"face": OPP_GREY, "edge": KLR_BLACK, "text": KLR_WHITE},
+}
+ARROW_COLOURS = {"pass": (KLR_BLACK, 0.8), "offload": (KLR_BLACK, 0.8), "linebreak": (KLR_GOLD, 0.9),
+                 "kick": (KLR_RED, 0.7)}
+_FONT = FontProperties(weight="bold")
+_thread = threading.local()  # per-thread frame figures, see _frame_axes
+
+
+def plot_rugby_pitch(ax, length=PITCH_LENGTH, width=PITCH_WIDTH, line=KLR_BLACK, turf=KLR_WHITE, accent=KLR_GOLD):
+    # Background turf
+    ax.set_facecolor(turf)
+    ax.set_xlim(0, length)
+    ax.set_ylim(0, width)
+
+    # Touchlines & goal lines (black)
+    ax.plot([0, length], [0, 0], lw=2.5, color=KLR_BLACK)
+    ax.plot([0, length], [width, width], lw=2.5, color=KLR_BLACK)
+    ax.plot([0, 0], [0, width], lw=2.5, color=KLR_BLACK)
+    ax.plot([length, length], [0, width], lw=2.5, color=KLR_BLACK)
+
+    # 22m, halfway and dashed 5/15m in gold accents
+    for x in [22, 78, 50]:
+        ax.plot([x, x], [0, width], lw=2, color=accent, alpha=0.9)
+    for x in [5, 15, 85, 95]:
+        ax.plot([x, x], [0, width], lw=1.2, ls="--", color=accent, alpha=0.7)
+
+    # In-goal markers/posts (red squares)
+    ax.scatter([0, length], [width / 2, width / 2], s=160, marker="s", color=KLR_RED, edgecolors=KLR_BLACK, linewidths=1.2)
+
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_aspect('equal', adjustable='box')
+
+
+def new_pitch_figure(figsize=FIGSIZE, dpi=DPI):
+    """A Figure whose single axes fills it edge to edge in pitch coordinates."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(EXTENT[:2])
+    ax.set_ylim(EXTENT[2:])
+    ax.set_axis_off()
+    return fig, ax
+
+
+@lru_cache(maxsize=4)
+def static_pitch(figsize=FIGSIZE, dpi=DPI):
+    """The empty pitch as an RGBA array, rendered once per size."""
+    fig, ax = new_pitch_figure(figsize, dpi)
+    plot_rugby_pitch(ax)
+    ax.set_xlim(EXTENT[:2])
+    ax.set_ylim(EXTENT[2:])
+    ax.set_aspect("auto")
+    ax.set_axis_off()
+    fig.canvas.draw()
+    img = np.asarray(fig.canvas.buffer_rgba()).copy()
+    img.setflags(write=False)
+    return img
+
+
+@lru_cache(maxsize=4)
+def _background(figsize=FIGSIZE, dpi=DPI):
+    """The drawn empty pitch as an Agg buffer region, ready to restore into a new canvas."""
+    fig, ax = new_pitch_figure(figsize, dpi)
+    ax.imshow(static_pitch(figsize, dpi), extent=EXTENT, aspect="auto", zorder=0)
+    fig.canvas.draw()
+    return fig.canvas.copy_from_bbox(fig.bbox)
+
+
+@contextmanager
+def _frame_axes(figsize=FIGSIZE, dpi=DPI):
+    """A pitch figure reused by this thread's frames; the data artists are removed afterwards."""
+    figures = _thread.__dict__.setdefault("figures", {})
+    if (figsize, dpi) not in figures:
+        figures[figsize, dpi] = new_pitch_figure(figsize, dpi)
+    fig, ax = figures[figsize, dpi]
+    try:
+        yield fig, ax
+    finally:
+        for artist in [*ax.images, *ax.collections, *ax.lines, *ax.patches]:
+            artist.remove()
+
+
+def blit_png(fig, ax, figsize=FIGSIZE, dpi=DPI):
+    """
+    PNG of the data artists on `ax` over the cached pitch. Only those artists are
+    rasterized: the background is restored as pixels (no resampling, no full redraw).
+    """
+    renderer = fig.canvas.get_renderer()
+    renderer.restore_region(_background(figsize, dpi))
+    for artist in sorted([*ax.images, *ax.collections, *ax.lines, *ax.patches], key=lambda a: a.get_zorder()):
+        artist.draw(renderer)
+    buf = io.BytesIO()
+    Image.fromarray(np.asarray(renderer.buffer_rgba())).save(buf, format="png", compress_level=1)
+    return buf.getvalue()
+
+
+def to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", pil_kwargs={"compress_level": 1})
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=512)
+def _label_path(text):
+    """Glyph outline for a label, centred on the origin, in pitch metres."""
+    path = TextPath((0, 0), text, size=LABEL_SIZE, prop=_FONT)
+    ext = path.get_extents()
+    return MplPath(path.vertices - [(ext.x0 + ext.x1) / 2, (ext.y0 + ext.y1) / 2], path.codes)
+
+
+def marker_styles(snap):
+    """KLR / bench / OPP style name for each row of a snapshot."""
+    bench = pd.to_numeric(snap["bench"], errors="coerce").fillna(0).astype(bool) if "bench" in snap else pd.Series(False, index=snap.index)
+    team = snap.get("team", pd.Series("KLR", index=snap.index)).fillna("KLR").astype(str).str.upper()
+    return pd.Series(np.select([bench, team == "OPP"], ["bench", "OPP"], "KLR"), index=snap.index)
+
+
+def marker_labels(snap):
+    """Shirt number where known, otherwise initials."""
+    blank = pd.Series("", index=snap.index)
+    shirt = pd.to_numeric(snap.get("shirt_number", blank), errors="coerce").astype("Int64").astype("string")
+    initials = (snap.get("first_name", blank).fillna("").astype(str).str[:1]
+                + snap.get("last_name", blank).fillna("").astype(str).str[:1])
+    return shirt.fillna(initials).fillna("")
+
+
+def draw_players(ax, snap):
+    styles = marker_styles(snap)
+    labels = marker_labels(snap)
+    xy = snap[["x_pct", "y_pct"]].to_numpy(dtype=float)
+    for style, rows in styles.groupby(styles).groups.items():
+        colours = STYLES[style]
+        idx = snap.index.get_indexer(rows)
+        ax.scatter(xy[idx, 0], xy[idx, 1], s=MARKER_SIZE, marker="o", color=colours["face"],
+                   edgecolors=colours["edge"], linewidth=2, zorder=2)
+        glyphs = [(_label_path(l), p) for l, p in zip(labels.iloc[idx], xy[idx]) if l]
+        if glyphs:
+            paths = [MplPath(path.vertices + p, path.codes) for path, p in glyphs]
+            ax.add_collection(PathCollection(paths, facecolor=colours["text"], edgecolor="none", zorder=3))
+
+
+def draw_arrows(ax, arrows):
+    """arrows: DataFrame with kind, sx, sy, tx, ty."""
+    if arrows is None or arrows.empty:
+        return
+    for kind, grp in arrows.groupby("kind"):
+        colour, alpha = ARROW_COLOURS.get(kind, (KLR_BLACK, 0.8))
+        ax.quiver(grp["sx"], grp["sy"], grp["tx"] - grp["sx"], grp["ty"] - grp["sy"],
+                  angles="xy", scale_units="xy", scale=1, width=0.004, headwidth=4, headlength=4,
+                  color=colour, alpha=alpha, zorder=2)
+
+
+def render_frame(snap, arrows=None, figsize=FIGSIZE, dpi=DPI):
+    """PNG bytes of the pitch with a tracking snapshot (and optional arrows) drawn on it."""
+    with _frame_axes(figsize, dpi) as (fig, ax):
+        draw_arrows(ax, arrows)
+        if snap is not None and not snap.empty:
+            draw_players(ax, snap.reset_index(drop=True))
+        return blit_png(fig, ax, figsize, dpi)
+
+
+def render_network(nodes, edges, figsize=FIGSIZE, dpi=DPI):
+    """PNG of a passing network: players at their mean position, lines weighted by passes."""
+    with _frame_axes(figsize, dpi) as (fig, ax):
+        if not edges.empty:
+            segs = np.stack([edges[["x_pct", "y_pct"]].to_numpy(float), edges[["x_pct_to", "y_pct_to"]].to_numpy(float)], axis=1)
+            widths = 1 + 5 * edges["passes"].to_numpy(float) / edges["passes"].max()
+            ax.add_collection(LineCollection(segs, linewidths=widths, colors=KLR_BLACK, alpha=0.6, zorder=1), autolim=False)
+        if not nodes.empty:
+            draw_players(ax, nodes.reset_index(drop=True))
+        return blit_png(fig, ax, figsize, dpi)
+
+
+def render_heatmap(grid, cmap="Reds", figsize=FIGSIZE, dpi=DPI):
+    """PNG of an occupancy grid (x bins x y bins over the pitch) on the pitch background."""
+    with _frame_axes(figsize, dpi) as (fig, ax):
+        draw_heatmap(ax, grid, cmap)
+        return blit_png(fig, ax, figsize, dpi)
+
+
+def draw_heatmap(ax, grid, cmap="Reds"):
+    """Occupancy grid (x bins x y bins) stretched over the pitch; empty cells stay clear."""
+    if grid is None or not np.any(grid):
+        return
+    masked = np.ma.masked_equal(np.asarray(grid, dtype=float).T, 0)
+    ax.imshow(masked, origin="lower", extent=(0, PITCH_LENGTH, 0, PITCH_WIDTH), aspect="auto",
+              cmap=cmap, alpha=0.65, interpolation="bilinear", zorder=1)
+
+
+@lru_cache(maxsize=4)
+def static_pitch_png(figsize=FIGSIZE, dpi=DPI):
+    return render_frame(None, figsize=figsize, dpi=dpi)
+
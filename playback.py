@@ -0,0 +1,158 @@
+"""
+In-browser match playback.
+
+A fixture's tracking is packed once into a compact payload (a frames x players grid of
+positions and marker styles, plus player labels and events) and animated by a small
+canvas player in a Streamlit HTML component. Playing, changing speed and stepping all
+happen client-side, so playback no longer reruns app.py every simulated second.
+"""
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+
+from pitch_render import EXTENT, STYLES, marker_labels, marker_styles, static_pitch_png
+
+SPEEDS = [0.5, 1, 2, 4, 8]
+STYLE_CODES = {name: i for i, name in enumerate(STYLES)}
+EVENT_WINDOW_S = 2
+
+
+def build_payload(tracking, events=None, players=None, step=1.0):
+    """
+    Pack tracking rows into a dict ready for json.dumps.
+
+    Positions are sampled every `step` seconds into a frames x players grid (the last
+    sample in each step wins), stored as tenths of a metre with -1 for "not on the
+    pitch". `players` is the player directory frame used for shirt numbers/initials.
+    """
+    tr = tracking.dropna(subset=["player_id", "x_pct", "y_pct"])
+    if tr.empty:
+        return None
+    t = tr["time_s"].to_numpy(dtype=float)
+    t0 = float(t.min())
+    frame = np.round((t - t0) / step).astype(np.int64)
+    n_frames = int(frame.max()) + 1
+    ids, pidx = np.unique(tr["player_id"].astype(int).to_numpy(), return_inverse=True)
+
+    xy = np.full((n_frames, len(ids), 2), -1, dtype=np.int32)
+    xy[frame, pidx, 0] = np.round(tr["x_pct"].to_numpy(dtype=float) * 10)
+    xy[frame, pidx, 1] = np.round(tr["y_pct"].to_numpy(dtype=float) * 10)
+    style = np.full((n_frames, len(ids)), -1, dtype=np.int8)
+    style[frame, pidx] = marker_styles(tr).map(STYLE_CODES).to_numpy()
+
+    roster = pd.DataFrame({"player_id": ids})
+    if players is not None:
+        roster = roster.merge(players[["player_id", "first_name", "last_name", "shirt_number"]], on="player_id", how="left")
+    labels = marker_labels(roster).tolist()
+
+    ev_list = []
+    if events is not None and not events.empty:
+        ev = events[events["time_s"].between(t0, t0 + (n_frames - 1) * step)].sort_values("time_s")
+        slot = pd.Index(ids).get_indexer(pd.to_numeric(ev["player_id"], errors="coerce").fillna(-1).astype(int))
+        ev_list = [[float(ts), str(kind), int(p)] for ts, kind, p in zip(ev["time_s"], ev["event"], slot)]
+
+    return {
+        "t0": t0, "step": float(step), "frames": n_frames, "players": len(ids),
+        "labels": labels, "xy": xy.ravel().tolist(), "style": style.ravel().tolist(),
+        "events": ev_list,
+    }
+
+
+_PLAYER_JS = """
+<div id="pb" style="font-family:sans-serif">
+  <canvas id="pitch" style="width:100%;border-radius:6px"></canvas>
+  <div style="display:flex;gap:8px;align-items:center;margin-top:6px;flex-wrap:wrap">
+    <button id="back">⏮️</button><button id="play">▶️ Play</button><button id="fwd">⏭️</button>
+    <select id="speed">__SPEEDS__</select>
+    <label>Step (s) <input id="stepsize" type="number" min="__STEP__" step="__STEP__" value="__STEP_DEFAULT__" style="width:4em"></label>
+    <input id="scrub" type="range" min="0" max="0" step="any" style="flex:1">
+    <span id="clock" style="min-width:5em;text-align:right"></span>
+  </div>
+  <div id="events" style="font-size:0.85em;color:#444;min-height:1.4em;margin-top:4px"></div>
+</div>
+<script>
+const D = __PAYLOAD__, STY = __STYLES__, EXT = __EXTENT__, WIN = __WINDOW__;
+const P = D.players, T = D.frames;
+const cv = document.getElementById("pitch"), ctx = cv.getContext("2d");
+const bg = new Image(); bg.src = "data:image/png;base64,__BACKGROUND__";
+let cur = 0, playing = false, last = null;
+const el = id => document.getElementById(id);
+el("scrub").max = T - 1;
+
+function px(x, y) {
+  return [(x - EXT[0]) / (EXT[1] - EXT[0]) * cv.width, (1 - (y - EXT[2]) / (EXT[3] - EXT[2])) * cv.height];
+}
+function at(f, p) {
+  const i = (f * P + p) * 2;
+  return D.xy[i] < 0 ? null : [D.xy[i] / 10, D.xy[i + 1] / 10];
+}
+function draw() {
+  ctx.clearRect(0, 0, cv.width, cv.height);
+  if (bg.complete) ctx.drawImage(bg, 0, 0, cv.width, cv.height);
+  const f0 = Math.floor(cur), f1 = Math.min(f0 + 1, T - 1), a = cur - f0;
+  const now = D.t0 + cur * D.step;
+  const active = new Set(D.events.filter(e => Math.abs(e[0] - now) <= WIN && e[2] >= 0).map(e => e[2]));
+  const r = cv.width / 60;
+  ctx.textAlign = "center"; ctx.textBaseline = "middle"; ctx.font = `bold ${Math.round(r)}px sans-serif`;
+  for (let p = 0; p < P; p++) {
+    const A = at(f0, p); if (!A) continue;
+    const B = at(f1, p) || A;
+    const [x, y] = px(A[0] + (B[0] - A[0]) * a, A[1] + (B[1] - A[1]) * a);
+    const s = STY[D.style[f0 * P + p]] || STY[0];
+    if (active.has(p)) { ctx.beginPath(); ctx.arc(x, y, r * 1.6, 0, 2 * Math.PI); ctx.strokeStyle = s.edge; ctx.lineWidth = 2; ctx.stroke(); }
+    ctx.beginPath(); ctx.arc(x, y, r, 0, 2 * Math.PI);
+    ctx.fillStyle = s.face; ctx.fill(); ctx.strokeStyle = s.edge; ctx.lineWidth = 2; ctx.stroke();
+    ctx.fillStyle = s.text; ctx.fillText(D.labels[p], x, y);
+  }
+  const m = Math.floor(now / 60), sec = (now % 60).toFixed(1).padStart(4, "0");
+  el("clock").textContent = `${m}:${sec}`;
+  el("scrub").value = cur;
+  el("events").textContent = D.events.filter(e => Math.abs(e[0] - now) <= WIN)
+    .map(e => `${e[0]}s ${e[1]}${e[2] >= 0 ? " (" + D.labels[e[2]] + ")" : ""}`).join(" · ");
+}
+function tick(ts) {
+  if (playing && last !== null) {
+    cur += (ts - last) / 1000 * parseFloat(el("speed").value) / D.step;
+    if (cur >= T - 1) { cur = T - 1; setPlaying(false); }
+  }
+  last = ts; draw(); requestAnimationFrame(tick);
+}
+function setPlaying(on) { playing = on; el("play").textContent = on ? "⏸️ Pause" : "▶️ Play"; }
+function stepBy(dir) { cur = Math.max(0, Math.min(T - 1, cur + dir * parseFloat(el("stepsize").value) / D.step)); }
+function resize() { cv.width = cv.clientWidth; cv.height = cv.clientWidth * (EXT[3] - EXT[2]) / (EXT[1] - EXT[0]); }
+el("play").onclick = () => setPlaying(!playing);
+el("back").onclick = () => stepBy(-1);
+el("fwd").onclick = () => stepBy(1);
+el("scrub").oninput = e => { cur = parseFloat(e.target.value); };
+window.addEventListener("resize", resize); resize();
+requestAnimationFrame(tick);
+</script>
+"""
+
+
+def _script_json(value):
+    """JSON safe to inline in a <script>: "<" is escaped, so a name containing "</script>" can't close it."""
+    return json.dumps(value, separators=(",", ":")).replace("<", "\\u003c")
+
+
+def player_html(payload, default_speed=1, default_step=1):
+    """Self-contained HTML/JS for the canvas player."""
+    speeds = "".join(f'<option value="{s}"{" selected" if s == default_speed else ""}>{s}x</option>' for s in SPEEDS)
+    styles = [STYLES[name] for name in STYLE_CODES]
+    background = base64.b64encode(static_pitch_png()).decode()
+    replacements = {
+        "__PAYLOAD__": _script_json(payload),
+        "__STYLES__": _script_json(styles),
+        "__EXTENT__": _script_json(list(EXTENT)),
+        "__WINDOW__": str(EVENT_WINDOW_S),
+        "__SPEEDS__": speeds,
+        "__STEP__": str(payload["step"]),
+        "__STEP_DEFAULT__": str(max(default_step, payload["step"])),
+        "__BACKGROUND__": background,
+    }
+    html = _PLAYER_JS
+    for key, value in replacements.items():
+        html = html.replace(key, value)
+    return html
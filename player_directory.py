@@ -0,0 +1,53 @@
+"""
+Player lookups built once per version of the players table.
+
+Display names are computed column-wise and made unique (shirt number, then id, is
+appended to duplicates) so every selectbox label maps back to exactly one player.
+"""
+import pandas as pd
+
+
+class PlayerDirectory:
+    def __init__(self, players: pd.DataFrame):
+        df = players.reset_index(drop=True)
+        blank = pd.Series("", index=df.index)
+        first = df.get("first_name", blank).fillna("").astype(str)
+        last = df.get("last_name", blank).fillna("").astype(str)
+        full = (first + " " + last).str.strip()
+
+        label = full.copy()
+        dup = label.duplicated(keep=False)
+        if dup.any():
+            shirt = pd.to_numeric(df.get("shirt_number", blank), errors="coerce").astype("Int64").astype("string")
+            label = label.mask(dup & shirt.notna(), full + " (#" + shirt + ")")
+            dup = label.duplicated(keep=False)
+            label = label.mask(dup, label + " [id " + df["player_id"].astype(str) + "]")
+
+        self.frame = df.assign(name=full, label=label)
+        ids = self.frame["player_id"].astype(int).tolist()
+        self._id_by_label = dict(zip(label, ids))
+        self._label_by_id = dict(zip(ids, label))
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def labels(self, sort_by=None):
+        frame = self.frame.sort_values(sort_by) if sort_by else self.frame
+        return frame["label"].tolist()
+
+    def id_for(self, label):
+        """player_id for a display label, or None."""
+        return self._id_by_label.get(label)
+
+    def ids_for(self, labels):
+        return [self._id_by_label[l] for l in labels if l in self._id_by_label]
+
+    def label_for(self, player_id):
+        return self._label_by_id.get(player_id)
+
+    def labels_for(self, player_ids):
+        return [self._label_by_id[p] for p in player_ids if p in self._label_by_id]
@@ -0,0 +1,143 @@
+"""
+Incremental player sync for GMS/Spond exports.
+
+Incoming rows are matched to existing players on rfu_id, then on a normalized
+"first|last" name key, so player_id never changes across re-imports and the ids
+referenced by analysis_scores, tracking and events stay valid. Only inserted,
+changed and retired players are written, in one transaction.
+"""
+import unicodedata
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+import db
+
+# Columns an export is allowed to overwrite. status and injury_notes belong to the coaches.
+SYNC_COLUMNS = ["rfu_id", "first_name", "last_name", "front_row_trained", "suspected_concussions"]
+# Spond only knows names; its other columns are placeholders.
+SPOND_COLUMNS = ["first_name", "last_name"]
+RETIRED = "retired"
+
+
+@dataclass
+class SyncReport:
+    inserted: pd.DataFrame = field(default_factory=pd.DataFrame)
+    updated: pd.DataFrame = field(default_factory=pd.DataFrame)
+    retired: pd.DataFrame = field(default_factory=pd.DataFrame)
+    unchanged: int = 0
+
+    @property
+    def is_noop(self):
+        return self.inserted.empty and self.updated.empty and self.retired.empty
+
+    def summary(self):
+        return {"inserted": len(self.inserted), "updated": len(self.updated),
+                "retired": len(self.retired), "unchanged": self.unchanged}
+
+
+def normalize_rfu_id(values: pd.Series) -> pd.Series:
+    """RFU ids as digit strings ('1779049.0' and 1779049 both -> '1779049'); blanks -> NA."""
+    s = values.astype("string").str.strip().str.replace(r"\.0+$", "", regex=True)
+    return s.where(s.str.fullmatch(r"\d+").fillna(False))
+
+
+def name_key(first: pd.Series, last: pd.Series) -> pd.Series:
+    """Case, accent and punctuation-insensitive "first|last" key."""
+    def clean(s):
+        s = s.fillna("").astype(str).map(lambda v: unicodedata.normalize("NFKD", v))
+        return s.str.encode("ascii", "ignore").str.decode("ascii").str.lower().str.replace(r"[^a-z]", "", regex=True)
+    return clean(first) + "|" + clean(last)
+
+
+def row_hash(df: pd.DataFrame, columns) -> pd.Series:
+    # Compare as text with "3.0" == "3", since Excel hands back floats for integer columns.
+    text = df[columns].astype("string").apply(lambda s: s.str.replace(r"\.0+$", "", regex=True)).fillna("")
+    return pd.util.hash_pandas_object(text, index=False)
+
+
+def _with_keys(df):
+    df = df.copy()
+    if "rfu_id" in df.columns:
+        df["rfu_id"] = normalize_rfu_id(df["rfu_id"])
+    blank = pd.Series("", index=df.index)
+    df["_key"] = name_key(df.get("first_name", blank), df.get("last_name", blank))
+    return df
+
+
+def plan_sync(incoming: pd.DataFrame, existing: pd.DataFrame, columns=SYNC_COLUMNS, retire_missing=True) -> SyncReport:
+    """Work out the diff between an export and the players table without writing anything."""
+    columns = [c for c in columns if c in incoming.columns and c in existing.columns]
+    inc = _with_keys(incoming[columns].reset_index(drop=True))
+    cur = _with_keys(existing)
+    has_rfu = "rfu_id" in columns
+    identified = inc["_key"] != "|"
+    if has_rfu:
+        identified |= inc["rfu_id"].notna()
+    inc = inc[identified]
+    if has_rfu:
+        # One row per RFU id (the last, whatever the name spelling); names dedupe the rest.
+        with_rfu = inc["rfu_id"].notna()
+        inc = pd.concat([inc[with_rfu].drop_duplicates("rfu_id", keep="last"),
+                         inc[~with_rfu].drop_duplicates("_key")]).sort_index()
+    else:
+        inc = inc.drop_duplicates("_key")
+    inc = inc.reset_index(drop=True)
+
+    # Match on rfu_id first, then on an unambiguous name key among players not yet matched.
+    pid = pd.Series(pd.NA, index=inc.index, dtype="Int64")
+    if has_rfu:
+        by_rfu = cur.dropna(subset=["rfu_id"]).drop_duplicates("rfu_id").set_index("rfu_id")["player_id"]
+        pid = inc["rfu_id"].map(by_rfu).astype("Int64")
+    free = cur[~cur["player_id"].isin(pid.dropna())]
+    free = free[~free["_key"].duplicated(keep=False)].set_index("_key")
+    by_name = inc["_key"].map(free["player_id"]).astype("Int64")
+    if has_rfu:
+        # Same name but a different RFU id is a different person.
+        other_rfu = inc["_key"].map(free["rfu_id"])
+        by_name = by_name.mask(inc["rfu_id"].notna() & other_rfu.notna() & (inc["rfu_id"] != other_rfu))
+    pid = pid.fillna(by_name)
+    pid = pid.mask(pid.duplicated() & pid.notna())
+
+    matched = inc[pid.notna()].set_index(pid[pid.notna()].astype("int64").rename("player_id"))
+    inserted = inc[pid.isna()].drop(columns=["_key"])
+
+    # Only compare fields the export provides, and never blank out existing values.
+    old = cur.set_index("player_id").loc[matched.index]
+    merged = matched[columns].combine_first(old[columns]).loc[matched.index, columns]
+    changed = row_hash(merged, columns).values != row_hash(old, columns).values
+    if "status" in old.columns:
+        changed |= (old["status"] == RETIRED).values
+    updated = merged[changed].reset_index()
+
+    retired = cur.iloc[0:0][["player_id", "first_name", "last_name"]]
+    if retire_missing:
+        gone = ~cur["player_id"].isin(matched.index) & (cur["status"].fillna("") != RETIRED)
+        retired = cur.loc[gone, ["player_id", "first_name", "last_name"]]
+    return SyncReport(inserted=inserted.reset_index(drop=True), updated=updated,
+                      retired=retired.reset_index(drop=True), unchanged=len(matched) - len(updated))
+
+
+def sync_players(incoming: pd.DataFrame, columns=SYNC_COLUMNS, retire_missing=True) -> SyncReport:
+    """Apply an export to the players table and report what changed."""
+    with db.get_pool().writer() as conn:
+        existing = pd.read_sql_query("SELECT * FROM players", conn)
+        report = plan_sync(incoming, existing, columns, retire_missing)
+        if report.is_noop:
+            return report
+        if not report.inserted.empty:
+            ins = report.inserted.assign(status="available")
+            cols = [c for c in ins.columns if c in db.table_columns("players", conn)]
+            conn.executemany(f"INSERT INTO players ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                             db.records(ins[cols]))
+        if not report.updated.empty:
+            cols = [c for c in report.updated.columns if c != "player_id"]
+            conn.executemany(
+                f"UPDATE players SET {', '.join(c + '=?' for c in cols)}, status=CASE WHEN status=? THEN 'available' ELSE status END WHERE player_id=?",
+                [r[:-1] + (RETIRED, r[-1]) for r in db.records(report.updated[cols + ["player_id"]])],
+            )
+        if not report.retired.empty:
+            conn.executemany("UPDATE players SET status=? WHERE player_id=?",
+                             [(RETIRED, int(pid)) for pid in report.retired["player_id"]])
+        db.bump_versions(conn, ["players"])
+    return report
@@ -0,0 +1,213 @@
+"""
+Batch per-player match reports.
+
+gather() reads everything a fixture's reports need in one go: GAME scores, event
+counts, work-rate rows and per-player heatmaps (one histogramdd over the fixture's
+tracking). build_reports() hands that context to each worker of a process pool
+once, through the pool initializer. Each worker then renders one page per player
+with the non-interactive Agg backend, and the pages come back as a zip of PDFs or PNGs.
+
+    python -m reports --fixture 3 --format pdf --out reports_fixture_3.zip
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+from matplotlib.figure import Figure
+
+import db
+import game_scores
+import spatial
+import tracking_store
+import work_rate
+from pitch_render import EXTENT, draw_heatmap, static_pitch
+from player_directory import PlayerDirectory
+
+FORMATS = ("pdf", "png")
+PAGE_SIZE = (8.27, 11.69)  # A4 portrait, inches
+PAGE_DPI = 120
+WORK_RATE_ROWS = [("distance_m", "Distance (m)"), ("sprint_m", "Sprint distance (m)"), ("sprints", "Sprints"),
+                  ("max_speed", "Top speed (m/s)"), ("minutes_on", "Minutes on"), ("involvements", "Involvements")]
+
+
+def selected_players(fixture_id):
+    """The fixture's selected squad, or everyone rated, tagged or tracked in it when none is saved."""
+    ids = db.selected_ids(fixture_id)
+    if ids:
+        return ids
+    df = db.fetch_df(
+        """SELECT player_id FROM analysis_scores WHERE fixture_id=:f UNION SELECT player_id FROM events WHERE fixture_id=:f
+           UNION SELECT player_id FROM work_rate WHERE fixture_id=:f""", {"f": int(fixture_id)})
+    return sorted(int(p) for p in df["player_id"].dropna())
+
+
+def gather(fixture_id, player_ids=None):
+    """Everything the reports for one fixture need, as plain picklable data."""
+    if game_scores.pending():
+        game_scores.refresh()
+    if work_rate.pending():
+        work_rate.refresh()
+    player_ids = list(player_ids) if player_ids is not None else selected_players(fixture_id)
+    fixture = db.fetch_df("SELECT * FROM fixtures WHERE fixture_id=?", (int(fixture_id),))
+    directory = PlayerDirectory(db.fetch_df("SELECT * FROM players"))
+    scores = db.fetch_df("SELECT * FROM game_fixture_scores WHERE fixture_id=?", (int(fixture_id),)).set_index("player_id")
+    summary = db.fetch_df("SELECT * FROM game_player_summary").set_index("player_id")
+    events = db.fetch_df("SELECT player_id, event FROM events WHERE fixture_id=? AND player_id IS NOT NULL", (int(fixture_id),))
+    counts = events.groupby(["player_id", "event"]).size()
+    wr = db.fetch_df("SELECT * FROM work_rate WHERE fixture_id=?", (int(fixture_id),)).set_index("player_id")
+    bounds = tracking_store.bounds(fixture_id)
+    tracking = tracking_store.time_range(fixture_id, *bounds, player_ids=player_ids) if bounds and player_ids else None
+    grids = spatial.player_grids(tracking, player_ids) if tracking is not None else np.zeros((len(player_ids), 0, 0))
+
+    players = []
+    for i, pid in enumerate(player_ids):
+        players.append({
+            "player_id": pid,
+            "label": directory.label_for(pid) or f"Player {pid}",
+            "game": {m: float(scores.at[pid, m]) for m in game_scores.METRICS} if pid in scores.index else None,
+            "season": {m: float(summary.at[pid, f"season_{m}"]) for m in game_scores.METRICS} if pid in summary.index else None,
+            "events": counts.loc[pid].to_dict() if pid in counts.index.get_level_values(0) else {},
+            "work_rate": {k: float(wr.at[pid, k]) for k, _ in WORK_RATE_ROWS} if pid in wr.index else None,
+            "grid": grids[i] if grids.size else None,
+        })
+    title = ""
+    if not fixture.empty:
+        f = fixture.iloc[0]
+        title = f"{f['team']} vs {f['opposition']} — {f['venue']} — {f['date']}"
+    return {"fixture_id": int(fixture_id), "title": title, "players": players}
+
+
+def filename(fixture_id, player, fmt):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", player["label"]).strip("_") or str(player["player_id"])
+    return f"fixture_{fixture_id}/{slug}_{player['player_id']}.{fmt}"
+
+
+def render_report(context, player, fmt="pdf"):
+    """One report page for one player, as PDF or PNG bytes."""
+    fig = Figure(figsize=PAGE_SIZE, dpi=PAGE_DPI)
+    grid = fig.add_gridspec(4, 2, height_ratios=[0.35, 2.2, 2.4, 1.6], hspace=0.35, wspace=0.3)
+    head = fig.add_subplot(grid[0, :])
+    head.set_axis_off()
+    head.text(0, 0.7, player["label"], fontsize=18, weight="bold")
+    head.text(0, 0.1, context["title"], fontsize=10, color="#444444")
+
+    radar = fig.add_subplot(grid[1, 0], polar=True)
+    series = {}
+    if player["game"]:
+        series["This match"] = player["game"]
+    if player["season"]:
+        series["Season avg"] = player["season"]
+    if series:
+        game_scores.draw_radar(radar, series, "GAME")
+    else:
+        radar.set_title("GAME (not rated)")
+
+    ev = fig.add_subplot(grid[1, 1])
+    if player["events"]:
+        names, values = zip(*sorted(player["events"].items(), key=lambda kv: kv[1]))
+        ev.barh(names, values, color="#C8102E")
+        ev.set_xlabel("Count")
+    else:
+        ev.text(0.5, 0.5, "No events tagged", ha="center", va="center")
+        ev.set_axis_off()
+    ev.set_title("Events")
+
+    pitch = fig.add_subplot(grid[2, :])
+    pitch.imshow(static_pitch(), extent=EXTENT, aspect="auto", zorder=0)
+    draw_heatmap(pitch, player["grid"])
+    pitch.set_xlim(EXTENT[:2])
+    pitch.set_ylim(EXTENT[2:])
+    pitch.set_axis_off()
+    pitch.set_title("Heatmap (time on pitch)")
+
+    table = fig.add_subplot(grid[3, :])
+    table.set_axis_off()
+    wr = player["work_rate"]
+    rows = [[label, f"{wr[key]:,.1f}" if wr else "—"] for key, label in WORK_RATE_ROWS]
+    table.table(cellText=rows, colLabels=["Work rate", "This match"], loc="upper center", cellLoc="left")
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=PAGE_DPI)
+    return buf.getvalue()
+
+
+# --- Process pool ---
+# Workers get the gathered context once via the initializer; tasks carry only an index.
+
+_context = None
+
+
+def _init_worker(context):
+    global _context
+    matplotlib.use("Agg")
+    _context = context
+
+
+def _render_one(args):
+    index, fmt = args
+    player = _context["players"][index]
+    return filename(_context["fixture_id"], player, fmt), render_report(_context, player, fmt)
+
+
+def build_reports(fixture_id, fmt="pdf", workers=None, player_ids=None, progress=None):
+    """
+    Render a report per player and zip them. Returns (zip bytes, stats) where stats has
+    reports, seconds and reports_per_s. `progress(done, total)` is called as pages finish.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    start = time.perf_counter()
+    context = gather(fixture_id, player_ids)
+    tasks = [(i, fmt) for i in range(len(context["players"]))]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        if workers == 1 or len(tasks) <= 1:
+            pages = ((filename(fixture_id, p, fmt), render_report(context, p, fmt)) for p in context["players"])
+            _write_pages(zf, pages, len(tasks), progress)
+        else:
+            # spawn, not fork: the Streamlit server process is multi-threaded.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(context,)) as pool:
+                _write_pages(zf, pool.map(_render_one, tasks), len(tasks), progress)
+    seconds = time.perf_counter() - start
+    stats = {
+        "fixture_id": int(fixture_id),
+        "format": fmt,
+        "reports": len(tasks),
+        "seconds": round(seconds, 3),
+        "reports_per_s": round(len(tasks) / seconds, 2) if seconds > 0 else None,
+    }
+    return buf.getvalue(), stats
+
+
+def _write_pages(zf, pages, total, progress):
+    for done, (name, data) in enumerate(pages, start=1):
+        zf.writestr(name, data)
+        if progress:
+            progress(done, total)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render per-player match reports for a fixture into a zip.")
+    ap.add_argument("--fixture", type=int, required=True)
+    ap.add_argument("--format", choices=FORMATS, default="pdf")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--out", default=None, help="zip path (default: reports_fixture_<id>.zip)")
+    args = ap.parse_args()
+    db.initialize_db()
+    data, stats = build_reports(args.fixture, args.format, args.workers)
+    out = args.out or f"reports_fixture_{args.fixture}.zip"
+    with open(out, "wb") as f:
+        f.write(data)
+    print(json.dumps({**stats, "out": out}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
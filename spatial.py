@@ -0,0 +1,148 @@
+"""
+Occupancy heatmaps and team-shape metrics per fixture.
+
+For each fixture the tracking (columnar store, keyframes and manual points, via
+tracking_store) is reduced once to:
+
+- an occupancy grid per team: seconds spent in each GRID_M x GRID_M cell of the
+  PITCH_LENGTH x PITCH_WIDTH pitch, bench time excluded. Grids from different
+  fixtures add up, so a season heatmap is a sum of small arrays.
+- per-frame team shape for KLR and OPP: centroid, width (spread across the pitch),
+  depth (spread along it) and compactness (mean distance to the centroid).
+
+Both are saved as one .npz per fixture under DATA_DIR/spatial, tagged with the
+fixture's tracking version (db.fixture_tracking_version), and recomputed only
+when that version moves.
+"""
+import numpy as np
+import pandas as pd
+
+import db
+import tracking_store
+from db import DATA_DIR
+from pitch_render import PITCH_LENGTH, PITCH_WIDTH
+
+SPATIAL_DIR = DATA_DIR / "spatial"
+GRID_M = 2
+X_EDGES = np.arange(0, PITCH_LENGTH + GRID_M, GRID_M)
+Y_EDGES = np.arange(0, PITCH_WIDTH + GRID_M, GRID_M)
+TEAMS = tracking_store.TEAMS
+FRAME_S = 0.1        # points within the same FRAME_S bucket form one frame
+MAX_DWELL_S = 5.0    # a point counts for the time to the player's next point, up to this
+SHAPE_COLUMNS = ["time_s", "team", "players", "cx", "cy", "width", "depth", "compactness"]
+
+
+def _dwell(tr):
+    """Seconds each row stands for: time to the same player's next row, capped."""
+    t = tr["time_s"].to_numpy(dtype=float)
+    player = tr["player_id"].to_numpy()
+    dt = np.r_[np.diff(t), np.nan]
+    dt[np.r_[player[1:] != player[:-1], True]] = np.nan
+    typical = np.nanmedian(dt) if np.isfinite(dt).any() else 1.0
+    return np.clip(np.nan_to_num(dt, nan=typical), 0, MAX_DWELL_S)
+
+
+def occupancy(tracking):
+    """{team: (len(X_EDGES)-1, len(Y_EDGES)-1) float32 grid of seconds} for on-pitch rows."""
+    tr = tracking.dropna(subset=["player_id", "time_s", "x_pct", "y_pct"]).sort_values(["player_id", "time_s"])
+    weight = _dwell(tr) if len(tr) else np.zeros(0)
+    bench = pd.to_numeric(tr["bench"], errors="coerce").fillna(0).to_numpy() > 0
+    team = tr["team"].fillna("KLR").astype(str).str.upper().to_numpy()
+    x = np.clip(tr["x_pct"].to_numpy(dtype=float), 0, PITCH_LENGTH)
+    y = np.clip(tr["y_pct"].to_numpy(dtype=float), 0, PITCH_WIDTH)
+    grids = {}
+    for name in TEAMS:
+        keep = (team == name) & ~bench
+        grid, _, _ = np.histogram2d(x[keep], y[keep], bins=(X_EDGES, Y_EDGES), weights=weight[keep])
+        grids[name] = grid.astype(np.float32)
+    return grids
+
+
+def player_grids(tracking, player_ids):
+    """(len(player_ids), x bins, y bins) occupancy in seconds, all players binned in one histogramdd."""
+    ids = np.asarray(player_ids, dtype=np.int64)
+    tr = tracking.dropna(subset=["player_id", "time_s", "x_pct", "y_pct"]).sort_values(["player_id", "time_s"])
+    weight = _dwell(tr) if len(tr) else np.zeros(0)
+    slot = pd.Index(ids).get_indexer(tr["player_id"].astype(np.int64))
+    keep = (slot >= 0) & ~(pd.to_numeric(tr["bench"], errors="coerce").fillna(0).to_numpy() > 0)
+    x = np.clip(tr["x_pct"].to_numpy(dtype=float), 0, PITCH_LENGTH)
+    y = np.clip(tr["y_pct"].to_numpy(dtype=float), 0, PITCH_WIDTH)
+    grids, _ = np.histogramdd((slot[keep], x[keep], y[keep]), weights=weight[keep],
+                              bins=(np.arange(len(ids) + 1) - 0.5, X_EDGES, Y_EDGES))
+    return grids.astype(np.float32)
+
+
+def team_shape(tracking):
+    """SHAPE_COLUMNS for every (frame, team), computed in one pass over all rows."""
+    tr = tracking.dropna(subset=["player_id", "time_s", "x_pct", "y_pct"])
+    bench = pd.to_numeric(tr["bench"], errors="coerce").fillna(0).to_numpy() > 0
+    tr = tr[~bench]
+    if tr.empty:
+        return pd.DataFrame(columns=SHAPE_COLUMNS)
+    frame = np.round(tr["time_s"].to_numpy(dtype=float) / FRAME_S).astype(np.int64)
+    team = tr["team"].fillna("KLR").astype(str).str.upper().eq("OPP").to_numpy().astype(np.int64)
+    x, y = tr["x_pct"].to_numpy(dtype=float), tr["y_pct"].to_numpy(dtype=float)
+
+    # Sort rows by (frame, team) so every group is a contiguous run for reduceat.
+    key = frame * 2 + team
+    order = np.argsort(key, kind="stable")
+    key, x, y = key[order], x[order], y[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    group = np.cumsum(np.r_[True, key[1:] != key[:-1]]) - 1
+    count = np.diff(np.r_[starts, len(key)])
+    cx = np.add.reduceat(x, starts) / count
+    cy = np.add.reduceat(y, starts) / count
+    spread = np.hypot(x - cx[group], y - cy[group])
+    return pd.DataFrame({
+        "time_s": (key[starts] // 2) * FRAME_S,
+        "team": np.asarray(TEAMS, dtype=object)[key[starts] % 2],
+        "players": count,
+        "cx": cx,
+        "cy": cy,
+        "width": np.maximum.reduceat(y, starts) - np.minimum.reduceat(y, starts),
+        "depth": np.maximum.reduceat(x, starts) - np.minimum.reduceat(x, starts),
+        "compactness": np.add.reduceat(spread, starts) / count,
+    }, columns=SHAPE_COLUMNS).round({"time_s": 3})
+
+
+def _path(fixture_id):
+    return SPATIAL_DIR / f"fixture_{int(fixture_id)}.npz"
+
+
+def _compute(fixture_id, version):
+    bounds = tracking_store.bounds(fixture_id)
+    tracking = tracking_store.time_range(fixture_id, *bounds) if bounds else pd.DataFrame(columns=tracking_store.TRACKING_COLUMNS)
+    grids, shape = occupancy(tracking), team_shape(tracking)
+    SPATIAL_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _path(fixture_id).with_suffix(".tmp.npz")
+    np.savez_compressed(
+        tmp, version=version,
+        **{f"grid_{name}": grid for name, grid in grids.items()},
+        shape_team=shape["team"].map(TEAMS.index).to_numpy(dtype=np.int8),
+        **{f"shape_{col}": shape[col].to_numpy(dtype=float) for col in SHAPE_COLUMNS if col != "team"},
+    )
+    tmp.replace(_path(fixture_id))
+    return grids, shape
+
+
+def load(fixture_id):
+    """(grids, shape) for a fixture, recomputed only when its tracking version has changed."""
+    version = db.fixture_tracking_version(fixture_id)
+    try:
+        with np.load(_path(fixture_id)) as f:
+            if int(f["version"]) == version:
+                grids = {name: f[f"grid_{name}"] for name in TEAMS}
+                shape = pd.DataFrame({col: f[f"shape_{col}"] for col in SHAPE_COLUMNS})
+                shape["team"] = np.asarray(TEAMS, dtype=object)[shape["team"].to_numpy()]
+                return grids, shape.astype({"players": "int64"})
+    except (FileNotFoundError, KeyError, ValueError):
+        pass
+    return _compute(fixture_id, version)
+
+
+def season_grid(fixture_ids, team="KLR", load=load):
+    """Sum of the fixtures' occupancy grids for one team; `load` may be a cached wrapper of load()."""
+    total = np.zeros((len(X_EDGES) - 1, len(Y_EDGES) - 1), dtype=np.float64)
+    for fixture_id in fixture_ids:
+        total += load(fixture_id)[0][team]
+    return total
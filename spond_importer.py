@@ -6,12 +6,16 @@ Spond does not currently offer an open API. You can export CSV or (optionally) u
 import pandas as pd
 from pathlib import Path
 
+from import_cache import cached_import
+
+@cached_import
 def parse_players_from_spond_csv(path: Path) -> pd.DataFrame:
     """
     Accept a CSV export from Spond and map to players schema.
+    player_id is not generated here; player_sync.sync_players matches rows to existing players.
     """
     df = pd.read_csv(path)
-    out = pd.DataFrame()
+    out = pd.DataFrame(index=df.index)
     # Try to infer common columns
     first = next((c for c in df.columns if c.lower() in ("first name","first_name","firstname","given name")), None)
     last = next((c for c in df.columns if c.lower() in ("last name","last_name","lastname","surname","family name")), None)
@@ -22,5 +26,4 @@ def parse_players_from_spond_csv(path: Path) -> pd.DataFrame:
     out["suspected_concussions"] = 0
     out["status"] = "available"
     out["injury_notes"] = ""
-    out.insert(0,"player_id", range(1, len(out)+1))
     return out
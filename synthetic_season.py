@@ -0,0 +1,307 @@
+"""
+Synthetic season for trying the app (and benchmarking it) at realistic scale.
+
+generate() writes a whole season into the current database: squads for several
+teams, fixtures on consecutive Saturdays, selections and availability, tagged
+events, GAME ratings, and 10 Hz tracking for every fixture in the columnar store.
+Tracking follows a phase of play that drifts up and down the pitch; each player
+holds a formation slot around it with some individual wander, and replacements come
+off the bench in the second half. Everything is seeded, so the same arguments give
+the same season.
+
+New rows get ids after the existing ones, so a real database is only added to;
+reset=True clears the season tables (and the tracking store) first. With --db, the
+columnar store, spatial arrays and import cache go to <name>_data/ beside that
+database (see use_data_dir), never into the club's data/.
+
+    python -m synthetic_season --fixtures 25 --teams 2 --minutes 80 --hz 10
+"""
+import argparse
+import datetime as dt
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import db
+import game_scores
+import import_cache
+import spatial
+import tracking_store
+import work_rate
+from event_index import EVENT_TYPES
+from pitch_render import PITCH_LENGTH, PITCH_WIDTH
+
+TEAMS = ["KLRUFC U17 Colts", "KLRUFC U15", "KLRUFC U13", "KLRUFC Seniors"]
+OPPOSITION = ["Kendal", "Sedbergh", "Windermere", "Penrith", "Lancaster", "Keswick", "Furness", "Carnforth",
+              "Vale of Lune", "Ulverston", "Cockermouth", "Aspatria"]
+FIRST_NAMES = ["James", "Jack", "Tom", "Harry", "Oliver", "George", "Charlie", "Alfie", "Sam", "Joe", "Ben",
+               "Will", "Max", "Ethan", "Lewis", "Owen", "Finn", "Rhys", "Callum", "Dan"]
+LAST_NAMES = ["Armer", "Barker", "Cross", "Dawson", "Ellis", "Fletcher", "Gibson", "Harrison", "Irving", "Jackson",
+              "Kirkby", "Lowther", "Mason", "Nelson", "Oakes", "Parker", "Robson", "Shaw", "Thompson", "Walker"]
+POSITIONS = ["Loosehead Prop", "Hooker", "Tighthead Prop", "Lock", "Lock", "Blindside Flanker", "Openside Flanker",
+             "Number 8", "Scrum-half", "Fly-half", "Left Wing", "Inside Centre", "Outside Centre", "Right Wing",
+             "Fullback"]
+# Formation slot per shirt 1-15 relative to the phase of play (metres back, metres across).
+SLOTS = np.array([(-2, -3), (-2, 0), (-2, 3), (-4, -2), (-4, 2), (-3, -7), (-3, 7), (-6, 0),
+                  (-5, -4), (-10, -8), (-18, -28), (-13, -14), (-15, -20), (-18, 28), (-25, 0)], dtype=float)
+# Relative frequency of each EVENT_TYPES entry in a match.
+EVENT_WEIGHTS = {"Carry": 30, "Tackle": 40, "Ruck Clean": 25, "Jackal": 4, "Offload": 5, "Linebreak": 3, "Kick": 12,
+                 "Pass": 60, "Turnover Won": 6, "Try": 2, "Penalty Won": 6}
+OPP_ID_BASE = 900_000  # opposition player ids, clear of the club's own
+SQUAD = 30
+MATCHDAY = 23  # 15 starters and 8 replacements
+BENCH_XY = (PITCH_LENGTH / 2, -3.0)
+
+SEASON_TABLES = ["events", "analysis_scores", "availability", "fixture_selection", "tracking", "tracking_keyframes",
+                 "work_rate", "work_rate_dirty", "game_fixture_scores", "game_player_summary", "game_scores_dirty",
+                 "fixtures", "players"]
+
+
+def data_dir_for(db_path):
+    """Where a database's file-backed data lives: data/ for the club database, <name>_data/ beside any other."""
+    path = Path(db_path).resolve()
+    if path == (db.DATA_DIR / "club.db").resolve():
+        return db.DATA_DIR
+    return path.with_name(f"{path.stem}_data")
+
+
+def use_data_dir(root):
+    """Point the columnar store, spatial arrays and import cache at `root` (scripts and benchmarks)."""
+    root = Path(root)
+    tracking_store.STORE_DIR = root / "tracking_store"
+    spatial.SPATIAL_DIR = root / "spatial"
+    import_cache.CACHE_DIR = root / "import_cache"
+
+
+def _next_id(table, key):
+    return int(db.fetch_one(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")[0]) + 1
+
+
+def _reset():
+    for fixture_id in db.fetch_df("SELECT fixture_id FROM fixtures")["fixture_id"]:
+        tracking_store.delete(int(fixture_id))
+    with db.get_pool().writer() as conn:
+        for table in SEASON_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        db.bump_versions(conn, SEASON_TABLES)
+
+
+def squads(teams, rng, first_id=1):
+    """SQUAD players per team with shirt, position and GAME baselines."""
+    rows = []
+    for t, team in enumerate(teams):
+        for i in range(SQUAD):
+            shirt = i % 15 + 1
+            rows.append({
+                "player_id": first_id + t * SQUAD + i,
+                "rfu_id": str(1_700_000 + first_id + t * SQUAD + i),
+                "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES),
+                "front_row_trained": "Yes" if shirt <= 3 else "No",
+                "suspected_concussions": 0,
+                "status": "available",
+                "injury_notes": "",
+                "shirt_number": shirt,
+                "position": POSITIONS[shirt - 1],
+                "team": team,
+            })
+    players = pd.DataFrame(rows)
+    players["skill"] = rng.normal(5.5, 1.0, len(players)).clip(2.5, 8.5)
+    players["trend"] = rng.normal(0.03, 0.05, len(players))
+    return players
+
+
+def fixture_list(teams, n, rng, first_id=1, start=dt.date(2025, 9, 6)):
+    """n fixtures shared round-robin between teams, one per team each Saturday."""
+    rows = []
+    for i in range(n):
+        rows.append({
+            "fixture_id": first_id + i,
+            "team": teams[i % len(teams)],
+            "opposition": OPPOSITION[int(rng.integers(len(OPPOSITION)))],
+            "venue": "Home" if i // len(teams) % 2 == 0 else "Away",
+            "ground_address": "Underley Park, Kirkby Lonsdale",
+            "date": str(start + dt.timedelta(weeks=i // len(teams))),
+            "kickoff": "11:00" if i % 2 else "14:30",
+        })
+    return pd.DataFrame(rows)
+
+
+def matchday(squad, rng):
+    """(availability rows, selection) for one fixture: a starter and a replacement per shirt where possible."""
+    available = rng.random(len(squad)) > 0.12
+    avail = pd.DataFrame({"player_id": squad["player_id"], "available": available.astype(int),
+                          "reason": np.where(available, "", rng.choice(["Injured", "Away", "Exams", "Illness"], len(squad)))})
+    pool = squad[available].sample(frac=1, random_state=int(rng.integers(2**31)))
+    starters = pool.drop_duplicates("shirt_number").sort_values("shirt_number")
+    rest = pool.drop(starters.index)
+    chosen = pd.concat([starters, rest]).head(MATCHDAY)
+    selection = pd.DataFrame({"player_id": chosen["player_id"].to_numpy(),
+                              "shirt_number": np.arange(1, len(chosen) + 1),
+                              "position": [POSITIONS[i] if i < 15 else "Replacement" for i in range(len(chosen))]})
+    return avail, selection
+
+
+def _wander(rng, players, n, hz, scale):
+    """Smooth per-player offsets: AR(1) at 1 Hz, linearly interpolated to hz."""
+    steps = int(np.ceil(n / hz)) + 2
+    noise = rng.normal(0, scale, (players, steps))
+    out = np.empty_like(noise)
+    out[:, 0] = noise[:, 0]
+    for k in range(1, steps):
+        out[:, k] = 0.85 * out[:, k - 1] + noise[:, k]
+    coarse = np.arange(steps)
+    fine = np.arange(n) / hz
+    return np.stack([np.interp(fine, coarse, row) for row in out])
+
+
+def _reflect(v, lo, hi):
+    span = hi - lo
+    v = np.mod(v - lo, 2 * span)
+    return lo + np.where(v > span, 2 * span - v, v)
+
+
+def tracking(klr_ids, opp_ids, minutes, hz, rng):
+    """to_columns()-style arrays for one fixture; klr_ids[:15] start, the rest come on in the second half."""
+    n = int(minutes * 60 * hz)
+    t = np.arange(n) / hz
+    # Phase of play: a slow random walk around the pitch.
+    steps = int(np.ceil(n / hz)) + 2
+    walk = np.cumsum(rng.normal(0, 2.5, (2, steps)), axis=1)
+    px = _reflect(PITCH_LENGTH / 2 + np.interp(t, np.arange(steps), walk[0]), 15, PITCH_LENGTH - 15)
+    py = _reflect(PITCH_WIDTH / 2 + np.interp(t, np.arange(steps), walk[1]), 18, PITCH_WIDTH - 18)
+
+    starters, bench = list(klr_ids[:15]), list(klr_ids[15:])
+    ids = np.array(starters + bench + list(opp_ids), dtype=np.int64)
+    slot = np.r_[np.arange(len(starters)), np.zeros(len(bench), int), np.arange(len(opp_ids)) % 15]
+    side = np.r_[np.ones(len(klr_ids)), -np.ones(len(opp_ids))]  # KLR attack +x, OPP -x
+    on = np.ones((len(ids), n), dtype=bool)
+    on[len(starters):len(klr_ids)] = False
+    # Replacements: each takes a starter's slot at a time in the second half.
+    off_at = rng.uniform(0.55, 0.9, len(bench)) * n
+    swapped = rng.choice(len(starters), size=len(bench), replace=False)
+    for k, (frame, starter) in enumerate(zip(off_at.astype(int), swapped)):
+        on[starter, frame:] = False
+        on[len(starters) + k, frame:] = True
+        slot[len(starters) + k] = slot[starter]
+
+    w = _wander(rng, len(ids), n, hz, 1.2)
+    x = px + side[:, None] * SLOTS[slot, 0][:, None] + w
+    y = py + SLOTS[slot, 1][:, None] + _wander(rng, len(ids), n, hz, 1.2)
+    x = np.where(on, np.clip(x, 0, PITCH_LENGTH), BENCH_XY[0])
+    y = np.where(on, np.clip(y, 0, PITCH_WIDTH), BENCH_XY[1])
+    team = np.r_[np.zeros(len(klr_ids)), np.ones(len(opp_ids))].astype(np.int8)
+    return {
+        "time": np.tile(t, len(ids)),
+        "player_id": np.repeat(ids, n),
+        "x": x.ravel().astype(np.float32),
+        "y": y.ravel().astype(np.float32),
+        "team": np.repeat(team, n),
+        "bench": (~on).ravel().astype(np.int8),
+    }
+
+
+def events(fixture_id, klr_ids, opp_ids, minutes, rng, per_match=190):
+    """Tagged events at whole seconds; tackles are sometimes followed by a turnover for the same side."""
+    kinds = np.array(EVENT_TYPES)
+    weights = np.array([EVENT_WEIGHTS.get(k, 1) for k in EVENT_TYPES], dtype=float)
+    n = int(rng.poisson(per_match))
+    kind = rng.choice(kinds, n, p=weights / weights.sum())
+    t = np.sort(rng.integers(0, int(minutes * 60), n))
+    klr = rng.random(n) < 0.55
+    pid = np.where(klr, rng.choice(klr_ids[:15], n), rng.choice(opp_ids, n))
+    df = pd.DataFrame({"fixture_id": fixture_id, "time_s": t, "event": kind, "player_id": pid,
+                       "team": np.where(klr, "KLR", "OPP"), "notes": ""})
+    tackles = df[(df["event"] == "Tackle") & (rng.random(n) < 0.15)]
+    turnovers = tackles.assign(time_s=tackles["time_s"] + rng.integers(1, 8, len(tackles)), event="Turnover Won")
+    return pd.concat([df, turnovers]).sort_values("time_s", kind="stable").reset_index(drop=True)
+
+
+def ratings(fixture_id, seq, selection, players, rng):
+    """One or two coach ratings per selected player, around their skill and season trend."""
+    squad = players.set_index("player_id").loc[selection["player_id"]]
+    rows = []
+    for _ in range(int(rng.integers(1, 3))):
+        base = squad["skill"].to_numpy() + squad["trend"].to_numpy() * seq
+        scores = np.clip(np.rint(base[:, None] + rng.normal(0, 1.1, (len(squad), len(game_scores.METRICS)))), 1, 9)
+        part = pd.DataFrame(scores.astype(int), columns=game_scores.METRICS)
+        part.insert(0, "player_id", squad.index.to_numpy())
+        part.insert(0, "fixture_id", fixture_id)
+        part["notes"] = ""
+        rows.append(part)
+    return pd.concat(rows, ignore_index=True)
+
+
+def _insert(table, df):
+    cols = list(df.columns)
+    return db.execute_many(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                           db.records(df), tables=[table])
+
+
+def generate(fixtures=25, teams=2, minutes=80, hz=10, seed=1, reset=False, with_tracking=True, progress=None):
+    """
+    Write a synthetic season into the current database and return counts and timings.
+    `progress(done, total)` is called after each fixture.
+    """
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    if reset:
+        _reset()
+    names = TEAMS[:max(1, min(teams, len(TEAMS)))]
+    players = squads(names, rng, _next_id("players", "player_id"))
+    fixture_rows = fixture_list(names, fixtures, rng, _next_id("fixtures", "fixture_id"))
+    _insert("players", players.drop(columns=["team", "skill", "trend"]))
+    _insert("fixtures", fixture_rows)
+
+    counts = {"players": len(players), "fixtures": len(fixture_rows), "events": 0, "ratings": 0, "tracking_rows": 0}
+    seq = {}
+    for done, fx in enumerate(fixture_rows.itertuples(index=False), start=1):
+        squad = players[players["team"] == fx.team]
+        avail, selection = matchday(squad, rng)
+        _insert("availability", avail.assign(fixture_id=fx.fixture_id))
+        db.save_selection(fx.fixture_id, selection.itertuples(index=False))
+        klr_ids = selection["player_id"].to_numpy()
+        opp_ids = OPP_ID_BASE + fx.fixture_id * 100 + np.arange(1, 16)
+        ev = events(fx.fixture_id, klr_ids, opp_ids, minutes, rng)
+        counts["events"] += _insert("events", ev)
+        seq[fx.team] = seq.get(fx.team, -1) + 1
+        counts["ratings"] += _insert("analysis_scores", ratings(fx.fixture_id, seq[fx.team], selection, players, rng))
+        if with_tracking:
+            counts["tracking_rows"] += tracking_store.ingest(fx.fixture_id, [tracking(klr_ids, opp_ids, minutes, hz, rng)])
+        if progress:
+            progress(done, len(fixture_rows))
+    counts["generate_s"] = round(time.perf_counter() - start, 2)
+
+    # Warm the materialized aggregates so the first page view doesn't pay for them.
+    start = time.perf_counter()
+    counts["game_players_refreshed"] = game_scores.refresh()
+    counts["work_rate_rows_refreshed"] = work_rate.refresh()
+    counts["refresh_s"] = round(time.perf_counter() - start, 2)
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write a synthetic season into the club database.")
+    ap.add_argument("--fixtures", type=int, default=25)
+    ap.add_argument("--teams", type=int, default=2, help=f"club teams, up to {len(TEAMS)}")
+    ap.add_argument("--minutes", type=float, default=80, help="tracked minutes per fixture")
+    ap.add_argument("--hz", type=float, default=10, help="tracking rate")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--no-tracking", action="store_true")
+    ap.add_argument("--reset", action="store_true", help="clear players, fixtures and match data first")
+    ap.add_argument("--db", default=None, help="database path (default: data/club.db)")
+    args = ap.parse_args()
+    if args.db:
+        db.use_database(args.db)
+        use_data_dir(data_dir_for(args.db))
+    db.initialize_db()
+    counts = generate(args.fixtures, args.teams, args.minutes, args.hz, args.seed, args.reset, not args.no_tracking,
+                      progress=lambda done, total: print(f"fixture {done}/{total}", flush=True))
+    print(json.dumps({**counts, "db": str(db.DB_PATH), "tracking_store": str(tracking_store.STORE_DIR)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Columnar, memory-mapped tracking store for high-frequency position data.
+
+Each fixture lives in DATA_DIR/tracking_store/fixture_<id>/ as one .npy file per
+column (time, player index, x, y, team, bench), sorted by time, plus a small
+manifest.json. Arrays are opened with mmap_mode="r", so opening an 80-minute 10 Hz
+fixture reads only the pages a query touches.
+
+The module-level snapshot/time_range/bounds functions are what the pitch view uses:
+they merge the columnar data with positions interpolated from coach keyframes (see
+keyframes) and rows in the SQLite `tracking` table, which stays the home of manual
+canvas points. For the same player and time a manual point beats a keyframe
+position, which beats the recorded data.
+"""
+import json
+import shutil
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import db
+import keyframes
+from db import DATA_DIR
+
+STORE_DIR = DATA_DIR / "tracking_store"
+TEAMS = ["KLR", "OPP"]
+COLUMNS = {
+    "time": np.float64,
+    "player": np.int32,  # index into players.npy
+    "x": np.float32,
+    "y": np.float32,
+    "team": np.int8,     # index into TEAMS
+    "bench": np.int8,
+}
+TRACKING_COLUMNS = ["fixture_id", "time_s", "player_id", "x_pct", "y_pct", "team", "bench"]
+
+
+def fixture_dir(fixture_id):
+    return STORE_DIR / f"fixture_{int(fixture_id)}"
+
+
+def has_fixture(fixture_id):
+    return (fixture_dir(fixture_id) / "manifest.json").exists()
+
+
+class ColumnarFixture:
+    """Read-only view over one fixture's memory-mapped columns."""
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = json.loads((path / "manifest.json").read_text())
+        self.fixture_id = self.manifest["fixture_id"]
+        self.player_ids = np.load(path / "players.npy")
+        self.cols = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+        self.time = self.cols["time"]
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def bounds(self):
+        return (self.manifest["t_min"], self.manifest["t_max"]) if len(self) else None
+
+    def _frame(self, sl):
+        c = self.cols
+        player = np.asarray(c["player"][sl])
+        return pd.DataFrame({
+            "fixture_id": self.fixture_id,
+            "time_s": np.asarray(c["time"][sl]),
+            "player_id": self.player_ids[player],
+            "x_pct": np.asarray(c["x"][sl]),
+            "y_pct": np.asarray(c["y"][sl]),
+            "team": np.asarray(TEAMS, dtype=object)[np.asarray(c["team"][sl])],
+            "bench": np.asarray(c["bench"][sl]),
+        }, columns=TRACKING_COLUMNS)
+
+    def range_slice(self, start_s, end_s):
+        lo = int(np.searchsorted(self.time, start_s, side="left"))
+        hi = int(np.searchsorted(self.time, end_s, side="right"))
+        return slice(lo, hi)
+
+    def range(self, start_s, end_s, player_ids=None):
+        df = self._frame(self.range_slice(start_s, end_s))
+        return df if player_ids is None else df[df["player_id"].isin(list(player_ids))].reset_index(drop=True)
+
+    def snapshot(self, time_s, tolerance=None):
+        """Each player's latest sample in (time_s - tolerance, time_s]; tolerance defaults to one sample period."""
+        tolerance = self.manifest["period_s"] if tolerance is None else tolerance
+        sl = self.range_slice(np.nextafter(time_s - tolerance, np.inf), time_s)
+        player = np.asarray(self.cols["player"][sl])
+        if not len(player):
+            return self._frame(slice(0, 0))
+        # Rows are time-sorted, so the last occurrence of each player is its latest sample.
+        _, last_rev = np.unique(player[::-1], return_index=True)
+        keep = sl.start + (len(player) - 1 - last_rev)
+        return self._frame(np.sort(keep)).sort_values("player_id").reset_index(drop=True)
+
+    def snapshots(self, times, tolerance=None):
+        """snapshot() at each of the sorted `times`, from one read of the player column; rows carry "k"."""
+        tolerance = self.manifest["period_s"] if tolerance is None else tolerance
+        times = np.asarray(times, dtype=float)
+        if not len(times):
+            return self._frame(slice(0, 0)).assign(k=np.zeros(0, dtype=np.int64))
+        lo = np.searchsorted(self.time, np.nextafter(times - tolerance, np.inf), side="left")
+        hi = np.searchsorted(self.time, times, side="right")
+        start = int(lo.min())
+        player = np.asarray(self.cols["player"][start:int(hi.max())])
+        keep, ks = [], []
+        for k, (a, b) in enumerate(zip(lo - start, hi - start)):
+            _, last_rev = np.unique(player[a:b][::-1], return_index=True)
+            keep.append(start + b - 1 - last_rev)
+            ks.append(np.full(len(last_rev), k))
+        keep, ks = np.concatenate(keep), np.concatenate(ks)
+        return self._frame(keep).assign(k=ks)
+
+    def to_frame(self):
+        return self._frame(slice(0, len(self)))
+
+
+_open_lock = threading.Lock()
+_open = {}
+
+
+def open_fixture(fixture_id):
+    """The fixture's ColumnarFixture, or None; reopened only when its manifest changes."""
+    manifest = fixture_dir(fixture_id) / "manifest.json"
+    try:
+        stamp = manifest.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _open_lock:
+        cached = _open.get(int(fixture_id))
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, ColumnarFixture(manifest.parent))
+            _open[int(fixture_id)] = cached
+        return cached[1]
+
+
+def to_columns(df):
+    """Compact column arrays for tracking rows, dropping rows without a time, player or position."""
+    def num(col):
+        return pd.to_numeric(df[col], errors="coerce").astype("float64").to_numpy()
+    t, pid, x, y = num("time_s"), num("player_id"), num("x_pct"), num("y_pct")
+    ok = np.isfinite(t) & np.isfinite(pid) & np.isfinite(x) & np.isfinite(y)
+    team = df["team"].fillna("KLR").astype(str).str.upper().eq("OPP").to_numpy() if "team" in df else np.zeros(len(df), bool)
+    bench = np.nan_to_num(num("bench")) if "bench" in df else np.zeros(len(df))
+    return {
+        "time": t[ok],
+        "player_id": pid[ok].astype(np.int64),
+        "x": x[ok].astype(np.float32),
+        "y": y[ok].astype(np.float32),
+        "team": team[ok].astype(np.int8),
+        "bench": bench[ok].astype(np.int8),
+    }
+
+
+def ingest(fixture_id, frames, mode="replace"):
+    """
+    Write tracking rows (DataFrames with the tracking table's columns) for one fixture.
+
+    `frames` may be a single DataFrame or an iterable of chunks (DataFrames or
+    to_columns() dicts, which keep memory compact while streaming); mode="append"
+    merges with the fixture's existing columnar data. Returns the fixture's row count.
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    parts = [f if isinstance(f, dict) else to_columns(f) for f in frames]
+    if mode == "append" and has_fixture(fixture_id):
+        parts.insert(0, to_columns(open_fixture(fixture_id).to_frame()))
+    parts = [p for p in parts if len(p["time"])]
+    if not parts:
+        return 0
+    cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    player_ids, player = np.unique(cols.pop("player_id"), return_inverse=True)
+    cols["player"] = player.astype(np.int32)
+    order = np.lexsort((cols["player"], cols["time"]))
+
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    final = fixture_dir(fixture_id)
+    tmp = STORE_DIR / f".{final.name}.{uuid.uuid4().hex}"
+    tmp.mkdir()
+    for name, dtype in COLUMNS.items():
+        np.save(tmp / f"{name}.npy", cols[name][order].astype(dtype, copy=False))
+    np.save(tmp / "players.npy", player_ids)
+    t = cols["time"]
+    diffs = np.diff(np.unique(t))
+    manifest = {
+        "fixture_id": int(fixture_id),
+        "rows": int(len(t)),
+        "players": int(len(player_ids)),
+        "t_min": float(t.min()),
+        "t_max": float(t.max()),
+        "period_s": float(np.median(diffs)) if len(diffs) else 1.0,
+        "columns": {name: np.dtype(dtype).name for name, dtype in COLUMNS.items()},
+        "teams": TEAMS,
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    # Swap directories so readers see either the old or the new fixture, never a mix.
+    old = None
+    if final.exists():
+        old = STORE_DIR / f".{final.name}.old.{uuid.uuid4().hex}"
+        final.rename(old)
+    tmp.rename(final)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    _bump(fixture_id)
+    return manifest["rows"]
+
+
+def delete(fixture_id):
+    shutil.rmtree(fixture_dir(fixture_id), ignore_errors=True)
+    with _open_lock:
+        _open.pop(int(fixture_id), None)
+    _bump(fixture_id)
+
+
+def export(fixture_id, path):
+    """Write a fixture's columnar tracking to CSV in the tracking table's layout."""
+    fx = open_fixture(fixture_id)
+    if fx is None:
+        raise FileNotFoundError(f"No columnar tracking for fixture {fixture_id}")
+    fx.to_frame().to_csv(path, index=False)
+    return len(fx)
+
+
+def _bump(fixture_id):
+    # Cached frames and payloads are keyed on the tracking version, columnar or not.
+    with db.get_pool().writer() as conn:
+        db.bump_versions(conn, ["tracking", f"tracking:{int(fixture_id)}"])
+        # The columnar store bypasses the tracking table's triggers, so mark the whole
+        # fixture's work-rate summaries stale here.
+        conn.execute("INSERT OR IGNORE INTO work_rate_dirty (fixture_id, player_id) VALUES (?, NULL)", (int(fixture_id),))
+
+
+# --- Combined reads (columnar store + tracking table) ---
+
+def _merge(store_df, table_df):
+    if store_df is None or store_df.empty:
+        return table_df
+    if table_df.empty:
+        return store_df
+    both = pd.concat([store_df, table_df], ignore_index=True)
+    return both.drop_duplicates(["time_s", "player_id"], keep="last").sort_values(["time_s", "player_id"]).reset_index(drop=True)
+
+
+def _override(base, top):
+    """Rows of `base` for players not in `top`, plus `top` (one instant)."""
+    if base is None or base.empty:
+        return top
+    return _merge(base[~base["player_id"].isin(top["player_id"])], top)
+
+
+def _override_each(base, top):
+    """_override() per instant "k"."""
+    if base is None or base.empty:
+        return top
+    if top.empty:
+        return base
+    covered = pd.MultiIndex.from_frame(base[["k", "player_id"]]).isin(pd.MultiIndex.from_frame(top[["k", "player_id"]]))
+    return pd.concat([base[~covered], top], ignore_index=True)
+
+
+def snapshot(fixture_id, time_s, method="linear"):
+    fx = open_fixture(fixture_id)
+    frame = fx.snapshot(time_s) if fx else None
+    frame = _override(frame, keyframes.snapshot(fixture_id, time_s, method))
+    # Manual points replace the recorded position for the same player at this instant.
+    frame = _override(frame, db.tracking_snapshot(fixture_id, time_s))
+    return frame.sort_values("player_id").reset_index(drop=True)
+
+
+def snapshots(fixture_id, times, method="linear"):
+    """
+    snapshot() at each of the sorted, unique `times`, reading each layer once over the
+    whole span; rows carry the position of their time in `times` as "k".
+    """
+    times = np.asarray(times, dtype=float)
+    fx = open_fixture(fixture_id)
+    frame = fx.snapshots(times) if fx else None
+    keyed = keyframes.load(fixture_id).interpolate(times, method)
+    frame = _override_each(frame, keyed.assign(k=np.searchsorted(times, keyed["time_s"].to_numpy(dtype=float))))
+    if len(times):
+        table = db.tracking_range(fixture_id, np.floor(times[0]), np.ceil(times[-1]))
+        table = table[table["time_s"].isin(times)]
+        frame = _override_each(frame, table.assign(k=np.searchsorted(times, table["time_s"].to_numpy(dtype=float))))
+    return frame.sort_values(["k", "player_id"]).reset_index(drop=True)
+
+
+def time_range(fixture_id, start_s, end_s, player_ids=None, method="linear", step=None):
+    """
+    Every tracking row in [start_s, end_s]. Keyframed players are interpolated every
+    `step` seconds (the columnar sample period, else one second).
+    """
+    fx = open_fixture(fixture_id)
+    step = step or (fx.manifest["period_s"] if fx else 1.0)
+    table = db.tracking_range(fixture_id, int(np.floor(start_s)), int(np.ceil(end_s)), player_ids)
+    table = table[table["time_s"].between(start_s, end_s)]
+    keyed = keyframes.dense(fixture_id, start_s, end_s, step, method)
+    if player_ids is not None:
+        keyed = keyed[keyed["player_id"].isin(list(player_ids))]
+    recorded = fx.range(start_s, end_s, player_ids) if fx else None
+    return _merge(_merge(recorded, keyed), table)
+
+
+def bounds(fixture_id):
+    fx = open_fixture(fixture_id)
+    spans = [b for b in (db.tracking_bounds(fixture_id), fx.bounds if fx else None,
+                         keyframes.load(fixture_id).bounds) if b]
+    if not spans:
+        return None
+    return min(b[0] for b in spans), max(b[1] for b in spans)
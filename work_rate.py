@@ -0,0 +1,175 @@
+"""
+Player work-rate metrics derived from tracking.
+
+compute() works on a whole tracking frame at once: rows are sorted by player and
+time, and every consecutive pair of points for the same player becomes a segment
+with a distance, duration and speed, all as NumPy arrays. Segments that start on
+the bench, span a gap in the data or imply an impossible speed are not counted.
+
+Results live in the work_rate table. Triggers on tracking, tracking_keyframes and
+events mark the touched (fixture, player) pairs in work_rate_dirty (see
+db.initialize_db), and refresh() recomputes only those pairs. The app refreshes on
+a background thread (refresh_in_background) so a page render never waits on it.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import db
+import tracking_store
+
+# Lower bound of each speed band in m/s (pitch coordinates are metres).
+SPEED_BANDS = {"walk": 0.0, "jog": 2.0, "run": 4.0, "sprint": 6.0}
+MIN_SPRINT_S = 1.0   # a sprint is at least this long above the sprint threshold
+MAX_GAP_S = 5.0      # longer gaps between points are not treated as movement
+MAX_SPEED = 12.0     # faster segments are tracking glitches (or re-placed markers)
+METRIC_COLUMNS = ["distance_m", "walk_m", "jog_m", "run_m", "sprint_m", "sprints", "max_speed",
+                  "minutes_on", "involvements"]
+COLUMNS = ["fixture_id", "player_id"] + METRIC_COLUMNS
+
+_refresh_lock = threading.Lock()  # one refresh at a time, foreground or background
+_worker_lock = threading.Lock()
+_worker = None
+
+
+def compute(tracking, events=None):
+    """One row per (fixture, player) with METRIC_COLUMNS, from tracking rows and tagged events."""
+    tr = tracking.dropna(subset=["player_id", "time_s", "x_pct", "y_pct"])
+    tr = tr.sort_values(["fixture_id", "player_id", "time_s"], kind="stable")
+    if tr.empty:
+        empty = pd.DataFrame({c: pd.Series(dtype="int64" if c.endswith("_id") else "float64") for c in COLUMNS[:-1]})
+        return _with_involvements(empty, events)[COLUMNS]
+    fixture = tr["fixture_id"].to_numpy(dtype=np.int64)
+    player = tr["player_id"].to_numpy(dtype=np.int64)
+    t = tr["time_s"].to_numpy(dtype=float)
+    xy = tr[["x_pct", "y_pct"]].to_numpy(dtype=float)
+    bench = pd.to_numeric(tr["bench"], errors="coerce").fillna(0).to_numpy() > 0 if "bench" in tr else np.zeros(len(tr), bool)
+
+    # Segment i runs from row i to row i + 1.
+    same = (fixture[1:] == fixture[:-1]) & (player[1:] == player[:-1])
+    dt = np.diff(t)
+    dist = np.hypot(*np.diff(xy, axis=0).T)
+    speed = np.divide(dist, dt, out=np.zeros_like(dist), where=dt > 0)
+    on = same & (dt > 0) & (dt <= MAX_GAP_S) & ~bench[:-1] & (speed <= MAX_SPEED)
+    dist, dt, speed = np.where(on, dist, 0.0), np.where(on, dt, 0.0), np.where(on, speed, 0.0)
+
+    # Group id per (fixture, player) run of rows; segments belong to their first row's group.
+    starts = np.r_[True, ~same]
+    group = np.cumsum(starts) - 1
+    n = int(group[-1]) + 1
+    seg_group = group[:-1]
+
+    def total(values):
+        return np.bincount(seg_group, weights=values, minlength=n)
+
+    out = pd.DataFrame({
+        "fixture_id": fixture[starts],
+        "player_id": player[starts],
+        "distance_m": total(dist),
+    })
+    edges = list(SPEED_BANDS.values()) + [np.inf]
+    band = np.digitize(speed, edges[1:-1])
+    for i, name in enumerate(SPEED_BANDS):
+        out[f"{name}_m"] = total(np.where(band == i, dist, 0.0))
+
+    # Sprints: runs of consecutive sprint-speed segments lasting at least MIN_SPRINT_S.
+    fast = on & (speed >= SPEED_BANDS["sprint"])
+    run_start = fast & ~np.r_[False, fast[:-1]]
+    run_id = np.cumsum(run_start) - 1
+    run_time = np.bincount(run_id[fast], weights=dt[fast]) if fast.any() else np.zeros(0)
+    run_group = seg_group[run_start]
+    out["sprints"] = np.bincount(run_group[run_time >= MIN_SPRINT_S], minlength=n)
+    max_speed = np.zeros(n)
+    np.maximum.at(max_speed, seg_group, speed)
+    out["max_speed"] = max_speed
+    out["minutes_on"] = total(dt) / 60
+
+    out = _with_involvements(out, events)
+    return out[COLUMNS].round({c: 2 for c in METRIC_COLUMNS})
+
+
+def _with_involvements(out, events):
+    if events is None or events.empty:
+        return out.assign(involvements=0)
+    counts = (events.dropna(subset=["player_id"])
+              .astype({"fixture_id": "int64", "player_id": "int64"})
+              .groupby(["fixture_id", "player_id"]).size().rename("involvements").reset_index())
+    # Players with tagged events but no tracking still get a row.
+    out = out.merge(counts, on=["fixture_id", "player_id"], how="outer")
+    out[METRIC_COLUMNS] = out[METRIC_COLUMNS].fillna(0)
+    return out.astype({"sprints": "int64", "involvements": "int64"})
+
+
+def _fixture_tracking(fixture_id):
+    """Every tracking row for a fixture, read in one pass."""
+    bounds = tracking_store.bounds(fixture_id)
+    if not bounds:
+        return pd.DataFrame(columns=tracking_store.TRACKING_COLUMNS)
+    return tracking_store.time_range(fixture_id, *bounds)
+
+
+def refresh():
+    """Recompute the summaries marked dirty; returns the number of (fixture, player) pairs touched."""
+    with _refresh_lock:
+        return _refresh()
+
+
+def _refresh():
+    dirty = db.fetch_df("SELECT rowid AS mark, fixture_id, player_id FROM work_rate_dirty")
+    orphans = dirty["fixture_id"].isna()
+    if orphans.any():
+        # Marks from rows without a fixture (left before the triggers skipped them) have
+        # no summary to rebuild; clear them so pending() doesn't stay non-zero.
+        with db.get_pool().writer() as conn:
+            conn.executemany("DELETE FROM work_rate_dirty WHERE rowid=?",
+                             [(int(m),) for m in dirty.loc[orphans, "mark"]])
+        dirty = dirty[~orphans]
+    if dirty.empty:
+        return 0
+    fixture_ids = [int(f) for f in dirty["fixture_id"].unique()]
+    all_events = db.fetch_df(
+        f"SELECT fixture_id, player_id FROM events WHERE player_id IS NOT NULL "
+        f"AND fixture_id IN ({', '.join('?' * len(fixture_ids))})", fixture_ids)
+    touched = 0
+    for fixture_id, marks in dirty.groupby("fixture_id"):
+        whole = marks["player_id"].isna().any()
+        player_ids = None if whole else marks["player_id"].astype(int).tolist()
+        # One read per fixture; a partial refresh filters it rather than re-reading per player.
+        tracking = _fixture_tracking(fixture_id)
+        events = all_events[all_events["fixture_id"] == fixture_id]
+        if player_ids is not None:
+            tracking = tracking[tracking["player_id"].isin(player_ids)]
+            events = events[events["player_id"].isin(player_ids)]
+        rows = compute(tracking, events)
+        with db.get_pool().writer() as conn:
+            if whole:
+                conn.execute("DELETE FROM work_rate WHERE fixture_id=?", (int(fixture_id),))
+            else:
+                conn.executemany("DELETE FROM work_rate WHERE fixture_id=? AND player_id=?",
+                                 [(int(fixture_id), p) for p in player_ids])
+            conn.executemany(f"INSERT INTO work_rate ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                             db.records(rows))
+            # Only clear the marks read above; anything marked since stays dirty.
+            conn.executemany("DELETE FROM work_rate_dirty WHERE rowid=?", [(int(m),) for m in marks["mark"]])
+            db.bump_versions(conn, ["work_rate"])
+        touched += len(rows) if whole else len(player_ids)
+    return touched
+
+
+def refresh_in_background():
+    """Start refresh() on a daemon thread unless one is already running; returns at once."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=refresh, name="work-rate-refresh", daemon=True)
+            _worker.start()
+
+
+def refreshing():
+    return _worker is not None and _worker.is_alive()
+
+
+def pending():
+    """Number of stale (fixture, player) marks waiting for refresh()."""
+    return db.fetch_one("SELECT COUNT(*) FROM work_rate_dirty")[0]